@@ -0,0 +1,162 @@
+# Módulo compartido: copia idéntica en api_collector (referencia) y api_collector_2, porque cada servicio se
+# construye solo con su directorio. Se edita la copia del api_collector y se propaga con
+# `python sincronizar_modulos.py` (desde la raíz; --comprobar falla si alguna copia se ha desviado)
+import json
+import os
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+
+# Almacenamiento de la caché de respuestas de RapidAPI: "memoria", "sqlite" (sobrevive a reinicios) o "desactivada"
+CACHE_RECOLECTOR = os.getenv("CACHE_RECOLECTOR", "memoria")
+
+# Tiempo (en segundos) durante el que se reutiliza una respuesta guardada
+TTL_CACHE_RECOLECTOR = float(os.getenv("TTL_CACHE_RECOLECTOR", "900"))
+
+# Número máximo de respuestas guardadas; al superarlo se descarta la usada hace más tiempo (LRU)
+MAX_ENTRADAS_CACHE = int(os.getenv("MAX_ENTRADAS_CACHE_RECOLECTOR", "512"))
+
+# Fichero de la caché persistente (modo "sqlite")
+RUTA_CACHE_SQLITE = os.getenv("RUTA_CACHE_SQLITE", "cache_recolector.sqlite3")
+
+
+# Normaliza el texto buscado para que "Portátil  ASUS" y "portátil asus" compartan entrada
+def normalizar_consulta(search):
+    return re.sub(r"\s+", " ", search or "").strip().lower()
+
+
+# Clave de la caché: proveedor, consulta normalizada (el parámetro campo_consulta) y el resto
+# de parámetros de la petición (categoría, país, orden...)
+def clave_cache(proveedor, params, campo_consulta):
+    otros = {campo: valor for campo, valor in params.items() if campo != campo_consulta}
+    consulta = normalizar_consulta(params.get(campo_consulta))
+    return json.dumps([proveedor, consulta, otros], sort_keys=True, ensure_ascii=False)
+
+
+# Caché en memoria con TTL y desalojo LRU
+class CacheMemoria:
+
+    def __init__(self, ttl=TTL_CACHE_RECOLECTOR, max_entradas=MAX_ENTRADAS_CACHE):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self.entradas = OrderedDict()
+        self.metricas = {"aciertos": 0, "fallos": 0, "expiradas": 0, "desalojadas": 0}
+
+    # Devuelve la respuesta guardada (o None si no existe o ha caducado) y la marca como usada recientemente
+    def obtener(self, clave):
+        entrada = self.entradas.get(clave)
+        if entrada is None:
+            self.metricas["fallos"] += 1
+            return None
+        if time.time() - entrada["guardada"] >= self.ttl:
+            del self.entradas[clave]
+            self.metricas["expiradas"] += 1
+            self.metricas["fallos"] += 1
+            return None
+        self.entradas.move_to_end(clave)
+        self.metricas["aciertos"] += 1
+        return entrada["datos"]
+
+    # Guarda (o reemplaza) una respuesta, descartando la menos usada si se supera el tamaño máximo
+    def guardar(self, clave, datos):
+        self.entradas[clave] = {"datos": datos, "guardada": time.time()}
+        self.entradas.move_to_end(clave)
+        while len(self.entradas) > self.max_entradas:
+            self.entradas.popitem(last=False)
+            self.metricas["desalojadas"] += 1
+
+    def tamano(self):
+        return len(self.entradas)
+
+    def cerrar(self):
+        pass
+
+    # Estadísticas de uso de la caché
+    def estadisticas(self):
+        return {
+            **self.metricas,
+            "almacenamiento": "memoria",
+            "entradas": self.tamano(),
+            "max_entradas": self.max_entradas,
+            "ttl_s": self.ttl,
+        }
+
+
+# Caché persistente en un fichero SQLite local, con el mismo TTL y desalojo LRU que la de memoria
+class CacheSQLite(CacheMemoria):
+
+    def __init__(self, ruta=RUTA_CACHE_SQLITE, ttl=TTL_CACHE_RECOLECTOR, max_entradas=MAX_ENTRADAS_CACHE):
+        super().__init__(ttl, max_entradas)
+        self.ruta = ruta
+        self.conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self.conexion.execute(
+            "CREATE TABLE IF NOT EXISTS respuestas ("
+            "clave TEXT PRIMARY KEY, datos TEXT NOT NULL, guardada REAL NOT NULL, usada REAL NOT NULL)"
+        )
+        self.conexion.execute("CREATE INDEX IF NOT EXISTS respuestas_usada ON respuestas (usada)")
+        self.conexion.commit()
+
+    def obtener(self, clave):
+        fila = self.conexion.execute("SELECT datos, guardada FROM respuestas WHERE clave = ?", (clave,)).fetchone()
+        if fila is None:
+            self.metricas["fallos"] += 1
+            return None
+        datos, guardada = fila
+        if time.time() - guardada >= self.ttl:
+            self.conexion.execute("DELETE FROM respuestas WHERE clave = ?", (clave,))
+            self.conexion.commit()
+            self.metricas["expiradas"] += 1
+            self.metricas["fallos"] += 1
+            return None
+        self.conexion.execute("UPDATE respuestas SET usada = ? WHERE clave = ?", (time.time(), clave))
+        self.conexion.commit()
+        self.metricas["aciertos"] += 1
+        return json.loads(datos)
+
+    def guardar(self, clave, datos):
+        ahora = time.time()
+        self.conexion.execute(
+            "INSERT OR REPLACE INTO respuestas (clave, datos, guardada, usada) VALUES (?, ?, ?, ?)",
+            (clave, json.dumps(datos), ahora, ahora),
+        )
+        sobrantes = self.tamano() - self.max_entradas
+        if sobrantes > 0:
+            self.conexion.execute(
+                "DELETE FROM respuestas WHERE clave IN (SELECT clave FROM respuestas ORDER BY usada LIMIT ?)",
+                (sobrantes,),
+            )
+            self.metricas["desalojadas"] += sobrantes
+        self.conexion.commit()
+
+    def tamano(self):
+        return self.conexion.execute("SELECT COUNT(*) FROM respuestas").fetchone()[0]
+
+    def cerrar(self):
+        self.conexion.close()
+
+    def estadisticas(self):
+        return {**super().estadisticas(), "almacenamiento": "sqlite", "ruta": self.ruta}
+
+
+# Caché que nunca guarda nada (modo "desactivada"): todas las consultas van a RapidAPI
+class CacheDesactivada(CacheMemoria):
+
+    def obtener(self, clave):
+        self.metricas["fallos"] += 1
+        return None
+
+    def guardar(self, clave, datos):
+        pass
+
+    def estadisticas(self):
+        return {**super().estadisticas(), "almacenamiento": "desactivada"}
+
+
+# Crea la caché según la configuración
+def crear_cache(almacenamiento=CACHE_RECOLECTOR):
+    if almacenamiento == "sqlite":
+        return CacheSQLite()
+    if almacenamiento == "desactivada":
+        return CacheDesactivada()
+    return CacheMemoria()
@@ -0,0 +1,182 @@
+# Módulo compartido: copia idéntica en api_collector (referencia) y api_collector_2, porque cada servicio se
+# construye solo con su directorio. Se edita la copia del api_collector y se propaga con
+# `python sincronizar_modulos.py` (desde la raíz; --comprobar falla si alguna copia se ha desviado)
+import asyncio
+import os
+import random
+import time
+from email.utils import parsedate_to_datetime
+import httpx
+from metricas import DURACION_UPSTREAM
+
+# Peticiones por segundo permitidas hacia RapidAPI por cada clave de proveedor (según el plan contratado)
+PETICIONES_POR_SEGUNDO = float(os.getenv("RAPIDAPI_PETICIONES_POR_SEGUNDO", "5"))
+
+# Número de peticiones que pueden salir seguidas si el cubo estaba lleno
+RAFAGA = int(os.getenv("RAPIDAPI_RAFAGA", "5"))
+
+# Reintentos ante un 429, un 5xx o un error de red, con espera exponencial con jitter entre ellos
+MAX_REINTENTOS = int(os.getenv("RAPIDAPI_MAX_REINTENTOS", "4"))
+ESPERA_BASE = float(os.getenv("RAPIDAPI_ESPERA_BASE", "0.5"))
+ESPERA_MAXIMA = float(os.getenv("RAPIDAPI_ESPERA_MAXIMA", "8"))
+
+# Tiempo máximo (en segundos) de una petición contando cola y reintentos. Debe ser menor que el
+# timeout con el que el backend llama a los recolectores, para poder responder a tiempo
+PLAZO_PETICION = float(os.getenv("RAPIDAPI_PLAZO", "8"))
+
+# Códigos de estado que se reintentan
+ESTADOS_REINTENTABLES = {429, 500, 502, 503, 504}
+
+
+# Error de una petición que no ha podido completarse (agotó reintentos o plazo)
+class PeticionFallida(Exception):
+
+    def __init__(self, mensaje, status_code=None, retry_after=None):
+        super().__init__(mensaje)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+# Limitador de tipo cubo de tokens: se rellena a "tasa" tokens por segundo hasta "capacidad" y cada
+# petición consume uno. Un Retry-After del proveedor pausa el cubo para todas las peticiones
+class CuboTokens:
+
+    def __init__(self, tasa=PETICIONES_POR_SEGUNDO, capacidad=RAFAGA):
+        self.tasa = tasa
+        self.capacidad = capacidad
+        self.tokens = float(capacidad)
+        self.actualizado = time.monotonic()
+        self.pausado_hasta = 0.0
+        self.bloqueo = asyncio.Lock()
+        # Cuota restante del plan según las cabeceras de RapidAPI (None hasta la primera respuesta)
+        self.cuota_restante = None
+        self.cuota_limite = None
+        self.metricas = {"peticiones": 0, "reintentos": 0, "fallidas": 0, "espera_cola_total_s": 0.0, "espera_cola_max_s": 0.0}
+
+    def rellenar(self):
+        ahora = time.monotonic()
+        self.tokens = min(self.capacidad, self.tokens + (ahora - self.actualizado) * self.tasa)
+        self.actualizado = ahora
+
+    # Espera hasta tener un token (en orden de llegada) y devuelve cuánto se ha esperado en la cola.
+    # Lanza PeticionFallida si el token no llegaría antes del límite (instante de time.monotonic)
+    async def adquirir(self, limite=None):
+        inicio = time.monotonic()
+        async with self.bloqueo:
+            while True:
+                self.rellenar()
+                ahora = time.monotonic()
+                espera = max(self.pausado_hasta - ahora, 0.0)
+                if not espera and self.tokens < 1:
+                    espera = (1 - self.tokens) / self.tasa
+                if not espera:
+                    self.tokens -= 1
+                    break
+                if limite is not None and ahora + espera > limite:
+                    raise PeticionFallida("Plazo agotado esperando turno para RapidAPI", status_code=429, retry_after=espera)
+                await asyncio.sleep(espera)
+
+        espera_cola = time.monotonic() - inicio
+        self.metricas["espera_cola_total_s"] += espera_cola
+        self.metricas["espera_cola_max_s"] = max(self.metricas["espera_cola_max_s"], espera_cola)
+        return espera_cola
+
+    # Pausa el cubo durante los segundos indicados por el proveedor (Retry-After)
+    def pausar(self, segundos):
+        self.pausado_hasta = max(self.pausado_hasta, time.monotonic() + segundos)
+
+    # Anota la cuota del plan que informa RapidAPI en cada respuesta
+    def anotar_cuota(self, response):
+        restante = response.headers.get("x-ratelimit-requests-remaining")
+        limite = response.headers.get("x-ratelimit-requests-limit")
+        if restante is not None and restante.isdigit():
+            self.cuota_restante = int(restante)
+        if limite is not None and limite.isdigit():
+            self.cuota_limite = int(limite)
+
+    def estadisticas(self):
+        self.rellenar()
+        return {
+            **self.metricas,
+            "tokens": round(self.tokens, 2),
+            "tasa_por_s": self.tasa,
+            "capacidad": self.capacidad,
+            "pausado_s": round(max(self.pausado_hasta - time.monotonic(), 0.0), 2),
+            "cuota_restante": self.cuota_restante,
+            "cuota_limite": self.cuota_limite,
+        }
+
+
+# Un cubo por clave de proveedor (clave de RapidAPI + host), compartido por todas las peticiones del servicio
+cubos = {}
+
+
+def obtener_cubo(clave_proveedor):
+    if clave_proveedor not in cubos:
+        cubos[clave_proveedor] = CuboTokens()
+    return cubos[clave_proveedor]
+
+
+# Segundos indicados por la cabecera Retry-After (en segundos o como fecha HTTP), o None
+def segundos_retry_after(response):
+    valor = response.headers.get("Retry-After")
+    if not valor:
+        return None
+    if valor.strip().isdigit():
+        return float(valor)
+    try:
+        return max(parsedate_to_datetime(valor).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+# Espera exponencial con jitter completo antes del reintento número "intento" (empezando en 0)
+def espera_reintento(intento):
+    return random.uniform(0, min(ESPERA_MAXIMA, ESPERA_BASE * 2 ** intento))
+
+
+# Hace un GET respetando el limitador del proveedor y reintentando los 429, 5xx y errores de red
+# hasta MAX_REINTENTOS veces o hasta agotar el plazo. Devuelve la respuesta y un informe con la espera
+# en cola, los intentos y la cuota restante. Lanza PeticionFallida si no consigue una respuesta válida
+async def get_con_limite(cliente, cubo, url, params=None, plazo=PLAZO_PETICION):
+    limite = time.monotonic() + plazo
+    informe = {"espera_cola_s": 0.0, "intentos": 0}
+
+    for intento in range(MAX_REINTENTOS + 1):
+        try:
+            informe["espera_cola_s"] += await cubo.adquirir(limite)
+        except PeticionFallida:
+            cubo.metricas["fallidas"] += 1
+            raise
+        informe["intentos"] += 1
+        cubo.metricas["peticiones"] += 1
+        espera = None
+        inicio = time.perf_counter()
+        try:
+            response = await cliente.get(url, params=params)
+            cubo.anotar_cuota(response)
+            if response.status_code not in ESTADOS_REINTENTABLES:
+                response.raise_for_status()
+                informe["cuota_restante"] = cubo.cuota_restante
+                return response, informe
+            error = PeticionFallida(f"RapidAPI respondió {response.status_code}", status_code=response.status_code)
+            espera = segundos_retry_after(response)
+            if espera is not None:
+                error.retry_after = espera
+                cubo.pausar(espera)
+        except httpx.TransportError as e:
+            # Los intentos con respuesta se miden en el cliente HTTP; los fallidos por red, aquí
+            DURACION_UPSTREAM.observar(time.perf_counter() - inicio, fuente="rapidapi", estado="error_red")
+            error = PeticionFallida(f"Error de red con RapidAPI: {e}", status_code=503)
+
+        if intento == MAX_REINTENTOS:
+            break
+        espera = max(espera or 0.0, espera_reintento(intento))
+        if time.monotonic() + espera > limite:
+            break
+        print(f"Reintentando {url} en {espera:.2f}s ({error})")
+        cubo.metricas["reintentos"] += 1
+        await asyncio.sleep(espera)
+
+    cubo.metricas["fallidas"] += 1
+    raise error
@@ -1,10 +1,15 @@
-from fastapi import FastAPI, Query # Para crear la API
+import os # Para leer la configuración de variables de entorno
+from contextlib import asynccontextmanager # Para gestionar el ciclo de vida de la aplicación
+from fastapi import FastAPI, HTTPException, Query, Response # Para crear la API
 from pydantic import BaseModel # Para definir el modelo de datos
 from typing import List # Para manejar listas
 import httpx # Para hacer peticiones HTTP
 from datetime import datetime # Para manejar fechas y horas
-
-app = FastAPI() # Inicializa la aplicación FastAPI
+from clientes_http import cerrar_clientes, estadisticas_pool, iniciar_clientes, obtener_cliente # Clientes HTTP compartidos
+from cache_respuestas import clave_cache, crear_cache # Caché de respuestas de RapidAPI
+from limitador import PeticionFallida, get_con_limite, obtener_cubo # Límite de peticiones y reintentos hacia RapidAPI
+from metricas import instrumentar # Métricas en formato Prometheus
+from trazas import instrumentar_trazas # Trazas entre servicios
 
 # Modelo de datos para los productos
 class Producto(BaseModel):
@@ -23,13 +28,66 @@ HEADERS = {
     'x-rapidapi-host': "real-time-amazon-data.p.rapidapi.com"
 }
 
+# URL base de la API de RapidAPI (configurable para apuntar a un stub local en pruebas)
+URL_BASE = os.getenv("URL_RAPIDAPI", "https://real-time-amazon-data.p.rapidapi.com")
+
+# Limitador de peticiones de la clave de RapidAPI de este proveedor
+cubo_rapidapi = obtener_cubo((HEADERS['x-rapidapi-key'], HEADERS['x-rapidapi-host']))
+
+# Caché de respuestas de RapidAPI (evita gastar cuota repitiendo búsquedas recientes)
+cache_respuestas = crear_cache()
+
+
+# El cliente HTTP hacia RapidAPI (con su pool de conexiones keep-alive) vive lo mismo que la aplicación.
+# Sus peticiones se trazan pero no propagan la traza: RapidAPI es un tercero
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await iniciar_clientes({"rapidapi": URL_BASE}, headers=HEADERS, propagar_trazas=False)
+    yield
+    await cerrar_clientes()
+    cache_respuestas.cerrar()
+
+
+app = FastAPI(lifespan=lifespan) # Inicializa la aplicación FastAPI
+
+# Métricas en formato Prometheus (/metrics): duración por ruta y de las llamadas a RapidAPI
+instrumentar(app)
+
+# Trazas entre servicios: continúa la traza del backend con un span por petición (y uno por llamada a
+# RapidAPI, sin enviarle la cabecera traceparent)
+instrumentar_trazas(app, "api_collector")
+
+
+# Cabeceras con la espera en cola, los intentos y la cuota restante de RapidAPI de la petición
+def informar_limitador(respuesta, informe):
+    respuesta.headers["X-Espera-Cola-Ms"] = str(round(informe["espera_cola_s"] * 1000))
+    respuesta.headers["X-Intentos"] = str(informe["intentos"])
+    if cubo_rapidapi.cuota_restante is not None:
+        respuesta.headers["X-Cuota-Restante"] = str(cubo_rapidapi.cuota_restante)
+
+
+# Estado de la respuesta de error: 429 si RapidAPI limitó la cuota, 503 en cualquier otro caso
+def estado_error(error):
+    return 429 if error.status_code == 429 else 503
+
+
+# Cabeceras de la respuesta de error cuando RapidAPI no ha podido atender la petición
+def cabeceras_error(error):
+    cabeceras = {}
+    if error.retry_after is not None:
+        cabeceras["Retry-After"] = str(max(round(error.retry_after), 1))
+    if cubo_rapidapi.cuota_restante is not None:
+        cabeceras["X-Cuota-Restante"] = str(cubo_rapidapi.cuota_restante)
+    return cabeceras
+
+
 # Endpoint para recolectar productos de los proveedores
 @app.get("/recolectar", response_model=List[Producto])
-async def recolectar(search: str = Query(..., description="Buscar productos por nombre")):
+async def recolectar(respuesta: Response, search: str = Query(..., description="Buscar productos por nombre")):
     productos = []
 
     # Se obtienen los productos de la API de RapidAPI
-    URL = "https://real-time-amazon-data.p.rapidapi.com/search"
+    URL = f"{URL_BASE}/search"
 
     PARAMS = {
         "query": search,
@@ -41,52 +99,83 @@ async def recolectar(search: str = Query(..., description="Buscar productos por
         "fields": "product_title, product_price, product_url, product_photo"
     }
 
-    # Usamos httpx para hacer peticiones asíncronas
-    async with httpx.AsyncClient() as client:
-        try:
-            # Hacemos una petición GET a la URL del proveedor
-            response = await client.get(URL, headers=HEADERS, params=PARAMS)
-            response.raise_for_status()
+    # Usamos el cliente httpx compartido para hacer peticiones asíncronas
+    client = obtener_cliente("rapidapi")
+    informe = {"espera_cola_s": 0.0, "intentos": 0}
+    try:
+        # Reutilizamos la respuesta si la misma búsqueda se hizo hace poco; si no, la pedimos a RapidAPI
+        clave = clave_cache("amazon", PARAMS, "query")
+        data = cache_respuestas.obtener(clave)
+        if data is None:
+            # Hacemos una petición GET a la URL del proveedor, respetando el límite de peticiones de RapidAPI
+            response, informe = await get_con_limite(client, cubo_rapidapi, URL, PARAMS)
             data = response.json()
-
-            # Accedemos al campo "products" dentro de "data"
+            # Solo se guardan las respuestas con la estructura esperada
             if isinstance(data, dict) and "data" in data and "products" in data["data"]:
-                nested_data = data["data"]["products"]
-                for item in nested_data:
-                    try:
-                        # Limpieza y procesamiento de los datos
-                        product_price = item.get("product_price", "0")
-                        if product_price:
-                            product_price = (
-                                product_price
-                                .replace("\xa0", "")  # Elimina espacios no separables
-                                .replace("€", "")    # Elimina el símbolo de euro
-                                .replace(".", "")    # Elimina el punto para miles
-                                .replace(",", ".")   # Cambia coma por punto para formato decimal
-                            )
-                            product_price = float(product_price)
-                        else:
-                            product_price = 0.0
-
-                        # Crear el objeto Producto
-                        producto = Producto(
-                            asin=item.get("asin", "N/A"),
-                            product_title=item.get("product_title", "Título no disponible"),
-                            product_price=product_price,
-                            product_url=item.get("product_url", ""),
-                            product_photo=item.get("product_photo", ""),
-                            timestamp=datetime.utcnow()
+                cache_respuestas.guardar(clave, data)
+
+        # Accedemos al campo "products" dentro de "data"
+        if isinstance(data, dict) and "data" in data and "products" in data["data"]:
+            nested_data = data["data"]["products"]
+            for item in nested_data:
+                try:
+                    # Limpieza y procesamiento de los datos
+                    product_price = item.get("product_price", "0")
+                    if product_price:
+                        product_price = (
+                            product_price
+                            .replace("\xa0", "")  # Elimina espacios no separables
+                            .replace("€", "")    # Elimina el símbolo de euro
+                            .replace(".", "")    # Elimina el punto para miles
+                            .replace(",", ".")   # Cambia coma por punto para formato decimal
                         )
-                        productos.append(producto)
-                    except Exception as e:
-                        print(f"Error procesando el producto: {item}, Error: {e}")
-            else:
-                print(f"Estructura de datos inesperada: {data}")
-
-        except httpx.HTTPStatusError as http_err:
-            print(f"Error HTTP con {URL}: {http_err}")
-
-        except Exception as e:
-            print(f"Error con {URL}: {e}")
-    
-    return productos
\ No newline at end of file
+                        product_price = float(product_price)
+                    else:
+                        product_price = 0.0
+
+                    # Crear el objeto Producto
+                    producto = Producto(
+                        asin=item.get("asin", "N/A"),
+                        product_title=item.get("product_title", "Título no disponible"),
+                        product_price=product_price,
+                        product_url=item.get("product_url", ""),
+                        product_photo=item.get("product_photo", ""),
+                        timestamp=datetime.utcnow()
+                    )
+                    productos.append(producto)
+                except Exception as e:
+                    print(f"Error procesando el producto: {item}, Error: {e}")
+        else:
+            print(f"Estructura de datos inesperada: {data}")
+
+    except PeticionFallida as e:
+        # RapidAPI no respondió a tiempo ni tras los reintentos: se informa del fallo en lugar de devolver una lista vacía
+        print(f"Error con {URL}: {e}")
+        raise HTTPException(status_code=estado_error(e), detail=str(e), headers=cabeceras_error(e))
+
+    except httpx.HTTPStatusError as http_err:
+        print(f"Error HTTP con {URL}: {http_err}")
+
+    except Exception as e:
+        print(f"Error con {URL}: {e}")
+
+    informar_limitador(respuesta, informe)
+    return productos
+
+
+@app.get("/estadisticas/http")
+async def estadisticas_http():
+    # Estado del pool de conexiones hacia RapidAPI (activas, inactivas y espera por conexión)
+    return estadisticas_pool()
+
+
+@app.get("/estadisticas/cache")
+async def estadisticas_cache():
+    # Aciertos, fallos y ocupación de la caché de respuestas de RapidAPI
+    return cache_respuestas.estadisticas()
+
+
+@app.get("/estadisticas/limitador")
+async def estadisticas_limitador():
+    # Tokens disponibles, espera en cola, reintentos y cuota restante de RapidAPI
+    return cubo_rapidapi.estadisticas()
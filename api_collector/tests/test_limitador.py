@@ -0,0 +1,179 @@
+"""Limitador y reintentos hacia RapidAPI contra un stub local que responde lo que le indica cada prueba.
+
+El stub contesta en orden las respuestas programadas (429 con Retry-After, 5xx, 200...) y, cuando se le
+acaban, 200 sin productos. Anota cada petición con su instante para comprobar las esperas.
+"""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+import limitador
+import main
+from limitador import PeticionFallida, get_con_limite
+
+# Respuesta de la búsqueda de RapidAPI con un producto
+CUERPO_PRODUCTOS = {
+    "data": {
+        "products": [
+            {
+                "asin": "B000TEST01",
+                "product_title": "Portátil de prueba",
+                "product_price": "1.234,50\xa0€",
+                "product_url": "https://www.amazon.es/dp/B000TEST01",
+                "product_photo": "https://m.media-amazon.com/images/test.jpg",
+            }
+        ]
+    }
+}
+
+
+class StubRapidAPI(BaseHTTPRequestHandler):
+    # Respuestas pendientes: (estado, cabeceras, cuerpo) y peticiones recibidas: (ruta, cabeceras, instante)
+    respuestas = []
+    peticiones = []
+
+    def do_GET(self):
+        self.peticiones.append((self.path, dict(self.headers), time.monotonic()))
+        estado, cabeceras, cuerpo = self.respuestas.pop(0) if self.respuestas else (200, {}, {"data": {"products": []}})
+        datos = json.dumps(cuerpo).encode()
+        self.send_response(estado)
+        for nombre, valor in cabeceras.items():
+            self.send_header(nombre, valor)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def log_message(self, formato, *argumentos):
+        pass
+
+
+@pytest.fixture
+def stub():
+    StubRapidAPI.respuestas = []
+    StubRapidAPI.peticiones = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StubRapidAPI)
+    hilo = threading.Thread(target=httpd.serve_forever, daemon=True)
+    hilo.start()
+    try:
+        yield f"http://127.0.0.1:{httpd.server_port}"
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+# Cubo del servicio como recién creado (las pruebas anteriores pueden haberlo pausado o vaciado)
+@pytest.fixture(autouse=True)
+def cubo_limpio():
+    cubo = main.cubo_rapidapi
+    cubo.tokens = float(cubo.capacidad)
+    cubo.actualizado = time.monotonic()
+    cubo.pausado_hasta = 0.0
+    cubo.cuota_restante = None
+    cubo.cuota_limite = None
+    return cubo
+
+
+# Servicio apuntando al stub, con su ciclo de vida (clientes HTTP) en marcha
+@pytest.fixture
+def recolector(stub, monkeypatch):
+    monkeypatch.setattr(main, "URL_BASE", stub)
+    with TestClient(main.app) as cliente:
+        yield cliente
+
+
+def test_reintenta_429_y_5xx_hasta_obtener_respuesta(recolector):
+    StubRapidAPI.respuestas = [
+        (429, {"Retry-After": "1"}, {"message": "Too many requests"}),
+        (503, {}, {"message": "Service unavailable"}),
+        (200, {"x-ratelimit-requests-remaining": "42", "x-ratelimit-requests-limit": "100"}, CUERPO_PRODUCTOS),
+    ]
+
+    respuesta = recolector.get("/recolectar", params={"search": "portatil"})
+
+    assert respuesta.status_code == 200
+    productos = respuesta.json()
+    assert [producto["asin"] for producto in productos] == ["B000TEST01"]
+    assert productos[0]["product_price"] == 1234.5
+    # Tres intentos: el 429 y el 503 se reintentan y el tercero responde
+    assert len(StubRapidAPI.peticiones) == 3
+    assert respuesta.headers["X-Intentos"] == "3"
+    assert respuesta.headers["X-Cuota-Restante"] == "42"
+    assert int(respuesta.headers["X-Espera-Cola-Ms"]) >= 0
+    # Tras el 429 no se vuelve a llamar antes de lo que indica Retry-After
+    instantes = [instante for _, _, instante in StubRapidAPI.peticiones]
+    assert instantes[1] - instantes[0] >= 0.95
+
+
+def test_retry_after_pausa_el_cubo_para_todas_las_peticiones(stub, cubo_limpio, monkeypatch):
+    monkeypatch.setattr(limitador, "MAX_REINTENTOS", 0)
+    StubRapidAPI.respuestas = [(429, {"Retry-After": "1"}, {})]
+
+    async def ejecutar():
+        async with httpx.AsyncClient() as cliente:
+            with pytest.raises(PeticionFallida) as fallo:
+                await get_con_limite(cliente, cubo_limpio, f"{stub}/search")
+        # Otra petición, aunque queden tokens, espera en cola a que termine la pausa
+        espera = await cubo_limpio.adquirir()
+        return fallo.value, espera
+
+    fallo, espera = asyncio.run(ejecutar())
+    assert fallo.status_code == 429
+    assert fallo.retry_after == 1.0
+    assert 0.9 <= espera <= 1.5
+    assert cubo_limpio.metricas["fallidas"] >= 1
+
+
+def test_no_espera_un_retry_after_que_supera_el_plazo(recolector):
+    StubRapidAPI.respuestas = [(429, {"Retry-After": "30", "x-ratelimit-requests-remaining": "0"}, {})]
+
+    inicio = time.monotonic()
+    respuesta = recolector.get("/recolectar", params={"search": "portatil"})
+
+    # Se responde enseguida con el 429 y el Retry-After del proveedor en lugar de agotar el plazo esperando
+    assert time.monotonic() - inicio < 2
+    assert len(StubRapidAPI.peticiones) == 1
+    assert respuesta.status_code == 429
+    assert respuesta.headers["Retry-After"] == "30"
+    assert respuesta.headers["X-Cuota-Restante"] == "0"
+
+
+def test_cubo_pausado_no_espera_mas_alla_del_limite(cubo_limpio):
+    cubo_limpio.pausar(30)
+
+    async def ejecutar():
+        await cubo_limpio.adquirir(limite=time.monotonic() + 1)
+
+    inicio = time.monotonic()
+    with pytest.raises(PeticionFallida) as fallo:
+        asyncio.run(ejecutar())
+    assert time.monotonic() - inicio < 0.5
+    assert fallo.value.status_code == 429
+    assert fallo.value.retry_after > 29
+
+
+def test_5xx_persistente_se_responde_con_503(recolector):
+    StubRapidAPI.respuestas = [(502, {}, {})] * (limitador.MAX_REINTENTOS + 1)
+
+    respuesta = recolector.get("/recolectar", params={"search": "portatil"})
+
+    assert respuesta.status_code == 503
+    assert len(StubRapidAPI.peticiones) == limitador.MAX_REINTENTOS + 1
+    assert "Retry-After" not in respuesta.headers
+
+
+def test_no_propaga_la_traza_a_rapidapi(recolector):
+    StubRapidAPI.respuestas = [(200, {}, CUERPO_PRODUCTOS)]
+    traza = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+
+    respuesta = recolector.get("/recolectar", params={"search": "portatil"}, headers={"traceparent": traza})
+
+    assert respuesta.status_code == 200
+    # La traza del backend continúa en el recolector, pero RapidAPI no recibe sus identificadores
+    assert respuesta.headers["X-Trace-Id"] == "0af7651916cd43dd8448eb211c80319c"
+    (_, cabeceras, _), = StubRapidAPI.peticiones
+    assert "traceparent" not in {nombre.lower() for nombre in cabeceras}
@@ -1,10 +1,16 @@
-from fastapi import FastAPI, Query # Para crear la API
+import asyncio # Para pedir las categorías y páginas a la vez
+import os # Para leer la configuración de variables de entorno
+from contextlib import asynccontextmanager # Para gestionar el ciclo de vida de la aplicación
+from fastapi import FastAPI, HTTPException, Query, Response # Para crear la API
 from pydantic import BaseModel # Para definir el modelo de datos
 from typing import List # Para manejar listas
 import httpx # Para hacer peticiones HTTP
 from datetime import datetime # Para manejar fechas y horas
-
-app = FastAPI() # Inicializa la aplicación FastAPI
+from clientes_http import cerrar_clientes, estadisticas_pool, iniciar_clientes, obtener_cliente # Clientes HTTP compartidos
+from cache_respuestas import clave_cache, crear_cache # Caché de respuestas de RapidAPI
+from limitador import PeticionFallida, get_con_limite, obtener_cubo # Límite de peticiones y reintentos hacia RapidAPI
+from metricas import instrumentar # Métricas en formato Prometheus
+from trazas import instrumentar_trazas # Trazas entre servicios
 
 # Modelo de datos para los productos
 class Producto(BaseModel):
@@ -26,62 +32,217 @@ HEADERS = {
 # Categorías de búsqueda
 catIDs = [7, 509]
 
-# Endpoint para recolectar productos de los proveedores
+# itemId de los productos que RapidAPI devuelve sin él. No identifica al producto: no se usa para quitar repetidos
+SIN_ID = "N/A"
+
+# Páginas de resultados que se pueden pedir por categoría
+PAGINAS_POR_CATEGORIA = int(os.getenv("PAGINAS_POR_CATEGORIA", "2"))
+
+# Productos distintos a partir de los cuales se dejan de pedir páginas
+RESULTADOS_SUFICIENTES = int(os.getenv("RESULTADOS_SUFICIENTES", "60"))
+
+# Páginas de cada categoría que se piden a la vez en cada ronda. Con 2 (por defecto) se pide la página N junto
+# con la N+1 por adelantado: con las PAGINAS_POR_CATEGORIA por defecto la búsqueda tarda lo que la llamada
+# más lenta, aunque la página 2 gaste cuota cuando la 1 ya bastaba. Con 1 (modo conservador) solo se pide la
+# página siguiente si las anteriores no llegan a RESULTADOS_SUFICIENTES: gasta menos cuota, pero cada página
+# añade la espera de una llamada más
+PAGINAS_POR_RONDA = max(int(os.getenv("PAGINAS_POR_RONDA", "2")), 1)
+
+# Peticiones a RapidAPI en vuelo a la vez dentro de una búsqueda (por defecto, todas las de una ronda)
+CONCURRENCIA_PETICIONES = int(os.getenv("CONCURRENCIA_PETICIONES", str(len(catIDs) * PAGINAS_POR_RONDA)))
+
+# URL base de la API de RapidAPI (configurable para apuntar a un stub local en pruebas)
+URL_BASE = os.getenv("URL_RAPIDAPI", "https://aliexpress-datahub.p.rapidapi.com")
+
+# Limitador de peticiones de la clave de RapidAPI de este proveedor
+cubo_rapidapi = obtener_cubo((HEADERS['x-rapidapi-key'], HEADERS['x-rapidapi-host']))
+
+# Caché de respuestas de RapidAPI (evita gastar cuota repitiendo búsquedas recientes)
+cache_respuestas = crear_cache()
+
+
+# El cliente HTTP hacia RapidAPI (con su pool de conexiones keep-alive) vive lo mismo que la aplicación.
+# Sus peticiones se trazan pero no propagan la traza: RapidAPI es un tercero
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await iniciar_clientes({"rapidapi": URL_BASE}, headers=HEADERS, propagar_trazas=False)
+    yield
+    await cerrar_clientes()
+    cache_respuestas.cerrar()
+
+
+app = FastAPI(lifespan=lifespan) # Inicializa la aplicación FastAPI
+
+# Métricas en formato Prometheus (/metrics): duración por ruta y de las llamadas a RapidAPI
+instrumentar(app)
+
+# Trazas entre servicios: continúa la traza del backend con un span por petición (y uno por llamada a
+# RapidAPI, sin enviarle la cabecera traceparent)
+instrumentar_trazas(app, "api_collector_2")
+
+
+# Cabeceras con la espera en cola, los intentos y la cuota restante de RapidAPI de la petición
+def informar_limitador(respuesta, informe):
+    respuesta.headers["X-Espera-Cola-Ms"] = str(round(informe["espera_cola_s"] * 1000))
+    respuesta.headers["X-Intentos"] = str(informe["intentos"])
+    if cubo_rapidapi.cuota_restante is not None:
+        respuesta.headers["X-Cuota-Restante"] = str(cubo_rapidapi.cuota_restante)
+
+
+# Estado de la respuesta de error: 429 si RapidAPI limitó la cuota, 503 en cualquier otro caso
+def estado_error(error):
+    return 429 if error.status_code == 429 else 503
+
+
+# Cabeceras de la respuesta de error cuando RapidAPI no ha podido atender la petición
+def cabeceras_error(error):
+    cabeceras = {}
+    if error.retry_after is not None:
+        cabeceras["Retry-After"] = str(max(round(error.retry_after), 1))
+    if cubo_rapidapi.cuota_restante is not None:
+        cabeceras["X-Cuota-Restante"] = str(cubo_rapidapi.cuota_restante)
+    return cabeceras
+
+
+# Recolecta una página de resultados de una categoría. Lanza PeticionFallida si RapidAPI no responde
+async def recolectar_pagina(client, search, catID, pagina, informe):
+    productos = []
+    URL = f"{URL_BASE}/item_search_2"
+
+    # Se establecen parámetros de búsqueda
+    PARAMS = {
+        "q": search,
+        "sort": "default",
+        "catId": catID,
+        "page": pagina,
+        "region": "ES",
+        "currency": "EUR"
+    }
+
+    try:
+        # Reutilizamos la respuesta si la misma búsqueda se hizo hace poco; si no, la pedimos a RapidAPI
+        clave = clave_cache("aliexpress", PARAMS, "q")
+        data = cache_respuestas.obtener(clave)
+        if data is None:
+            # Hacemos una petición GET a la URL del proveedor, respetando el límite de peticiones de RapidAPI
+            response, informe_pagina = await get_con_limite(client, cubo_rapidapi, URL, PARAMS)
+            informe["espera_cola_s"] += informe_pagina["espera_cola_s"]
+            informe["intentos"] += informe_pagina["intentos"]
+            data = response.json()
+            # Solo se guardan las respuestas con la estructura esperada
+            if isinstance(data, dict) and "result" in data and "resultList" in data["result"]:
+                cache_respuestas.guardar(clave, data)
+
+        # Accedemos al campo "resultList" dentro de "result"
+        if isinstance(data, dict) and "result" in data and "resultList" in data["result"]:
+            nested_data = data["result"]["resultList"]
+            for item_wrapper in nested_data:
+                try:
+                    # Accedemos al producto dentro de "item"
+                    item = item_wrapper.get("item", {})
+
+                    # Limpieza y procesamiento del precio
+                    promotion_price = item.get("sku", {}).get("def", {}).get("promotionPrice", 0.0)
+                    if promotion_price is None:
+                        promotion_price = 0.0
+
+                    # Crear el objeto Producto
+                    producto = Producto(
+                        itemId=item.get("itemId", SIN_ID),
+                        title=item.get("title", "Título no disponible"),
+                        promotionPrice=float(promotion_price),
+                        itemUrl=f"https:{item.get('itemUrl', '')}",
+                        image=f"https:{item.get('image', '')}",
+                        timestamp=datetime.utcnow()
+                    )
+                    productos.append(producto)
+                except Exception as e:
+                    print(f"Error procesando el producto: {item_wrapper}, Error: {e}")
+        else:
+            print(f"Estructura de datos inesperada: {data}")
+
+    except httpx.HTTPStatusError as http_err:
+        print(f"Error HTTP con {URL}: {http_err}")
+
+    return productos
+
+
+# Endpoint para recolectar productos de los proveedores. Las páginas se piden por rondas de PAGINAS_POR_RONDA
+# páginas de todas las categorías a la vez (hasta CONCURRENCIA_PETICIONES en vuelo) y solo se pasa a la ronda
+# siguiente si con las anteriores no se llega a RESULTADOS_SUFICIENTES productos distintos, y solo para las
+# categorías que aún tienen resultados
 @app.get("/recolectar", response_model=List[Producto])
-async def recolectar(search: str = Query(..., description="Buscar productos por nombre")):
+async def recolectar(respuesta: Response, search: str = Query(..., description="Buscar productos por nombre")):
+    # Usamos el cliente httpx compartido para hacer peticiones asíncronas
+    client = obtener_cliente("rapidapi")
+    informe = {"espera_cola_s": 0.0, "intentos": 0}
+    fallo = None
+    semaforo = asyncio.Semaphore(CONCURRENCIA_PETICIONES)
+
+    async def pedir(catID, pagina):
+        async with semaforo:
+            return await recolectar_pagina(client, search, catID, pagina, informe)
+
+    resultados = {}
+    # Productos distintos recolectados: itemId conocidos y productos sin itemId (cada uno cuenta por separado)
+    vistos = set()
+    sin_id = 0
+    # Categorías de las que se piden las páginas de la ronda
+    activas = list(catIDs)
+    for primera in range(1, PAGINAS_POR_CATEGORIA + 1, PAGINAS_POR_RONDA):
+        if not activas or len(vistos) + sin_id >= RESULTADOS_SUFICIENTES:
+            break
+        paginas = range(primera, min(primera + PAGINAS_POR_RONDA, PAGINAS_POR_CATEGORIA + 1))
+        pedidas = [(catID, pagina) for catID in activas for pagina in paginas]
+        salidas = await asyncio.gather(
+            *(pedir(catID, pagina) for catID, pagina in pedidas), return_exceptions=True
+        )
+
+        for (catID, pagina), salida in zip(pedidas, salidas):
+            if isinstance(salida, BaseException):
+                print(f"Error con la categoría {catID}, página {pagina}: {salida}")
+                if isinstance(salida, PeticionFallida):
+                    fallo = salida
+                continue
+            resultados[(catID, pagina)] = salida
+            vistos.update(producto.itemId for producto in salida if producto.itemId != SIN_ID)
+            sin_id += sum(1 for producto in salida if producto.itemId == SIN_ID)
+        # Una página vacía (o fallida) indica que la categoría no tiene más resultados
+        activas = [catID for catID in activas if resultados.get((catID, paginas[-1]))]
+
+    # Se combinan en orden de página y categoría, quitando los productos repetidos entre categorías (los que no
+    # tienen itemId no se pueden comparar y se mantienen todos)
     productos = []
-    URL = "https://aliexpress-datahub.p.rapidapi.com/item_search_2"
-
-    for catID in catIDs:
-        # Se establecen parámetros de búsqueda
-        PARAMS = {
-            "q": search,
-            "sort": "default",
-            "catId": catID,
-            "region": "ES",
-            "currency": "EUR"
-        }
-
-        # Usamos httpx para hacer peticiones asíncronas
-        async with httpx.AsyncClient() as client:
-            try:
-                # Hacemos una petición GET a la URL del proveedor
-                response = await client.get(URL, headers=HEADERS, params=PARAMS)
-                response.raise_for_status()
-                data = response.json()
-
-                # Accedemos al campo "resultList" dentro de "result"
-                if isinstance(data, dict) and "result" in data and "resultList" in data["result"]:
-                    nested_data = data["result"]["resultList"]
-                    for item_wrapper in nested_data:
-                        try:
-                            # Accedemos al producto dentro de "item"
-                            item = item_wrapper.get("item", {})
-                            
-                            # Limpieza y procesamiento del precio
-                            promotion_price = item.get("sku", {}).get("def", {}).get("promotionPrice", 0.0)
-                            if promotion_price is None:
-                                promotion_price = 0.0
-
-                            # Crear el objeto Producto
-                            producto = Producto(
-                                itemId=item.get("itemId", "N/A"),
-                                title=item.get("title", "Título no disponible"),
-                                promotionPrice=float(promotion_price),
-                                itemUrl=f"https:{item.get('itemUrl', '')}",
-                                image=f"https:{item.get('image', '')}",
-                                timestamp=datetime.utcnow()
-                            )
-                            productos.append(producto)
-                        except Exception as e:
-                            print(f"Error procesando el producto: {item_wrapper}, Error: {e}")
-                else:
-                    print(f"Estructura de datos inesperada: {data}")
-
-            except httpx.HTTPStatusError as http_err:
-                print(f"Error HTTP con {URL}: {http_err}")
-
-            except Exception as e:
-                print(f"Error con {URL}: {e}")
-    
-    return productos
\ No newline at end of file
+    ids_vistos = set()
+    for pagina in range(1, PAGINAS_POR_CATEGORIA + 1):
+        for catID in catIDs:
+            for producto in resultados.get((catID, pagina), []):
+                if producto.itemId == SIN_ID:
+                    productos.append(producto)
+                elif producto.itemId not in ids_vistos:
+                    ids_vistos.add(producto.itemId)
+                    productos.append(producto)
+
+    informar_limitador(respuesta, informe)
+    # Si RapidAPI no respondió a ninguna categoría se informa del fallo en lugar de devolver una lista vacía
+    if fallo and not productos:
+        raise HTTPException(status_code=estado_error(fallo), detail=str(fallo), headers=cabeceras_error(fallo))
+    return productos
+
+
+@app.get("/estadisticas/http")
+async def estadisticas_http():
+    # Estado del pool de conexiones hacia RapidAPI (activas, inactivas y espera por conexión)
+    return estadisticas_pool()
+
+
+@app.get("/estadisticas/cache")
+async def estadisticas_cache():
+    # Aciertos, fallos y ocupación de la caché de respuestas de RapidAPI
+    return cache_respuestas.estadisticas()
+
+
+@app.get("/estadisticas/limitador")
+async def estadisticas_limitador():
+    # Tokens disponibles, espera en cola, reintentos y cuota restante de RapidAPI
+    return cubo_rapidapi.estadisticas()
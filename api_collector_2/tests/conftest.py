@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Sin caché de respuestas (cada prueba debe llegar al stub) y con esperas entre reintentos cortas
+os.environ.setdefault("CACHE_RECOLECTOR", "desactivada")
+os.environ.setdefault("RAPIDAPI_ESPERA_BASE", "0.01")
+
+# Los módulos del servicio se importan como en main.py, desde el directorio api_collector_2
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,193 @@
+"""/recolectar contra un stub local de RapidAPI que responde según la categoría y la página pedidas.
+
+Cada prueba fija en StubRapidAPI.responder la función que decide la respuesta (estado, cabeceras, cuerpo) de
+cada petición a partir de su query. El stub anota cada petición con su categoría, página e instante.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import pytest
+from fastapi.testclient import TestClient
+import limitador
+import main
+
+
+# Cuerpo de una página de resultados con los itemId indicados (None: producto sin itemId)
+def pagina(*ids):
+    lista = []
+    for item_id in ids:
+        item = {"title": f"Producto {item_id}", "itemUrl": "//es.aliexpress.com/item", "image": "//ae01.alicdn.com/x.jpg",
+                "sku": {"def": {"promotionPrice": 9.99}}}
+        if item_id is not None:
+            item["itemId"] = item_id
+        lista.append({"item": item})
+    return {"result": {"resultList": lista}}
+
+
+class StubRapidAPI(BaseHTTPRequestHandler):
+    # Decide la respuesta (estado, cabeceras, cuerpo) de la petición a partir de su categoría y página
+    responder = None
+    # Peticiones recibidas: (categoría, página, instante)
+    peticiones = []
+
+    def do_GET(self):
+        query = parse_qs(urlsplit(self.path).query)
+        categoria, numero = int(query["catId"][0]), int(query["page"][0])
+        self.peticiones.append((categoria, numero, time.monotonic()))
+        estado, cabeceras, cuerpo = self.responder(categoria, numero)
+        datos = json.dumps(cuerpo).encode()
+        self.send_response(estado)
+        for nombre, valor in cabeceras.items():
+            self.send_header(nombre, valor)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def log_message(self, formato, *argumentos):
+        pass
+
+
+@pytest.fixture
+def stub():
+    StubRapidAPI.responder = staticmethod(lambda categoria, numero: (200, {}, pagina()))
+    StubRapidAPI.peticiones = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StubRapidAPI)
+    hilo = threading.Thread(target=httpd.serve_forever, daemon=True)
+    hilo.start()
+    try:
+        yield f"http://127.0.0.1:{httpd.server_port}"
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+# Cubo del servicio como recién creado (las pruebas anteriores pueden haberlo pausado o vaciado)
+@pytest.fixture(autouse=True)
+def cubo_limpio():
+    cubo = main.cubo_rapidapi
+    cubo.tokens = float(cubo.capacidad)
+    cubo.actualizado = time.monotonic()
+    cubo.pausado_hasta = 0.0
+    cubo.cuota_restante = None
+    cubo.cuota_limite = None
+    return cubo
+
+
+# Servicio apuntando al stub, con su ciclo de vida (clientes HTTP) en marcha
+@pytest.fixture
+def recolector(stub, monkeypatch):
+    monkeypatch.setattr(main, "URL_BASE", stub)
+    with TestClient(main.app) as cliente:
+        yield cliente
+
+
+def fijar_respuestas(responder):
+    StubRapidAPI.responder = staticmethod(responder)
+
+
+def test_combina_categorias_y_reintenta_los_429(recolector):
+    intentos = {}
+
+    def responder(categoria, numero):
+        intentos[categoria] = intentos.get(categoria, 0) + 1
+        # La primera petición de la categoría 7 recibe un 429
+        if categoria == 7 and intentos[categoria] == 1:
+            return 429, {"Retry-After": "1"}, {}
+        return 200, {"x-ratelimit-requests-remaining": "17"}, pagina(f"{categoria}-{numero}", "comun") if numero == 1 else pagina()
+
+    fijar_respuestas(responder)
+    respuesta = recolector.get("/recolectar", params={"search": "portatil"})
+
+    assert respuesta.status_code == 200
+    # Página 1 de cada categoría en orden de catIDs y el producto repetido entre categorías una sola vez
+    assert [producto["itemId"] for producto in respuesta.json()] == ["7-1", "comun", "509-1"]
+    assert int(respuesta.headers["X-Intentos"]) == len(StubRapidAPI.peticiones)
+    assert respuesta.headers["X-Cuota-Restante"] == "17"
+
+
+def test_429_en_todas_las_categorias_se_responde_con_429(recolector):
+    fijar_respuestas(lambda categoria, numero: (429, {"Retry-After": "30"}, {}))
+
+    respuesta = recolector.get("/recolectar", params={"search": "portatil"})
+
+    assert respuesta.status_code == 429
+    assert respuesta.headers["Retry-After"] == "30"
+    # El Retry-After supera el plazo: no se reintenta
+    assert len(StubRapidAPI.peticiones) == len(main.catIDs) * main.PAGINAS_POR_RONDA
+
+
+def test_5xx_en_todas_las_categorias_se_responde_con_503(recolector):
+    fijar_respuestas(lambda categoria, numero: (503, {}, {}))
+
+    respuesta = recolector.get("/recolectar", params={"search": "portatil"})
+
+    assert respuesta.status_code == 503
+    assert len(StubRapidAPI.peticiones) == len(main.catIDs) * main.PAGINAS_POR_RONDA * (limitador.MAX_REINTENTOS + 1)
+
+
+def test_una_categoria_caida_no_impide_responder_con_la_otra(recolector):
+    fijar_respuestas(lambda categoria, numero: (503, {}, {}) if categoria == 7 else (200, {}, pagina(f"509-{numero}")))
+
+    respuesta = recolector.get("/recolectar", params={"search": "portatil"})
+
+    assert respuesta.status_code == 200
+    assert [producto["itemId"] for producto in respuesta.json()][:1] == ["509-1"]
+
+
+def test_pide_las_paginas_de_la_ronda_a_la_vez(recolector):
+    def responder(categoria, numero):
+        time.sleep(0.5)
+        return 200, {}, pagina(f"{categoria}-{numero}")
+
+    fijar_respuestas(responder)
+    inicio = time.monotonic()
+    respuesta = recolector.get("/recolectar", params={"search": "portatil"})
+    duracion = time.monotonic() - inicio
+
+    assert respuesta.status_code == 200
+    # Por defecto la página 2 se pide junto con la 1: la búsqueda tarda lo que la llamada más lenta
+    pedidas = sorted((categoria, numero) for categoria, numero, _ in StubRapidAPI.peticiones)
+    assert pedidas == [(7, 1), (7, 2), (509, 1), (509, 2)]
+    assert duracion < 0.95
+    assert [producto["itemId"] for producto in respuesta.json()] == ["7-1", "509-1", "7-2", "509-2"]
+
+
+def test_modo_conservador_pide_la_pagina_siguiente_solo_si_hace_falta(recolector, monkeypatch):
+    monkeypatch.setattr(main, "PAGINAS_POR_RONDA", 1)
+    monkeypatch.setattr(main, "RESULTADOS_SUFICIENTES", 3)
+    fijar_respuestas(lambda categoria, numero: (200, {}, pagina(f"{categoria}-{numero}")))
+
+    respuesta = recolector.get("/recolectar", params={"search": "portatil"})
+
+    # Con la página 1 de cada categoría no se llega a 3 productos: se pide la 2, después de la 1
+    assert respuesta.status_code == 200
+    assert [(categoria, numero) for categoria, numero, _ in StubRapidAPI.peticiones][2:] in (
+        [(7, 2), (509, 2)], [(509, 2), (7, 2)]
+    )
+
+    StubRapidAPI.peticiones = []
+    monkeypatch.setattr(main, "RESULTADOS_SUFICIENTES", 2)
+    respuesta = recolector.get("/recolectar", params={"search": "otro portatil"})
+
+    # Con la página 1 basta: la 2 no gasta cuota
+    assert sorted(numero for _, numero, _ in StubRapidAPI.peticiones) == [1, 1]
+    assert len(respuesta.json()) == 2
+
+
+def test_productos_sin_itemid_no_se_fusionan(recolector, monkeypatch):
+    monkeypatch.setattr(main, "PAGINAS_POR_RONDA", 1)
+    monkeypatch.setattr(main, "RESULTADOS_SUFICIENTES", 4)
+    fijar_respuestas(
+        lambda categoria, numero: (200, {}, pagina(None, None, "comun") if categoria == 7 else pagina(None, "comun"))
+        if numero == 1 else (200, {}, pagina())
+    )
+
+    respuesta = recolector.get("/recolectar", params={"search": "portatil"})
+
+    # Los tres productos sin itemId se mantienen y cuentan como distintos: con 4 productos no se pide la página 2
+    ids = [producto["itemId"] for producto in respuesta.json()]
+    assert ids == [main.SIN_ID, main.SIN_ID, "comun", main.SIN_ID]
+    assert sorted(numero for _, numero, _ in StubRapidAPI.peticiones) == [1, 1]
@@ -10,7 +10,8 @@ const app = express();
 const PORT = 8000;
 
 // Middleware
-app.use(cors());
+// Se exponen al navegador las cabeceras propias de /productos (cursor de la página siguiente e informe de fuentes)
+app.use(cors({ exposedHeaders: ['X-Siguiente-Cursor', 'X-Fuentes'] }));
 app.use(morgan('dev'));
 app.use(express.json());
 
@@ -25,13 +26,53 @@ app.get('/productos', async (req, res) => {
     // Nombre del servicio backend Docker
     const backendUrl = 'http://backend:9000/productos';
 
-    // Hacer una solicitud GET al servicio backend y pasar los parámetros de consulta (axios)
+    // Hacer una solicitud GET al servicio backend y pasar los parámetros de consulta (axios),
+    // incluidos los de paginación (limit y cursor)
     const response = await axios.get(backendUrl, { params: req.query });
 
+    // Reenviar el informe de fuentes consultadas (si el backend tuvo que recolectar)
+    if (response.headers['x-fuentes']) {
+      res.set('X-Fuentes', response.headers['x-fuentes']);
+    }
+
+    // Reenviar el cursor de la página siguiente (si hay más productos)
+    if (response.headers['x-siguiente-cursor']) {
+      res.set('X-Siguiente-Cursor', response.headers['x-siguiente-cursor']);
+    }
+
     // Enviar la respuesta del servicio backend al cliente
     res.json(response.data);
 
   } catch (error) {
     res.status(500).json({ error: 'Error en el API Gateway', details: error.message });
   }
-});
\ No newline at end of file
+});
+
+// Ruta para la variante en streaming de /productos: reenvía las líneas NDJSON según las va emitiendo el backend
+app.get('/productos/stream', async (req, res) => {
+  try {
+    const backendUrl = 'http://backend:9000/productos/stream';
+
+    // Se pide la respuesta como stream para no esperar a que el backend termine
+    const response = await axios.get(backendUrl, { params: req.query, responseType: 'stream' });
+
+    res.set('Content-Type', 'application/x-ndjson');
+    response.data.pipe(res);
+
+  } catch (error) {
+    res.status(500).json({ error: 'Error en el API Gateway', details: error.message });
+  }
+});
+
+// Ruta para el historial de precios de un producto
+app.get('/productos/:id/historial_precios', async (req, res) => {
+  try {
+    const backendUrl = `http://backend:9000/productos/${encodeURIComponent(req.params.id)}/historial_precios`;
+    const response = await axios.get(backendUrl, { params: req.query });
+    res.json(response.data);
+
+  } catch (error) {
+    const status = error.response ? error.response.status : 500;
+    res.status(status).json({ error: 'Error en el API Gateway', details: error.message });
+  }
+});
@@ -1,20 +1,96 @@
+import json
+from contextlib import asynccontextmanager
+
 # Importar FasAPI y Query para definir la API y manejar parámetros de consulta
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, Query, Response
+from fastapi.responses import StreamingResponse
 
 # Importar funciones de servicios relacionadas a productos
-from app.services.productos import obtener_productos, scrapear_y_actualizar
+from app.services.productos import SERVICIOS, coleccion, obtener_productos, obtener_productos_en_streaming, scrapear_y_actualizar
+
+# Importar la gestión de los clientes HTTP compartidos
+from app.services.busqueda import LIMITE_MAXIMO, LIMITE_POR_DEFECTO
+from app.services.clientes_http import cerrar_clientes, estadisticas_pool, iniciar_clientes
+from app.services.coalescencia import estadisticas_coalescencia
+from app.services.cortocircuito import estadisticas_cortocircuitos
+from app.services.historial import coleccion_historial, obtener_historial_precios
+from app.services.indices import preparar_indices
+from app.services.metricas import instrumentar
+from app.services.trazas import instrumentar_trazas
+
+
+# Al arrancar se crean y comprueban los índices que usan la búsqueda y el historial (indices.py). Si no se
+# pueden crear (p. ej. MongoDB aún no está disponible) el servicio arranca igualmente: las búsquedas
+# funcionan, pero recorren la colección. Los clientes HTTP (con su pool de conexiones keep-alive) viven lo
+# mismo que la aplicación
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        await preparar_indices(coleccion, coleccion_historial)
+    except Exception as e:
+        print(f"No se pudieron preparar los índices: {e}")
+    await iniciar_clientes(SERVICIOS)
+    yield
+    await cerrar_clientes()
+
 
 # Crear una instancia de FastAPI
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+
+# Métricas en formato Prometheus (/metrics): duración por ruta, por fuente y de cada llamada HTTP a otro servicio
+instrumentar(app)
+
+# Trazas entre servicios: continúa la traza recibida en traceparent con un span por petición
+instrumentar_trazas(app, "backend")
 
 
 # Define un endpoint GET en la ruta /productos
 @app.get("/productos")
-async def productos(search: str = Query(..., description="Buscar productos por nombre")):
-    # Llama de forma asíncrona a la función obtener_productos con el parámetro de búsqueda 'search'
-    return await obtener_productos(search)
+async def productos(
+    response: Response,
+    search: str = Query(..., description="Buscar productos por nombre"),
+    limit: int = Query(LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO, description="Productos por página"),
+    cursor: str = Query(None, description="Cursor de la página siguiente (cabecera X-Siguiente-Cursor)"),
+):
+    # Llama de forma asíncrona a la función obtener_productos con el parámetro de búsqueda 'search'.
+    # Devuelve una página; si hay más, la cabecera X-Siguiente-Cursor trae el cursor para pedir la siguiente.
+    # Si hubo que recolectar, la cabecera X-Fuentes indica qué fuentes aportaron datos y cuánto tardaron
+    return await obtener_productos(search, response, limit, cursor)
+
+# Variante en streaming de /productos: una línea JSON (NDJSON) por registro, empezando por los productos
+# de la base de datos (en bloques) y siguiendo con los de cada fuente según terminan, hasta un registro de resumen
+@app.get("/productos/stream")
+async def productos_stream(search: str = Query(..., description="Buscar productos por nombre")):
+    async def lineas():
+        async for registro in obtener_productos_en_streaming(search):
+            yield json.dumps(registro, default=str) + "\n"
+
+    return StreamingResponse(lineas(), media_type="application/x-ndjson")
+
+# Historial de precios de un producto: mínimo, máximo y media global, por proveedor (con su último precio) y por periodo
+@app.get("/productos/{producto_id}/historial_precios")
+async def historial_precios(producto_id: str, dias: int = Query(None, ge=1, description="Limitar a los últimos días")):
+    return await obtener_historial_precios(producto_id, dias)
 
 @app.get("/scrapear_y_actualizar")
 async def scrapear_actualizar_endpoint():
     # Realiza web scraping y actualiza los productos asociados en la base de datos.
-    return await scrapear_y_actualizar()
\ No newline at end of file
+    return await scrapear_y_actualizar()
+
+
+@app.get("/estadisticas/http")
+async def estadisticas_http():
+    # Estado de los pools de conexiones (activas, inactivas y espera por conexión) por servicio
+    return estadisticas_pool()
+
+
+@app.get("/estadisticas/recolecciones")
+async def estadisticas_recolecciones():
+    # Recolecciones ejecutadas, peticiones que compartieron una recolección en curso y recolecciones activas
+    return estadisticas_coalescencia()
+
+
+@app.get("/estadisticas/fuentes")
+async def estadisticas_fuentes():
+    # Estado del cortocircuito de cada fuente (cerrado, abierto o semiabierto), tasa de fallos y llamadas rechazadas
+    return estadisticas_cortocircuitos()
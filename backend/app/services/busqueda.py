@@ -0,0 +1,107 @@
+import base64
+import json
+import os
+import re
+from bson import ObjectId
+from app.services.indices import CAMPO_TOKENS_TITULO  # Campo, mantenido por el data_processor, con las palabras del título normalizado
+
+# Modo de búsqueda: "tokens" (índice de palabras del título normalizado, con ranking por relevancia)
+# o "regex" (subcadena literal sin índice, el comportamiento anterior)
+MODO_BUSQUEDA = os.getenv("MODO_BUSQUEDA", "tokens")
+
+# Campos internos de los índices del data_processor que no se devuelven al cliente
+PROYECCION_SIN_INTERNOS = {"palabras_clave": 0, "tokens_titulo": 0}
+
+# Campo calculado con la relevancia de cada resultado (modo "tokens"). Se mantiene en los documentos que
+# devuelve la agregación para poder construir el cursor de la página siguiente, y se quita antes de responder
+CAMPO_RELEVANCIA = "_relevancia"
+
+# Productos por página de /productos si no se indica limit, y máximo que admite el servidor
+LIMITE_POR_DEFECTO = int(os.getenv("LIMITE_PRODUCTOS", "50"))
+LIMITE_MAXIMO = int(os.getenv("LIMITE_MAXIMO_PRODUCTOS", "200"))
+
+# Listas paralelas (product_id, product_price...) que esperan los clientes, derivadas de las ofertas del
+# documento. Los documentos que aún no se hayan migrado a ofertas conservan sus listas
+LISTAS_DE_OFERTAS = {
+    campo: {"$ifNull": [f"$offers.{campo}", f"${campo}"]}
+    for campo in ["product_id", "product_price", "product_url", "product_provider"]
+}
+
+
+# Normaliza el título del producto (misma normalización que el data_processor)
+def normalizar_titulo(titulo):
+    if not titulo:
+        return ""
+    titulo = titulo.lower()
+    titulo = re.sub(r'[^a-z0-9 ]', '', titulo)
+    titulo = re.sub(r'\s+', ' ', titulo).strip()
+    return titulo
+
+
+# Construye el filtro de la búsqueda. Todas las palabras deben aparecer en el título; la última
+# se compara como prefijo (anclado, por lo que también usa el índice) para admitir palabras a medio escribir.
+# El texto del usuario se escapa siempre: nunca se interpreta como expresión regular
+def filtro_busqueda(search: str):
+    tokens = normalizar_titulo(search).split()
+    if MODO_BUSQUEDA == "regex" or not tokens:
+        return {"product_title": {"$regex": re.escape(search), "$options": "i"}}
+
+    *completos, ultimo = tokens
+    condiciones = [{CAMPO_TOKENS_TITULO: {"$regex": f"^{re.escape(ultimo)}"}}]
+    if completos:
+        condiciones.insert(0, {CAMPO_TOKENS_TITULO: {"$all": completos}})
+    return {"$and": condiciones} if len(condiciones) > 1 else condiciones[0]
+
+
+# Pipeline de agregación de la búsqueda. En modo "tokens" los resultados se ordenan por relevancia:
+# proporción del título cubierta por las palabras buscadas (los títulos más ajustados primero), y a igual
+# relevancia por _id; en modo "regex", por _id. Con "despues" (relevancia y _id del último documento de la
+# página anterior, ver decodificar_cursor) se continúa tras él (paginación por clave, sin saltar documentos
+# con skip) y con "limite" se devuelven como mucho ese número: $sort seguido de $limit solo guarda en
+# memoria los "limite" primeros
+def pipeline_busqueda(search: str, limite=None, despues=None):
+    pipeline = [{"$match": filtro_busqueda(search)}]
+
+    numero_tokens = len(normalizar_titulo(search).split())
+    if MODO_BUSQUEDA != "regex" and numero_tokens:
+        pipeline.append({"$addFields": {CAMPO_RELEVANCIA: {"$divide": [
+            numero_tokens,
+            {"$max": [{"$size": {"$ifNull": [f"${CAMPO_TOKENS_TITULO}", []]}}, 1]},
+        ]}}})
+        if despues is not None:
+            relevancia, ultimo_id = despues
+            pipeline.append({"$match": {"$or": [
+                {CAMPO_RELEVANCIA: {"$lt": relevancia}},
+                {CAMPO_RELEVANCIA: relevancia, "_id": {"$gt": ultimo_id}},
+            ]} if relevancia is not None else {"_id": {"$gt": ultimo_id}}})
+        pipeline.append({"$sort": {CAMPO_RELEVANCIA: -1, "_id": 1}})
+    else:
+        if despues is not None:
+            pipeline.append({"$match": {"_id": {"$gt": despues[1]}}})
+        pipeline.append({"$sort": {"_id": 1}})
+    if limite:
+        pipeline.append({"$limit": limite})
+    pipeline.append({"$project": PROYECCION_SIN_INTERNOS})
+    pipeline.append({"$addFields": LISTAS_DE_OFERTAS})
+    return pipeline
+
+
+# Cursor opaco de la página siguiente a partir del último documento de la actual: su relevancia (si la
+# tiene) y su _id, en JSON codificado en base64 para URL
+def codificar_cursor(documento):
+    datos = {"id": str(documento["_id"])}
+    if documento.get(CAMPO_RELEVANCIA) is not None:
+        datos["r"] = documento[CAMPO_RELEVANCIA]
+    return base64.urlsafe_b64encode(json.dumps(datos, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+# Devuelve (relevancia o None, _id) de un cursor de codificar_cursor. Lanza ValueError si no es válido
+def decodificar_cursor(cursor: str):
+    try:
+        datos = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        relevancia = datos.get("r")
+        if relevancia is not None and (isinstance(relevancia, bool) or not isinstance(relevancia, (int, float))):
+            raise ValueError("relevancia no numérica")
+        return relevancia, ObjectId(datos["id"])
+    except Exception as e:
+        raise ValueError(f"Cursor no válido: {cursor}") from e
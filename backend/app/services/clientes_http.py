@@ -0,0 +1,142 @@
+# Módulo compartido: copia en api_collector (referencia), api_collector_2 y backend/app/services (esta última
+# con las importaciones desde app.services), porque cada servicio se construye solo con su directorio. Se edita
+# la copia del api_collector y se propaga con `python sincronizar_modulos.py` (desde la raíz; --comprobar falla
+# si alguna copia se ha desviado)
+import os
+import time
+import httpx
+from app.services.metricas import DURACION_UPSTREAM
+from app.services.trazas import hooks_trazas, terminar_span_fallido
+
+# Límites del pool de conexiones de cada cliente (configurables por variables de entorno)
+LIMITES_POOL = httpx.Limits(
+    max_connections=int(os.getenv("HTTP_MAX_CONEXIONES", "50")),
+    max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE", "20")),
+    keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30")),
+)
+
+# Timeout de cada petición; "pool" es lo máximo que se espera a que quede libre una conexión
+TIMEOUT_HTTP = httpx.Timeout(float(os.getenv("HTTP_TIMEOUT", "30")), pool=5.0)
+
+# Activa HTTP/2 hacia los upstreams que lo soporten (requiere el paquete h2)
+HTTP2 = os.getenv("HTTP2", "0") == "1"
+
+# Clientes compartidos, uno por upstream, creados al arrancar la aplicación
+clientes = {}
+
+# Estadísticas de espera por una conexión del pool, por cliente
+estadisticas = {}
+
+
+# Cliente httpx que termina con error el span de cliente de las peticiones que fallan sin respuesta (los
+# hooks de respuesta solo se llaman cuando llegan sus cabeceras). get, post, stream... pasan todos por send
+class ClienteTrazado(httpx.AsyncClient):
+    async def send(self, request, **kwargs):
+        try:
+            return await super().send(request, **kwargs)
+        except BaseException as e:
+            terminar_span_fallido(request, e)
+            raise
+
+
+# Crea un hook que mide cuánto espera cada petición hasta tener una conexión (nueva o reutilizada)
+def crear_hook_espera(nombre):
+    async def anotar_peticion(request):
+        inicio = time.perf_counter()
+        registrada = False
+
+        async def traza(evento, info):
+            nonlocal registrada
+            if registrada:
+                return
+            # La espera termina al empezar a abrir una conexión nueva o al enviar por una reutilizada
+            if evento == "connection.connect_tcp.started" or evento.endswith("send_request_headers.started"):
+                registrada = True
+                espera = time.perf_counter() - inicio
+                datos = estadisticas[nombre]
+                datos["peticiones"] += 1
+                datos["espera_total_s"] += espera
+                datos["espera_max_s"] = max(datos["espera_max_s"], espera)
+
+        request.extensions["trace"] = traza
+
+    return anotar_peticion
+
+
+# Marca el inicio de cada petición para medir su duración al recibir la respuesta
+async def marcar_inicio(request):
+    request.extensions["inicio_metricas"] = time.perf_counter()
+
+
+# Crea un hook que anota la duración de cada petición del cliente (hasta recibir las cabeceras de la respuesta)
+def crear_hook_duracion(nombre):
+    async def anotar_respuesta(response):
+        inicio = response.request.extensions.get("inicio_metricas")
+        if inicio is not None:
+            DURACION_UPSTREAM.observar(time.perf_counter() - inicio, fuente=nombre, estado=response.status_code)
+
+    return anotar_respuesta
+
+
+# Crea los clientes compartidos a partir de un diccionario nombre -> URL base. Con propagar_trazas=False
+# (upstreams de terceros, como RapidAPI) las peticiones no llevan la cabecera traceparent
+async def iniciar_clientes(servicios, headers=None, http2=HTTP2, propagar_trazas=True):
+    for nombre, url_base in servicios.items():
+        estadisticas[nombre] = {"peticiones": 0, "espera_total_s": 0.0, "espera_max_s": 0.0}
+        # Cada petición lleva un span de cliente y, si se propaga, la traza llega al servicio llamado
+        trazas = hooks_trazas(nombre, propagar=propagar_trazas)
+        clientes[nombre] = ClienteTrazado(
+            base_url=url_base,
+            headers=headers,
+            limits=LIMITES_POOL,
+            timeout=TIMEOUT_HTTP,
+            http2=http2,
+            event_hooks={
+                "request": [marcar_inicio, crear_hook_espera(nombre)] + trazas["request"],
+                "response": [crear_hook_duracion(nombre)] + trazas["response"],
+            },
+        )
+
+
+# Cierra los clientes compartidos (al parar la aplicación)
+async def cerrar_clientes():
+    for cliente in clientes.values():
+        await cliente.aclose()
+    clientes.clear()
+
+
+# Devuelve el cliente compartido de un upstream
+def obtener_cliente(nombre):
+    return clientes[nombre]
+
+
+# Conexiones abiertas del pool de un cliente, o None si no se pueden consultar. httpx no expone el pool
+# públicamente: se lee el de su transporte (httpcore), que es interno y puede cambiar entre versiones
+def conexiones_del_pool(cliente):
+    pool = getattr(getattr(cliente, "_transport", None), "_pool", None)
+    conexiones = getattr(pool, "connections", None)
+    try:
+        return list(conexiones) if conexiones is not None else None
+    except TypeError:
+        return None
+
+
+# Devuelve el estado del pool de cada cliente: conexiones activas e inactivas (None si no se pueden
+# consultar) y espera por conexión
+def estadisticas_pool():
+    resultado = {}
+    for nombre, cliente in clientes.items():
+        conexiones = conexiones_del_pool(cliente)
+        inactivas = None
+        if conexiones is not None:
+            inactivas = sum(1 for conexion in conexiones if getattr(conexion, "is_idle", lambda: False)())
+        datos = estadisticas[nombre]
+        resultado[nombre] = {
+            "conexiones_activas": len(conexiones) - inactivas if conexiones is not None else None,
+            "conexiones_inactivas": inactivas,
+            "max_conexiones": LIMITES_POOL.max_connections,
+            "peticiones": datos["peticiones"],
+            "espera_media_ms": round(datos["espera_total_s"] / datos["peticiones"] * 1000, 2) if datos["peticiones"] else 0.0,
+            "espera_max_ms": round(datos["espera_max_s"] * 1000, 2),
+        }
+    return resultado
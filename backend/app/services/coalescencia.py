@@ -0,0 +1,36 @@
+import asyncio
+
+# Recolecciones en curso, indexadas por término de búsqueda normalizado
+en_curso = {}
+
+# Contadores de recolecciones ejecutadas y de peticiones que se unieron a una ya en curso
+metricas = {
+    "ejecutadas": 0,
+    "coalescidas": 0,
+}
+
+
+# Normaliza el término de búsqueda para que variantes de mayúsculas y espacios compartan recolección
+def normalizar_busqueda(search: str) -> str:
+    return " ".join(search.lower().split())
+
+
+# Ejecuta funcion() una sola vez por clave: si ya hay una ejecución en curso para la misma clave,
+# el llamante espera a esa y recibe su mismo resultado (o su misma excepción)
+async def ejecutar_una_vez(clave, funcion):
+    tarea = en_curso.get(clave)
+    if tarea is None:
+        tarea = asyncio.ensure_future(funcion())
+        en_curso[clave] = tarea
+        tarea.add_done_callback(lambda _: en_curso.pop(clave, None))
+        metricas["ejecutadas"] += 1
+    else:
+        metricas["coalescidas"] += 1
+
+    # shield evita que la cancelación de un llamante cancele la recolección compartida con los demás
+    return await asyncio.shield(tarea)
+
+
+# Devuelve las métricas de coalescencia junto con el número de recolecciones en curso
+def estadisticas_coalescencia():
+    return {**metricas, "en_curso": len(en_curso)}
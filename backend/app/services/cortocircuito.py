@@ -0,0 +1,140 @@
+import os
+import time
+from collections import deque
+from app.services.metricas import contador, indicador
+
+# Número de llamadas recientes con las que se calcula la tasa de fallos de cada fuente
+VENTANA_LLAMADAS = int(os.getenv("CORTOCIRCUITO_VENTANA", "10"))
+
+# Llamadas mínimas en la ventana antes de poder abrir el circuito (evita abrirlo por un único fallo)
+MINIMO_LLAMADAS = int(os.getenv("CORTOCIRCUITO_MINIMO_LLAMADAS", "4"))
+
+# Proporción de fallos en la ventana a partir de la cual se abre el circuito
+UMBRAL_FALLOS = float(os.getenv("CORTOCIRCUITO_UMBRAL_FALLOS", "0.5"))
+
+# Tiempo (en segundos) que el circuito permanece abierto antes de dejar pasar una llamada de prueba
+ENFRIAMIENTO = float(os.getenv("CORTOCIRCUITO_ENFRIAMIENTO", "30"))
+
+CERRADO = "cerrado"
+ABIERTO = "abierto"
+SEMIABIERTO = "semiabierto"
+
+# Valor de cada estado en la métrica cortocircuito_estado
+VALORES_ESTADO = {CERRADO: 0, SEMIABIERTO: 1, ABIERTO: 2}
+
+# Métricas de los cortocircuitos en /metrics, por fuente
+ESTADO_CORTOCIRCUITO = indicador(
+    "cortocircuito_estado",
+    "Estado del cortocircuito de cada fuente (0 cerrado, 1 semiabierto, 2 abierto)",
+    ("fuente",),
+)
+APERTURAS_CORTOCIRCUITO = contador(
+    "cortocircuito_aperturas_total", "Veces que se ha abierto el cortocircuito de cada fuente", ("fuente",)
+)
+RECHAZADAS_CORTOCIRCUITO = contador(
+    "cortocircuito_rechazadas_total", "Llamadas a cada fuente rechazadas con el cortocircuito abierto", ("fuente",)
+)
+
+
+# Cortocircuito de una fuente de datos. Cerrado: las llamadas pasan y se anota su resultado.
+# Abierto: las llamadas se rechazan al instante durante el enfriamiento. Semiabierto: pasa una sola
+# llamada de prueba; si va bien el circuito se cierra y si falla vuelve a abrirse
+class Cortocircuito:
+
+    def __init__(self, nombre, ventana=VENTANA_LLAMADAS, minimo_llamadas=MINIMO_LLAMADAS, umbral_fallos=UMBRAL_FALLOS, enfriamiento=ENFRIAMIENTO):
+        self.nombre = nombre
+        self.minimo_llamadas = minimo_llamadas
+        self.umbral_fallos = umbral_fallos
+        self.enfriamiento = enfriamiento
+        self.resultados = deque(maxlen=ventana)
+        self.abierto_desde = None
+        self.prueba_en_curso = False
+        self.metricas = {"exitos": 0, "fallos": 0, "rechazadas": 0, "aperturas": 0}
+        self.cambiar_estado(CERRADO)
+        APERTURAS_CORTOCIRCUITO.incrementar(0, fuente=nombre)
+        RECHAZADAS_CORTOCIRCUITO.incrementar(0, fuente=nombre)
+
+    # Cambia el estado y lo refleja en la métrica cortocircuito_estado
+    def cambiar_estado(self, estado):
+        self.estado = estado
+        ESTADO_CORTOCIRCUITO.fijar(VALORES_ESTADO[estado], fuente=self.nombre)
+
+    # Indica si una llamada puede hacerse ahora (en semiabierto solo deja pasar la llamada de prueba)
+    def permitir(self):
+        if self.estado == ABIERTO and time.monotonic() - self.abierto_desde >= self.enfriamiento:
+            self.cambiar_estado(SEMIABIERTO)
+            self.prueba_en_curso = False
+
+        if self.estado == CERRADO:
+            return True
+        if self.estado == SEMIABIERTO and not self.prueba_en_curso:
+            self.prueba_en_curso = True
+            return True
+
+        self.metricas["rechazadas"] += 1
+        RECHAZADAS_CORTOCIRCUITO.incrementar(fuente=self.nombre)
+        return False
+
+    def registrar_exito(self):
+        self.metricas["exitos"] += 1
+        if self.estado == SEMIABIERTO:
+            self.cerrar()
+        else:
+            self.resultados.append(True)
+
+    def registrar_fallo(self):
+        self.metricas["fallos"] += 1
+        if self.estado == SEMIABIERTO:
+            self.abrir()
+            return
+        self.resultados.append(False)
+        if self.estado == CERRADO and len(self.resultados) >= self.minimo_llamadas and self.tasa_fallos() >= self.umbral_fallos:
+            self.abrir()
+
+    def tasa_fallos(self):
+        if not self.resultados:
+            return 0.0
+        return self.resultados.count(False) / len(self.resultados)
+
+    def abrir(self):
+        print(f"Cortocircuito de '{self.nombre}' abierto durante {self.enfriamiento:.0f}s (tasa de fallos {self.tasa_fallos():.0%})")
+        self.cambiar_estado(ABIERTO)
+        self.abierto_desde = time.monotonic()
+        self.prueba_en_curso = False
+        self.metricas["aperturas"] += 1
+        APERTURAS_CORTOCIRCUITO.incrementar(fuente=self.nombre)
+
+    def cerrar(self):
+        print(f"Cortocircuito de '{self.nombre}' cerrado")
+        self.cambiar_estado(CERRADO)
+        self.abierto_desde = None
+        self.prueba_en_curso = False
+        self.resultados.clear()
+
+    # Estado y contadores del cortocircuito
+    def estadisticas(self):
+        reabre_en = None
+        if self.estado == ABIERTO:
+            reabre_en = round(max(self.enfriamiento - (time.monotonic() - self.abierto_desde), 0.0), 1)
+        return {
+            **self.metricas,
+            "estado": self.estado,
+            "tasa_fallos": round(self.tasa_fallos(), 2),
+            "llamadas_en_ventana": len(self.resultados),
+            "semiabierto_en_s": reabre_en,
+        }
+
+
+# Un cortocircuito por fuente de datos, creado la primera vez que se consulta
+cortocircuitos = {}
+
+
+def obtener_cortocircuito(nombre):
+    if nombre not in cortocircuitos:
+        cortocircuitos[nombre] = Cortocircuito(nombre)
+    return cortocircuitos[nombre]
+
+
+# Estado de los cortocircuitos de todas las fuentes
+def estadisticas_cortocircuitos():
+    return {nombre: cortocircuito.estadisticas() for nombre, cortocircuito in cortocircuitos.items()}
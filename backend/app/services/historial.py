@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException
+from app.services.productos import db
+
+# Historial de precios en cubetas (lo escribe el data_processor en cada ingesta)
+coleccion_historial = db["historial_precios"]
+
+# Agregados de un grupo de cubetas: se combinan los agregados guardados en cada una, sin desplegar observaciones
+AGREGADOS_CUBETAS = {
+    "min": {"$min": "$min"},
+    "max": {"$max": "$max"},
+    "suma": {"$sum": "$suma"},
+    "observaciones": {"$sum": "$n"},
+}
+
+# Proyección final de un grupo: media = suma / número de observaciones
+PROYECCION_AGREGADOS = {
+    "_id": 0,
+    "min": 1,
+    "max": 1,
+    "observaciones": 1,
+    "media": {"$round": [{"$divide": ["$suma", "$observaciones"]}, 2]},
+}
+
+
+# Pipeline del historial de un producto: resumen global, resumen y último precio por proveedor y serie por periodo.
+# Solo lee los agregados de las cubetas, por lo que el coste crece con el número de cubetas y no de observaciones
+def pipeline_historial(producto, desde=None):
+    filtro = {"producto": producto}
+    if desde is not None:
+        # Cubetas con alguna observación posterior a "desde" (se cuentan completas)
+        filtro["ultima"] = {"$gte": desde}
+
+    return [
+        {"$match": filtro},
+        {"$project": {"observaciones": 0}},
+        {"$facet": {
+            "resumen": [
+                {"$group": {"_id": None, **AGREGADOS_CUBETAS}},
+                {"$project": PROYECCION_AGREGADOS},
+            ],
+            "por_proveedor": [
+                {"$sort": {"ultima": 1}},
+                {"$group": {"_id": "$proveedor", **AGREGADOS_CUBETAS, "ultimo": {"$last": "$ultimo"}}},
+                {"$sort": {"_id": 1}},
+                {"$project": {**PROYECCION_AGREGADOS, "proveedor": "$_id", "ultimo_precio": "$ultimo.precio", "ultima_fecha": "$ultimo.t"}},
+            ],
+            "serie": [
+                {"$group": {"_id": {"inicio": "$inicio", "proveedor": "$proveedor"}, **AGREGADOS_CUBETAS}},
+                {"$sort": {"_id.inicio": 1, "_id.proveedor": 1}},
+                {"$project": {**PROYECCION_AGREGADOS, "inicio": "$_id.inicio", "proveedor": "$_id.proveedor"}},
+            ],
+        }},
+    ]
+
+
+# Devuelve el historial de precios de un producto (por el _id de su documento), opcionalmente de los últimos días
+async def obtener_historial_precios(producto_id: str, dias: int = None):
+    try:
+        producto = ObjectId(producto_id)
+    except (InvalidId, TypeError):
+        raise HTTPException(status_code=400, detail=f"Identificador de producto no válido: {producto_id}")
+
+    desde = datetime.utcnow() - timedelta(days=dias) if dias else None
+
+    try:
+        resultado = await coleccion_historial.aggregate(pipeline_historial(producto, desde)).to_list(length=1)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al obtener el historial de precios: {str(e)}")
+
+    historial = resultado[0] if resultado else {"resumen": [], "por_proveedor": [], "serie": []}
+    if not historial["resumen"]:
+        raise HTTPException(status_code=404, detail="No hay historial de precios para el producto indicado.")
+
+    return {
+        "producto": producto_id,
+        "resumen": historial["resumen"][0],
+        "por_proveedor": historial["por_proveedor"],
+        "serie": historial["serie"],
+    }
@@ -1,7 +1,16 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from fastapi import HTTPException
-import httpx
+import asyncio
+import json
+import os
+import time
 from datetime import datetime, timedelta
+from app.services.clientes_http import obtener_cliente
+from app.services.busqueda import CAMPO_RELEVANCIA, LIMITE_MAXIMO, LIMITE_POR_DEFECTO, codificar_cursor, decodificar_cursor, pipeline_busqueda
+from app.services.coalescencia import ejecutar_una_vez, normalizar_busqueda
+from app.services.cortocircuito import obtener_cortocircuito
+from app.services.metricas import histograma
+from app.services.trazas import SPAN_CLIENTE, Span, span
 
 MONGO_URL = "mongodb://mongo_db:27017"
 
@@ -12,6 +21,53 @@ client = AsyncIOMotorClient(MONGO_URL)
 db = client["productos_db"]
 coleccion = db["productos"]
 
+# URL base de cada servicio al que llama el backend (un cliente HTTP compartido por servicio)
+SERVICIOS = {
+    "amazon": "http://api_collector:10000",
+    "aliexpress": "http://api_collector_2:10001",
+    "scraping": "http://scraper:11000",
+    "data_processor": "http://data_processor:13000",
+}
+
+# Tiempo máximo (en segundos) que se espera a cada fuente de datos
+TIMEOUTS_FUENTES = {
+    "amazon": 10.0,
+    "aliexpress": 10.0,
+    "scraping": 15.0,
+}
+
+# Tiempo máximo (en segundos) para la recolección completa: las fuentes que no hayan terminado se descartan
+PLAZO_GLOBAL_RECOLECCION = 20.0
+
+# Modo de refresco de los datos antiguos: "swr" (stale-while-revalidate: se sirven y se refrescan en
+# segundo plano) o "bloqueante" (se recolecta antes de responder, como en cualquier dato caducado)
+MODO_REFRESCO = os.getenv("MODO_REFRESCO", "swr")
+
+# Edad a partir de la cual un producto se considera obsoleto y se refresca
+TTL_SUAVE = timedelta(seconds=int(os.getenv("TTL_SUAVE", "3600")))
+
+# Edad máxima con la que un producto obsoleto todavía puede servirse sin esperar al refresco
+TTL_DURO = timedelta(seconds=int(os.getenv("TTL_DURO", "86400")))
+
+# Duración de la consulta a cada fuente, de principio a fin, según cómo terminó (ok, error, timeout, cancelada
+# o cortocircuito_abierto). Las llamadas HTTP sueltas se miden aparte, en los clientes compartidos
+DURACION_FUENTES = histograma(
+    "recoleccion_fuente_duracion_segundos",
+    "Duración de la consulta a cada fuente de datos, por fuente y estado",
+    ("fuente", "estado"),
+)
+
+# Los cortocircuitos de las fuentes se crean al importar el módulo para que sus métricas se expongan en
+# /metrics desde el arranque, antes de la primera consulta
+for fuente in TIMEOUTS_FUENTES:
+    obtener_cortocircuito(fuente)
+
+# Cabecera de la respuesta de /productos con el cursor de la página siguiente (no se envía en la última)
+CABECERA_CURSOR = "X-Siguiente-Cursor"
+
+# Refrescos lanzados en segundo plano (se guarda la referencia para que no se recolecten antes de terminar)
+refrescos_en_segundo_plano = set()
+
 # Función auxiliar para serializar los IDs de los productos
 def serializar_ids(productos):
     for producto in productos:
@@ -20,42 +76,144 @@ def serializar_ids(productos):
     return productos
 
 
-# Función auxiliar para recolectar datos y actualizar la base de datos a través de data_processor
+# Devuelve la edad de un producto según su timestamp (infinita si no tiene)
+def edad_producto(producto):
+    timestamp = producto.get("timestamp")
+    if not timestamp:
+        return timedelta.max
+
+    # Convierte el timestamp a un objeto datetime
+    timestamp = datetime.fromisoformat(timestamp) if isinstance(timestamp, str) else timestamp
+    return datetime.utcnow() - timestamp
+
+
+# Consulta una fuente con su propio timeout y devuelve sus productos junto con un informe de la consulta
+async def consultar_fuente(nombre, funcion, search):
+    # Si la fuente está fallando (cortocircuito abierto) se salta sin esperar a su timeout
+    cortocircuito = obtener_cortocircuito(nombre)
+    if not cortocircuito.permitir():
+        DURACION_FUENTES.observar(0.0, fuente=nombre, estado="cortocircuito_abierto")
+        return [], {"estado": "cortocircuito_abierto", "productos": 0, "duracion_ms": 0}
+
+    inicio = time.perf_counter()
+    # El span de la fuente cubre también los timeouts y cancelaciones (las llamadas HTTP cuelgan de él)
+    with span(f"fuente {nombre}", fuente=nombre) as span_fuente:
+        try:
+            resultado = await asyncio.wait_for(funcion(search), timeout=TIMEOUTS_FUENTES[nombre])
+            if isinstance(resultado, list):
+                estado, productos = "ok", resultado
+            else:
+                estado, productos = "error", []
+        except asyncio.TimeoutError:
+            estado, productos = "timeout", []
+        except asyncio.CancelledError:
+            # Cancelada al agotarse el plazo global: cuenta como fallo de la fuente
+            cortocircuito.registrar_fallo()
+            DURACION_FUENTES.observar(time.perf_counter() - inicio, fuente=nombre, estado="cancelada")
+            raise
+
+        span_fuente.atributos["estado"] = estado
+        if estado != "ok":
+            span_fuente.marcar_error(estado)
+
+    if estado == "ok":
+        cortocircuito.registrar_exito()
+    else:
+        cortocircuito.registrar_fallo()
+
+    duracion = time.perf_counter() - inicio
+    DURACION_FUENTES.observar(duracion, fuente=nombre, estado=estado)
+    informe = {
+        "estado": estado,
+        "productos": len(productos),
+        "duracion_ms": round(duracion * 1000),
+    }
+    return productos, informe
+
+
+# Llama a los api_colectors y al scraper de forma concurrente. Devuelve los productos de las fuentes
+# que respondieron dentro de plazo y un informe por fuente (estado, nº de productos y duración)
+async def recolectar_de_fuentes(search: str):
+    fuentes = {
+        "amazon": recolectar_desde_amazon,
+        "aliexpress": recolectar_desde_aliexpress,
+        "scraping": web_scraping,
+    }
+    tareas = {
+        nombre: asyncio.create_task(consultar_fuente(nombre, funcion, search))
+        for nombre, funcion in fuentes.items()
+    }
+    await asyncio.wait(tareas.values(), timeout=PLAZO_GLOBAL_RECOLECCION)
+
+    # Combina los resultados en el orden fijo de las fuentes
+    nuevos_productos = []
+    informe = {}
+    for nombre, tarea in tareas.items():
+        if tarea.done():
+            productos, informe[nombre] = tarea.result()
+            nuevos_productos.extend(productos)
+        else:
+            tarea.cancel()
+            informe[nombre] = {
+                "estado": "plazo_global_agotado",
+                "productos": 0,
+                "duracion_ms": round(PLAZO_GLOBAL_RECOLECCION * 1000),
+            }
+    return nuevos_productos, informe
+
+
+# Añade a la respuesta una cabecera con el informe de las fuentes consultadas
+def informar_fuentes(response, informe):
+    if response is not None and informe:
+        response.headers["X-Fuentes"] = json.dumps(informe)
+
+
+# Función auxiliar para recolectar datos y actualizar la base de datos a través de data_processor.
+# Devuelve los productos procesados (o None) y el informe de las fuentes consultadas
 async def recolectar_y_actualizar(search: str):
     try:
-        # Llama a los api_colectors y al scraper
-        productos_api_1 = await recolectar_desde_amazon(search)
-        productos_api_2 = await recolectar_desde_aliexpress(search)
-        productos_scraping = await web_scraping(search)
-
-        # Combina los resultados de ambas funciones
-        nuevos_productos = []
-        if isinstance(productos_api_1, list):
-            nuevos_productos.extend(productos_api_1)
-        if isinstance(productos_api_2, list):
-            nuevos_productos.extend(productos_api_2)
-        if isinstance(productos_scraping, list):
-            nuevos_productos.extend(productos_scraping)
+        # Llama a los api_colectors y al scraper a la vez; si alguno falla o tarda demasiado
+        # se continúa con los resultados parciales del resto
+        nuevos_productos, informe = await recolectar_de_fuentes(search)
+        print(f"Recolección para '{search}': {informe}")
 
         # Si se encontraron nuevos productos, envíalos al data_processor
         if nuevos_productos:
-            async with httpx.AsyncClient() as client:
-                # Envía los productos al data_processor para insertar o actualizar
-                response = await client.post(
-                    "http://data_processor:13000/insertar_o_actualizar_productos",
-                    json=nuevos_productos
-                )
-                response.raise_for_status()  # Lanza una excepción si la respuesta no es exitosa
-
-                # Devuelve los productos procesados desde el data_processor
-                return response.json()
-        return None
+            # Envía los productos al data_processor para insertar o actualizar
+            response = await obtener_cliente("data_processor").post(
+                "/insertar_o_actualizar_productos",
+                json=nuevos_productos
+            )
+            response.raise_for_status()  # Lanza una excepción si la respuesta no es exitosa
+
+            # Devuelve los productos procesados desde el data_processor
+            return response.json(), informe
+        return None, informe
 
     except Exception as e:
         # Maneja cualquier excepción durante la recolección o actualización
         raise HTTPException(status_code=500, detail=f"Error al recolectar o actualizar productos: {str(e)}")
 
 
+# Recolecta y actualiza compartiendo la recolección con las peticiones concurrentes del mismo término:
+# mientras haya una en curso para la búsqueda normalizada, el resto espera su resultado en lugar de lanzar otra
+async def recolectar_y_actualizar_una_vez(search: str):
+    return await ejecutar_una_vez(normalizar_busqueda(search), lambda: recolectar_y_actualizar(search))
+
+
+# Lanza en segundo plano el refresco de una búsqueda (compartido con cualquier otro en curso del mismo término)
+def programar_refresco(search: str):
+    async def refrescar():
+        try:
+            await recolectar_y_actualizar_una_vez(search)
+        except Exception as e:
+            print(f"Error al refrescar en segundo plano '{search}': {str(e)}")
+
+    tarea = asyncio.create_task(refrescar())
+    refrescos_en_segundo_plano.add(tarea)
+    tarea.add_done_callback(refrescos_en_segundo_plano.discard)
+
+
 async def scrapear_y_actualizar():
     try:
         # Llama al scraper
@@ -63,16 +221,15 @@ async def scrapear_y_actualizar():
 
         # Si se encontraron nuevos productos, envíalos al data_processor
         if nuevos_productos:
-            async with httpx.AsyncClient() as client:
-                # Envía los productos al data_processor para insertar o actualizar
-                response = await client.post(
-                    "http://data_processor:13000/insertar_o_actualizar_productos",
-                    json=nuevos_productos
-                )
-                response.raise_for_status()  # Lanza una excepción si la respuesta no es exitosa
-
-                # Devuelve los productos procesados desde el data_processor
-                return response.json()
+            # Envía los productos al data_processor para insertar o actualizar
+            response = await obtener_cliente("data_processor").post(
+                "/insertar_o_actualizar_productos",
+                json=nuevos_productos
+            )
+            response.raise_for_status()  # Lanza una excepción si la respuesta no es exitosa
+
+            # Devuelve los productos procesados desde el data_processor
+            return response.json()
         return None
 
     except Exception as e:
@@ -80,45 +237,98 @@ async def scrapear_y_actualizar():
         raise HTTPException(status_code=500, detail=f"Error al scrapear o actualizar productos: {str(e)}")
     
 
-# Define una función asíncrona para obtener productos filtrados por búsqueda de la base de datos + otras fuentes
-async def obtener_productos(search: str):
+# Separa los productos de la base de datos según su edad. Devuelve los que pueden servirse (los obsoletos
+# marcados con "obsoleto"), si hay alguno obsoleto y si hay alguno caducado (que obliga a recolectar)
+def clasificar_por_edad(productos_en_db):
+    productos_servibles = []
+    hay_obsoletos = False
+    hay_caducados = False
+    for producto in productos_en_db:
+        edad = edad_producto(producto)
+
+        if edad < TTL_SUAVE:
+            # Producto reciente: se sirve tal cual
+            productos_servibles.append(producto)
+        elif edad < TTL_DURO and MODO_REFRESCO == "swr":
+            # Producto obsoleto pero dentro del límite: se sirve marcado y se refresca en segundo plano
+            producto["obsoleto"] = True
+            productos_servibles.append(producto)
+            hay_obsoletos = True
+        else:
+            # Producto caducado (o sin timestamp): hay que recolectar nuevos datos antes de responder
+            hay_caducados = True
+    return productos_servibles, hay_obsoletos, hay_caducados
+
+
+# Lee de la base de datos una página de la búsqueda: como mucho "limite" productos tras el cursor "despues"
+# (None = primera página). Se pide uno más para saber si hay página siguiente. Devuelve los productos y el
+# cursor de la página siguiente (None si es la última)
+async def leer_pagina(search: str, limite: int, despues=None):
+    with span("mongo aggregate productos", SPAN_CLIENTE, busqueda=search, limite=limite):
+        productos_en_db = await coleccion.aggregate(pipeline_busqueda(search, limite + 1, despues)).to_list(length=limite + 1)
+    siguiente = codificar_cursor(productos_en_db[limite - 1]) if len(productos_en_db) > limite else None
+    productos_en_db = productos_en_db[:limite]
+    for producto in productos_en_db:
+        producto.pop(CAMPO_RELEVANCIA, None)
+    return productos_en_db, siguiente
+
+
+# Añade a la respuesta la cabecera con el cursor de la página siguiente (si la hay)
+def informar_cursor(response, siguiente):
+    if response is not None and siguiente:
+        response.headers[CABECERA_CURSOR] = siguiente
+
+
+# Define una función asíncrona para obtener productos filtrados por búsqueda de la base de datos + otras fuentes.
+# Devuelve una página de como mucho "limite" productos (hasta LIMITE_MAXIMO); el cursor de la siguiente va en la
+# cabecera X-Siguiente-Cursor y se pasa como "cursor" para pedirla
+async def obtener_productos(search: str, response=None, limite: int = LIMITE_POR_DEFECTO, cursor: str = None):
+    # Un cursor que no es válido es un error del cliente
     try:
-        # Busca los productos en la base de datos
-        productos_en_db = await coleccion.find({
-            "product_title": {"$regex": search, "$options": "i"}
-        }).to_list(length=None)
+        despues = decodificar_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor de paginación no válido.")
+    limite = max(1, min(limite, LIMITE_MAXIMO))
+
+    try:
+        # Busca la página de productos en la base de datos usando el índice de palabras del título
+        productos_en_db, siguiente = await leer_pagina(search, limite, despues)
 
         # Si se encuentran productos en la base de datos
         if productos_en_db:
-            productos_actualizados = []
-            for producto in productos_en_db:
-                timestamp = producto.get("timestamp")
-
-                if timestamp:
-                    # Convierte el timestamp a un objeto datetime
-                    timestamp = datetime.fromisoformat(timestamp) if isinstance(timestamp, str) else timestamp
-
-                    # Comprueba si el timestamp es de hace más de 1 hora
-                    if datetime.utcnow() - timestamp < timedelta(hours=1):
-                        productos_actualizados.append(producto)
-                    else:
-                        # Si el timestamp es antiguo, recolecta nuevos datos
-                        nuevos_productos = await recolectar_y_actualizar(search)
-                        if nuevos_productos:
-                            return serializar_ids(nuevos_productos)
-                else:
-                    # Si no hay timestamp, recolecta nuevos datos
-                    nuevos_productos = await recolectar_y_actualizar(search)
-                    if nuevos_productos:
-                        return serializar_ids(nuevos_productos)
+            productos_servibles, hay_obsoletos, hay_caducados = clasificar_por_edad(productos_en_db)
 
+            # Se recolecta como mucho una vez por búsqueda, aunque haya varios productos antiguos. Los productos
+            # recolectados ya están guardados, así que se vuelve a leer la misma página
+            if hay_caducados:
+                nuevos_productos, informe = await recolectar_y_actualizar_una_vez(search)
+                informar_fuentes(response, informe)
+                if nuevos_productos:
+                    productos_en_db, siguiente = await leer_pagina(search, limite, despues)
+                    productos_servibles, _, _ = clasificar_por_edad(productos_en_db)
+            elif hay_obsoletos:
+                programar_refresco(search)
+                if response is not None:
+                    response.headers["X-Datos-Obsoletos"] = "1"
+
+            informar_cursor(response, siguiente)
             # Serializamos el "_id"
-            return serializar_ids(productos_actualizados)
-            
+            return serializar_ids(productos_servibles)
+
+        # Después de la última página no quedan productos (no se recolecta)
+        if despues is not None:
+            return []
+
         # Si no se encuentran productos en la base de datos, recolecta nuevos datos
-        nuevos_productos = await recolectar_y_actualizar(search)
+        nuevos_productos, informe = await recolectar_y_actualizar_una_vez(search)
+        informar_fuentes(response, informe)
         if nuevos_productos:
-            return serializar_ids(nuevos_productos)
+            productos_en_db, siguiente = await leer_pagina(search, limite)
+            if productos_en_db:
+                informar_cursor(response, siguiente)
+                return serializar_ids(productos_en_db)
+            # Ninguno de los recolectados contiene todas las palabras buscadas: se devuelven sin paginar más
+            return serializar_ids(nuevos_productos[:limite])
 
         # Si no se encuentra información, devuelve un error
         raise HTTPException(status_code=404, detail="No se encontraron productos para la búsqueda proporcionada.")
@@ -128,19 +338,139 @@ async def obtener_productos(search: str):
         raise HTTPException(status_code=500, detail=f"Error al obtener productos: {str(e)}")
 
 
+# Recolecta de las fuentes y envía al data_processor los productos de cada una en cuanto termina, en lugar de
+# esperar a todas. Cada fuente procesada se comunica con publicar(registro). Devuelve lo mismo que
+# recolectar_y_actualizar (para poder compartir la recolección con las peticiones sin streaming)
+async def recolectar_y_actualizar_por_fuente(search: str, publicar):
+    fuentes = {
+        "amazon": recolectar_desde_amazon,
+        "aliexpress": recolectar_desde_aliexpress,
+        "scraping": web_scraping,
+    }
+    tareas = {
+        asyncio.create_task(consultar_fuente(nombre, funcion, search)): nombre
+        for nombre, funcion in fuentes.items()
+    }
+    limite = time.monotonic() + PLAZO_GLOBAL_RECOLECCION
+    pendientes = set(tareas)
+    informe = {}
+    # Documentos procesados por _id: si varias fuentes actualizan el mismo documento se queda la última versión
+    procesados = {}
+
+    try:
+        while pendientes and time.monotonic() < limite:
+            terminadas, pendientes = await asyncio.wait(
+                pendientes, timeout=limite - time.monotonic(), return_when=asyncio.FIRST_COMPLETED
+            )
+            for tarea in terminadas:
+                nombre = tareas[tarea]
+                productos, informe[nombre] = tarea.result()
+                documentos = []
+                if productos:
+                    response = await obtener_cliente("data_processor").post("/insertar_o_actualizar_productos", json=productos)
+                    response.raise_for_status()
+                    documentos = serializar_ids(response.json())
+                    procesados.update((documento["_id"], documento) for documento in documentos)
+                publicar({"tipo": "fuente", "fuente": nombre, **informe[nombre], "productos": documentos})
+    finally:
+        for tarea in pendientes:
+            tarea.cancel()
+            informe[tareas[tarea]] = {
+                "estado": "plazo_global_agotado",
+                "productos": 0,
+                "duracion_ms": round(PLAZO_GLOBAL_RECOLECCION * 1000),
+            }
+
+    print(f"Recolección por fuente para '{search}': {informe}")
+    return (list(procesados.values()) or None), informe
+
+
+# Variante en streaming de obtener_productos: genera registros NDJSON a medida que hay datos.
+# Primero los productos de la base de datos, en bloques de como mucho LIMITE_MAXIMO ({"tipo": "cache"}; siempre
+# al menos uno), después, si hay que recolectar, los productos procesados de cada fuente según va terminando
+# ({"tipo": "fuente"}; un documento con el mismo _id que uno anterior lo reemplaza) y por último un resumen
+# ({"tipo": "resumen"}). Los errores se emiten como {"tipo": "error"}. La base de datos se recorre con un cursor
+# por lotes, de modo que en memoria solo hay un bloque aunque la búsqueda coincida con muchos productos
+async def obtener_productos_en_streaming(search: str):
+    inicio = time.perf_counter()
+    resumen = {"tipo": "resumen", "productos_cache": 0, "productos_recolectados": 0, "fuentes": {}, "refresco_en_segundo_plano": False}
+    try:
+        hay_productos = hay_obsoletos = hay_caducados = False
+
+        # Registro con los productos servibles de un bloque; anota si había obsoletos o caducados
+        def registro_cache(bloque):
+            nonlocal hay_obsoletos, hay_caducados
+            productos_servibles, obsoletos, caducados = clasificar_por_edad(bloque)
+            hay_obsoletos = hay_obsoletos or obsoletos
+            hay_caducados = hay_caducados or caducados
+            resumen["productos_cache"] += len(productos_servibles)
+            return {"tipo": "cache", "productos": serializar_ids(productos_servibles)}
+
+        # El span de la consulta dura lo que el recorrido del cursor (incluye el envío de cada bloque)
+        consulta = Span.hijo_del_actual("mongo aggregate productos", SPAN_CLIENTE, {"busqueda": search})
+        try:
+            bloque = []
+            async for producto in coleccion.aggregate(pipeline_busqueda(search), batchSize=LIMITE_MAXIMO):
+                producto.pop(CAMPO_RELEVANCIA, None)
+                bloque.append(producto)
+                hay_productos = True
+                if len(bloque) == LIMITE_MAXIMO:
+                    yield registro_cache(bloque)
+                    bloque = []
+            if bloque or not hay_productos:
+                yield registro_cache(bloque)
+        finally:
+            consulta.terminar()
+
+        if not hay_productos or hay_caducados:
+            cola = asyncio.Queue()
+            recoleccion = asyncio.ensure_future(ejecutar_una_vez(
+                normalizar_busqueda(search),
+                lambda: recolectar_y_actualizar_por_fuente(search, cola.put_nowait),
+            ))
+            publicados = 0
+
+            # Se emiten los registros de cada fuente hasta que termina la recolección
+            while True:
+                siguiente = asyncio.ensure_future(cola.get())
+                await asyncio.wait({siguiente, recoleccion}, return_when=asyncio.FIRST_COMPLETED)
+                if not siguiente.done():
+                    siguiente.cancel()
+                    break
+                publicados += 1
+                yield siguiente.result()
+            while not cola.empty():
+                publicados += 1
+                yield cola.get_nowait()
+
+            nuevos_productos, informe = recoleccion.result()
+            resumen["fuentes"] = informe
+            resumen["productos_recolectados"] = len(nuevos_productos or [])
+            if not publicados and nuevos_productos:
+                # La recolección la inició otra petición: se emite su resultado completo de una vez
+                yield {"tipo": "fuente", "fuente": "compartida", "productos": serializar_ids(nuevos_productos)}
+        elif hay_obsoletos:
+            programar_refresco(search)
+            resumen["refresco_en_segundo_plano"] = True
+
+    except Exception as e:
+        yield {"tipo": "error", "detalle": f"Error al obtener productos: {str(e)}"}
+
+    resumen["duracion_ms"] = round((time.perf_counter() - inicio) * 1000)
+    yield resumen
+
+
 # Define una función asíncrona para recolectar datos desde Amazon
 async def recolectar_desde_amazon(search: str):
     try:
-        # Crea un cliente HTTP asíncrono
-        async with httpx.AsyncClient() as client:
-            # Hace una petición GET al servicio externo "api_collector"
-            response = await client.get("http://api_collector:10000/recolectar", params={"search": search})
+        # Hace una petición GET al servicio externo "api_collector" con el cliente compartido
+        response = await obtener_cliente("amazon").get("/recolectar", params={"search": search})
 
-            # Lanza una excepción si la respuesta no es exitosa
-            response.raise_for_status()
+        # Lanza una excepción si la respuesta no es exitosa
+        response.raise_for_status()
 
-            # Devuelve los datos recolectados en formato JSON
-            return response.json()
+        # Devuelve los datos recolectados en formato JSON
+        return response.json()
         
     except Exception as e:
         # Maneja cualquier excepción que ocurra durante la recolección de datos
@@ -150,16 +480,14 @@ async def recolectar_desde_amazon(search: str):
 # Define una función asíncrona para recolectar datos desde Aliexpress
 async def recolectar_desde_aliexpress(search: str):
     try:
-        # Crea un cliente HTTP asíncrono
-        async with httpx.AsyncClient() as client:
-            # Hace una petición GET al servicio externo "api_collector_2"
-            response = await client.get("http://api_collector_2:10001/recolectar", params={"search": search})
+        # Hace una petición GET al servicio externo "api_collector_2" con el cliente compartido
+        response = await obtener_cliente("aliexpress").get("/recolectar", params={"search": search})
 
-            # Lanza una excepción si la respuesta no es exitosa
-            response.raise_for_status()
+        # Lanza una excepción si la respuesta no es exitosa
+        response.raise_for_status()
 
-            # Devuelve los datos recolectados en formato JSON
-            return response.json()
+        # Devuelve los datos recolectados en formato JSON
+        return response.json()
         
     except Exception as e:
         # Maneja cualquier excepción que ocurra durante la recolección de datos
@@ -169,10 +497,9 @@ async def recolectar_desde_aliexpress(search: str):
 # Define una función asíncrona para scrapear datos desde un sitio web de prueba
 async def web_scraping(search: str = None):
     try:
-        async with httpx.AsyncClient() as client:
-            params = {"search": search} if search else {}
-            response = await client.get("http://scraper:11000/scrapear", params=params)
-            response.raise_for_status()
-            return response.json()
+        params = {"search": search} if search else {}
+        response = await obtener_cliente("scraping").get("/scrapear", params=params)
+        response.raise_for_status()
+        return response.json()
     except Exception as e:
         return {"error": f"Fallo al scrapear datos: {str(e)}"}
\ No newline at end of file
@@ -0,0 +1,261 @@
+# Módulo compartido: copia idéntica en data_processor (referencia), backend/app/services, api_collector,
+# api_collector_2 y scraper, porque cada servicio se construye solo con su directorio. Se edita la copia del
+# data_processor y se propaga con `python sincronizar_modulos.py` (desde la raíz; --comprobar falla si
+# alguna copia se ha desviado)
+import atexit
+import json
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from fastapi import Request
+
+# Directorio donde cada servicio escribe sus spans: un fichero NDJSON por servicio con una petición de
+# exportación OTLP/JSON por línea (el formato del exportador de ficheros del OpenTelemetry Collector).
+# Vacío = los spans se crean y se propagan entre servicios, pero no se guardan
+TRAZAS_DIRECTORIO = os.getenv("TRAZAS_DIRECTORIO", "")
+
+# Cabecera W3C Trace Context con la que se propaga la traza: 00-<trace id>-<span id del padre>-<flags>
+CABECERA_TRAZA = "traceparent"
+PATRON_CABECERA = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+# Tipos de span y códigos de estado de OTLP
+SPAN_INTERNO, SPAN_SERVIDOR, SPAN_CLIENTE = 1, 2, 3
+ESTADO_OK, ESTADO_ERROR = 1, 2
+
+# Nombre del servicio que aparece en los spans (lo fija instrumentar_trazas)
+servicio = "desconocido"
+
+# Span activo en la tarea actual (las tareas creadas con asyncio.create_task heredan el de su creadora)
+span_actual = ContextVar("span_actual", default=None)
+
+# Spans terminados pendientes de exportar. Los escribe un hilo (arrancado con el primer span) para que la
+# escritura en disco no bloquee el bucle de eventos; None le indica que termine
+cola_trazas = queue.SimpleQueue()
+hilo_trazas = None
+cerrojo_hilo = threading.Lock()
+
+# Segundos que se espera al salir a que el hilo escriba los spans pendientes
+ESPERA_VACIADO = 5.0
+
+
+class Span:
+    def __init__(self, nombre, tipo=SPAN_INTERNO, trace_id=None, padre_id=None, atributos=None):
+        self.nombre = nombre
+        self.tipo = tipo
+        self.trace_id = trace_id or secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.padre_id = padre_id
+        self.atributos = dict(atributos or {})
+        self.inicio_ns = time.time_ns()
+        self.fin_ns = None
+        self.estado = ESTADO_OK
+        self.mensaje_estado = ""
+
+    # Span hijo del span activo (o raíz de una traza nueva si no hay ninguno)
+    @classmethod
+    def hijo_del_actual(cls, nombre, tipo=SPAN_INTERNO, atributos=None):
+        padre = span_actual.get()
+        if padre is None:
+            return cls(nombre, tipo, atributos=atributos)
+        return cls(nombre, tipo, padre.trace_id, padre.span_id, atributos)
+
+    # Valor de la cabecera traceparent para que el siguiente servicio cuelgue sus spans de este
+    def cabecera(self):
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def marcar_error(self, mensaje):
+        self.estado = ESTADO_ERROR
+        self.mensaje_estado = str(mensaje)
+
+    def terminar(self):
+        if self.fin_ns is None:
+            self.fin_ns = time.time_ns()
+            exportar(self)
+
+    # Span en formato OTLP/JSON (ids en hexadecimal y tiempos en nanosegundos como cadenas)
+    def como_otlp(self):
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.nombre,
+            "kind": self.tipo,
+            "startTimeUnixNano": str(self.inicio_ns),
+            "endTimeUnixNano": str(self.fin_ns),
+            "attributes": [atributo_otlp(clave, valor) for clave, valor in self.atributos.items()],
+            "status": {"code": self.estado, "message": self.mensaje_estado} if self.mensaje_estado else {"code": self.estado},
+        }
+        if self.padre_id:
+            span["parentSpanId"] = self.padre_id
+        return span
+
+
+def atributo_otlp(clave, valor):
+    if isinstance(valor, bool):
+        return {"key": clave, "value": {"boolValue": valor}}
+    if isinstance(valor, int):
+        return {"key": clave, "value": {"intValue": str(valor)}}
+    if isinstance(valor, float):
+        return {"key": clave, "value": {"doubleValue": valor}}
+    return {"key": clave, "value": {"stringValue": str(valor)}}
+
+
+# Encola el span terminado para que el hilo exportador lo escriba en el fichero del servicio
+def exportar(span):
+    global hilo_trazas
+    if not TRAZAS_DIRECTORIO:
+        return
+    if hilo_trazas is None:
+        with cerrojo_hilo:
+            if hilo_trazas is None:
+                hilo_trazas = threading.Thread(target=escribir_trazas, name="exportador-trazas", daemon=True)
+                hilo_trazas.start()
+                atexit.register(vaciar_trazas)
+    cola_trazas.put(span)
+
+
+# Línea del fichero de exportación con un span: una petición de exportación OTLP/JSON
+def linea_otlp(span):
+    peticion = {"resourceSpans": [{
+        "resource": {"attributes": [atributo_otlp("service.name", servicio)]},
+        "scopeSpans": [{"scope": {"name": "trazas"}, "spans": [span.como_otlp()]}],
+    }]}
+    return json.dumps(peticion, ensure_ascii=False) + "\n"
+
+
+# Bucle del hilo exportador: espera un span, recoge los que se hayan acumulado mientras tanto y los escribe
+# de una vez (una línea por span) hasta recibir None. Si el fichero no se puede abrir, los spans se descartan
+def escribir_trazas():
+    try:
+        Path(TRAZAS_DIRECTORIO).mkdir(parents=True, exist_ok=True)
+        archivo = open(Path(TRAZAS_DIRECTORIO) / f"{servicio}.ndjson", "a", encoding="utf-8")
+    except OSError as e:
+        print(f"No se pueden exportar spans en {TRAZAS_DIRECTORIO}: {e}")
+        archivo = None
+
+    terminar = False
+    while not terminar:
+        spans = [cola_trazas.get()]
+        while True:
+            try:
+                spans.append(cola_trazas.get_nowait())
+            except queue.Empty:
+                break
+        terminar = None in spans
+        if archivo is None:
+            continue
+        try:
+            archivo.write("".join(linea_otlp(span) for span in spans if span is not None))
+            archivo.flush()
+        except OSError as e:
+            print(f"No se pudieron exportar {len(spans)} spans: {e}")
+    if archivo is not None:
+        archivo.close()
+
+
+# Pide al hilo exportador que escriba los spans pendientes y termine (se registra con atexit)
+def vaciar_trazas():
+    global hilo_trazas
+    with cerrojo_hilo:
+        if hilo_trazas is None:
+            return
+        cola_trazas.put(None)
+        hilo_trazas.join(ESPERA_VACIADO)
+        hilo_trazas = None
+
+
+# Devuelve (trace id, span id del padre) de una cabecera traceparent válida, o None
+def leer_cabecera(valor):
+    coincidencia = PATRON_CABECERA.match(valor or "")
+    return coincidencia.groups() if coincidencia else None
+
+
+# Span interno alrededor de un bloque: hijo del span activo y activo mientras dura el bloque
+@contextmanager
+def span(nombre, tipo=SPAN_INTERNO, **atributos):
+    actual = Span.hijo_del_actual(nombre, tipo, atributos)
+    token = span_actual.set(actual)
+    try:
+        yield actual
+    except BaseException as e:
+        actual.marcar_error(repr(e))
+        raise
+    finally:
+        span_actual.reset(token)
+        actual.terminar()
+
+
+# Hooks de httpx que crean un span de cliente por petición y propagan la traza en la cabecera traceparent.
+# Con propagar=False (APIs de terceros) se registra el span pero no se envía la cabecera, para no exponer
+# los identificadores internos de la traza fuera de nuestros servicios. El span termina al recibir las
+# cabeceras de la respuesta; si la petición falla antes (timeout, conexión rechazada...) httpx no llama a
+# los hooks de respuesta y hay que terminarlo con terminar_span_fallido
+def hooks_trazas(nombre, propagar=True):
+    async def iniciar_span_cliente(request):
+        cliente = Span.hijo_del_actual(
+            f"{request.method} {nombre}", SPAN_CLIENTE, {"http.method": request.method, "http.url": str(request.url)}
+        )
+        if propagar:
+            request.headers[CABECERA_TRAZA] = cliente.cabecera()
+        request.extensions["span_traza"] = cliente
+
+    async def terminar_span_cliente(response):
+        cliente = response.request.extensions.get("span_traza")
+        if cliente is not None:
+            cliente.atributos["http.status_code"] = response.status_code
+            if response.status_code >= 500:
+                cliente.marcar_error(f"HTTP {response.status_code}")
+            cliente.terminar()
+
+    return {"request": [iniciar_span_cliente], "response": [terminar_span_cliente]}
+
+
+# Termina con error el span de cliente de una petición que no llegó a tener respuesta
+def terminar_span_fallido(request, error):
+    cliente = request.extensions.get("span_traza")
+    if cliente is not None:
+        cliente.marcar_error(repr(error))
+        cliente.terminar()
+
+
+# Añade a la aplicación el middleware que continúa la traza recibida en traceparent (o empieza una) con un
+# span de servidor por petición, y devuelve el id de la traza en la cabecera X-Trace-Id. En las respuestas
+# en streaming el span termina cuando empiezan a enviarse
+def instrumentar_trazas(app, nombre_servicio):
+    global servicio
+    servicio = nombre_servicio
+
+    @app.middleware("http")
+    async def trazar_peticion(request: Request, call_next):
+        remoto = leer_cabecera(request.headers.get(CABECERA_TRAZA))
+        trace_id, padre_id = remoto or (None, None)
+        servidor = Span(
+            f"{request.method} {request.url.path}", SPAN_SERVIDOR, trace_id, padre_id,
+            {"http.method": request.method, "http.target": request.url.path},
+        )
+        token = span_actual.set(servidor)
+        try:
+            respuesta = await call_next(request)
+        except BaseException as e:
+            servidor.marcar_error(repr(e))
+            raise
+        finally:
+            span_actual.reset(token)
+            # Una vez resuelta la ruta se usa su plantilla como nombre (p. ej. GET /productos/{producto_id}/historial_precios)
+            ruta = request.scope.get("route")
+            if ruta is not None:
+                servidor.nombre = f"{request.method} {ruta.path}"
+            if servidor.fin_ns is None and servidor.estado == ESTADO_ERROR:
+                servidor.terminar()
+
+        servidor.atributos["http.status_code"] = respuesta.status_code
+        if respuesta.status_code >= 500:
+            servidor.marcar_error(f"HTTP {respuesta.status_code}")
+        servidor.terminar()
+        respuesta.headers["X-Trace-Id"] = servidor.trace_id
+        return respuesta
@@ -0,0 +1,82 @@
+"""Benchmark de latencia de búsqueda: $regex sin anclar frente al índice de tokens del título.
+
+Necesita un mongod accesible (por defecto mongodb://localhost:27017). Usa una base de datos
+propia (productos_bench) que se vacía en cada tamaño.
+
+Uso (desde el directorio backend):
+    python -m benchmarks.bench_busqueda --tamanos 10000 100000 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+from pymongo import MongoClient
+from app.services import busqueda
+
+# Términos buscados en cada medición (marcas, modelos y palabras a medio escribir)
+BUSQUEDAS = ["xiaomi", "redmi note 13", "iphone", "galaxy a", "vivobook 15", "poco x", "redm", "lenovo ideapad"]
+
+# Repeticiones de cada búsqueda por modo
+REPETICIONES = 5
+
+MARCAS = [
+    "Xiaomi Redmi Note", "Xiaomi POCO X", "Samsung Galaxy A", "Apple iPhone", "Realme",
+    "ASUS VivoBook", "Lenovo IdeaPad", "Acer Aspire", "HP Pavilion", "Motorola Moto G",
+]
+
+
+# Genera un documento sintético con los campos que mantiene el data_processor
+def generar_documento(aleatorio):
+    titulo = (
+        f"{aleatorio.choice(MARCAS)} {aleatorio.randint(1, 40)} "
+        f"{aleatorio.choice(['', 'Pro', 'Lite', '5G'])} {aleatorio.choice([4, 8, 16])}GB+{aleatorio.choice([128, 256])}GB"
+    )
+    return {
+        "product_title": titulo,
+        "tokens_titulo": busqueda.normalizar_titulo(titulo).split(),
+        "product_price": [aleatorio.uniform(50, 1500)],
+    }
+
+
+# Ejecuta cada búsqueda varias veces con el modo indicado y devuelve las latencias en milisegundos
+def medir(coleccion, modo):
+    busqueda.MODO_BUSQUEDA = modo
+    latencias = []
+    for termino in BUSQUEDAS:
+        for _ in range(REPETICIONES):
+            inicio = time.perf_counter()
+            list(coleccion.aggregate(busqueda.pipeline_busqueda(termino)))
+            latencias.append((time.perf_counter() - inicio) * 1000)
+    return latencias
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--mongo-url", default=os.getenv("MONGO_URL", "mongodb://localhost:27017"))
+    args = parser.parse_args()
+
+    coleccion = MongoClient(args.mongo_url)["productos_bench"]["productos"]
+    aleatorio = random.Random(0)
+
+    print(f"{'documentos':>11} {'regex p50 ms':>13} {'regex p99 ms':>13} {'tokens p50 ms':>14} {'tokens p99 ms':>14}")
+    for tamano in args.tamanos:
+        coleccion.drop()
+        for inicio in range(0, tamano, 10000):
+            coleccion.insert_many([generar_documento(aleatorio) for _ in range(min(10000, tamano - inicio))])
+        coleccion.create_index(busqueda.CAMPO_TOKENS_TITULO)
+
+        regex = sorted(medir(coleccion, "regex"))
+        tokens = sorted(medir(coleccion, "tokens"))
+        p99 = lambda valores: valores[min(len(valores) - 1, int(len(valores) * 0.99))]
+        print(
+            f"{tamano:>11} {statistics.median(regex):>13.2f} {p99(regex):>13.2f} "
+            f"{statistics.median(tokens):>14.2f} {p99(tokens):>14.2f}"
+        )
+
+    coleccion.drop()
+
+
+if __name__ == "__main__":
+    main()
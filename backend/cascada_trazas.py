@@ -0,0 +1,110 @@
+"""Muestra en cascada los spans de una traza exportados por los servicios (ficheros OTLP/JSON de TRAZAS_DIRECTORIO).
+
+Sin id de traza, lista las últimas trazas (por su span raíz). El id de la traza de una petición se
+devuelve en la cabecera X-Trace-Id.
+
+Uso:
+    python cascada_trazas.py --directorio ../trazas                 # últimas trazas
+    python cascada_trazas.py 4bf92f3577b34da6a3ce929d0e0e4736 --directorio ../trazas
+"""
+import argparse
+import json
+import os
+from pathlib import Path
+
+# Ancho (en caracteres) de la barra de tiempo de la cascada
+ANCHO_BARRA = 50
+
+# Número de trazas que se listan sin id
+TRAZAS_LISTADAS = 20
+
+
+# Lee todos los spans de los ficheros del directorio, con el servicio que los exportó
+def leer_spans(directorio):
+    spans = []
+    for ruta in sorted(Path(directorio).glob("*.ndjson")):
+        with open(ruta, encoding="utf-8") as archivo:
+            for linea in archivo:
+                if not linea.strip():
+                    continue
+                for recurso in json.loads(linea).get("resourceSpans", []):
+                    atributos = {a["key"]: a["value"] for a in recurso.get("resource", {}).get("attributes", [])}
+                    servicio = atributos.get("service.name", {}).get("stringValue", ruta.stem)
+                    for alcance in recurso.get("scopeSpans", []):
+                        for span in alcance.get("spans", []):
+                            spans.append(dict(span, servicio=servicio))
+    return spans
+
+
+def inicio(span):
+    return int(span["startTimeUnixNano"])
+
+
+def duracion_ms(span):
+    return (int(span["endTimeUnixNano"]) - inicio(span)) / 1e6
+
+
+# Spans en orden de cascada: cada uno seguido de sus hijos (por orden de inicio), con su profundidad.
+# Los spans cuyo padre no se exportó (p. ej. una llamada que falló antes de responder) se cuelgan de la raíz
+def ordenar_en_cascada(spans):
+    ids = {span["spanId"] for span in spans}
+    hijos = {}
+    raices = []
+    for span in sorted(spans, key=inicio):
+        padre = span.get("parentSpanId")
+        if padre and padre in ids:
+            hijos.setdefault(padre, []).append(span)
+        else:
+            raices.append(span)
+
+    ordenados = []
+
+    def visitar(span, profundidad):
+        ordenados.append((span, profundidad))
+        for hijo in hijos.get(span["spanId"], []):
+            visitar(hijo, profundidad + 1)
+
+    for raiz in raices:
+        visitar(raiz, 0)
+    return ordenados
+
+
+def imprimir_cascada(spans):
+    origen = min(inicio(span) for span in spans)
+    total_ms = max(int(span["endTimeUnixNano"]) for span in spans) / 1e6 - origen / 1e6 or 1.0
+    print(f"Traza {spans[0]['traceId']}: {len(spans)} spans, {total_ms:.1f} ms")
+    for span, profundidad in ordenar_en_cascada(spans):
+        desde = (inicio(span) - origen) / 1e6
+        columna = int(desde / total_ms * ANCHO_BARRA)
+        largo = max(int(duracion_ms(span) / total_ms * ANCHO_BARRA), 1)
+        barra = " " * columna + "█" * min(largo, ANCHO_BARRA - columna)
+        error = " ERROR" if span.get("status", {}).get("code") == 2 else ""
+        nombre = "  " * profundidad + f"{span['servicio']}: {span['name']}"
+        print(f"{nombre[:60]:<60} |{barra:<{ANCHO_BARRA}}| {desde:>8.1f} +{duracion_ms(span):>8.1f} ms{error}")
+
+
+def listar_trazas(spans):
+    raices = sorted((span for span in spans if not span.get("parentSpanId")), key=inicio, reverse=True)
+    for span in raices[:TRAZAS_LISTADAS]:
+        print(f"{span['traceId']}  {span['servicio']}: {span['name']}  {duracion_ms(span):.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("trace_id", nargs="?")
+    parser.add_argument("--directorio", default=os.getenv("TRAZAS_DIRECTORIO", "trazas"))
+    args = parser.parse_args()
+
+    spans = leer_spans(args.directorio)
+    if not args.trace_id:
+        listar_trazas(spans)
+        return
+    spans = [span for span in spans if span["traceId"] == args.trace_id]
+    if not spans:
+        print(f"No hay spans de la traza {args.trace_id} en {args.directorio}")
+        return
+    imprimir_cascada(spans)
+
+
+if __name__ == "__main__":
+    main()
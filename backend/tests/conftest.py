@@ -0,0 +1,5 @@
+import os
+import sys
+
+# La aplicación se importa como en el contenedor (app.services...), desde el directorio backend
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
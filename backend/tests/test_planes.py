@@ -0,0 +1,127 @@
+"""Planes de ejecución (explain) de las consultas calientes del backend contra un mongod real.
+
+Se salta si no responde ningún mongod en MONGO_URL (por defecto mongodb://localhost:27017). Sin
+PLANES_BASE_DATOS se crea una base de datos temporal con los índices declarados en app/services/indices.py y
+unos pocos documentos, y se borra al terminar. Con PLANES_BASE_DATOS (lo que hace verificar_planes.py) se
+explican las agregaciones contra esa base de datos, sin escribir en ella, y no se salta: si no responde, la
+prueba falla. Con MODO_BUSQUEDA=regex la búsqueda no usa índices y sus pruebas fallan.
+"""
+import asyncio
+import os
+import secrets
+from datetime import datetime, timedelta
+import pytest
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+from app.services.busqueda import CAMPO_TOKENS_TITULO, normalizar_titulo, pipeline_busqueda
+from app.services.historial import pipeline_historial
+from app.services.indices import (
+    INDICES_HISTORIAL,
+    INDICES_PRODUCTOS,
+    etapas_del_plan,
+    explicar_agregacion,
+    indices_que_faltan,
+    preparar_indices,
+    problemas_del_plan,
+)
+
+MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017")
+BASE_DATOS = os.getenv("PLANES_BASE_DATOS", "")
+
+# Títulos de los productos con los que se siembra la base de datos temporal
+TITULOS_EJEMPLO = [
+    "Lenovo IdeaPad 3 15.6 Intel Core i5 8GB 512GB SSD",
+    "ASUS VivoBook 14 AMD Ryzen 5 16GB 512GB",
+]
+
+
+def mongod_disponible():
+    cliente = MongoClient(MONGO_URL, serverSelectionTimeoutMS=1000)
+    try:
+        cliente.admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+    finally:
+        cliente.close()
+
+
+pytestmark = pytest.mark.skipif(
+    not BASE_DATOS and not mongod_disponible(), reason=f"No responde ningún mongod en {MONGO_URL}"
+)
+
+
+# Consultas calientes del backend: (descripción, colección, pipeline, índices esperados)
+def consultas_calientes(coleccion, coleccion_historial):
+    producto = ObjectId()
+    return [
+        ("búsqueda de una palabra", coleccion, pipeline_busqueda("lenov"), [f"{CAMPO_TOKENS_TITULO}_1"]),
+        ("búsqueda de varias palabras", coleccion, pipeline_busqueda("lenovo ideapad 3"), [f"{CAMPO_TOKENS_TITULO}_1"]),
+        ("historial de un producto", coleccion_historial, pipeline_historial(producto), ["producto_1_inicio_1"]),
+        (
+            "historial de los últimos días",
+            coleccion_historial,
+            pipeline_historial(producto, datetime.utcnow() - timedelta(days=30)),
+            ["producto_1_inicio_1"],
+        ),
+    ]
+
+
+DESCRIPCIONES = [descripcion for descripcion, _, _, _ in consultas_calientes(None, None)]
+
+
+# Productos con sus palabras del título y una cubeta del historial por producto
+async def sembrar(coleccion, coleccion_historial):
+    inicio = datetime(2024, 1, 1)
+    for titulo in TITULOS_EJEMPLO:
+        resultado = await coleccion.insert_one(
+            {"product_title": titulo, CAMPO_TOKENS_TITULO: normalizar_titulo(titulo).split(), "offers": []}
+        )
+        await coleccion_historial.insert_one({
+            "producto": resultado.inserted_id, "proveedor": "Amazon", "inicio": inicio, "n": 1,
+            "suma": 100.0, "min": 100.0, "max": 100.0, "primera": inicio, "ultima": inicio,
+        })
+
+
+# Índices que faltan y etapas del plan de cada consulta caliente
+async def explicar_planes():
+    cliente = AsyncIOMotorClient(MONGO_URL, serverSelectionTimeoutMS=5000)
+    nombre = BASE_DATOS or f"pruebas_planes_{secrets.token_hex(4)}"
+    db = cliente[nombre]
+    coleccion, coleccion_historial = db["productos"], db["historial_precios"]
+    try:
+        if not BASE_DATOS:
+            await preparar_indices(coleccion, coleccion_historial)
+            await sembrar(coleccion, coleccion_historial)
+        faltan = [
+            (col.name, claves)
+            for col, indices in ((coleccion, INDICES_PRODUCTOS), (coleccion_historial, INDICES_HISTORIAL))
+            for claves in await indices_que_faltan(col, indices)
+        ]
+        planes = {}
+        for descripcion, col, pipeline, esperados in consultas_calientes(coleccion, coleccion_historial):
+            planes[descripcion] = (etapas_del_plan(await explicar_agregacion(col, pipeline)), esperados)
+        return faltan, planes
+    finally:
+        if not BASE_DATOS:
+            await cliente.drop_database(nombre)
+        cliente.close()
+
+
+@pytest.fixture(scope="module")
+def planes():
+    return asyncio.run(explicar_planes())
+
+
+def test_existen_los_indices_declarados(planes):
+    faltan, _ = planes
+    assert faltan == []
+
+
+@pytest.mark.parametrize("descripcion", DESCRIPCIONES)
+def test_consulta_caliente_usa_indices(planes, descripcion):
+    etapas, esperados = planes[1][descripcion]
+    plan = " <- ".join(f"{etapa}({indice})" if indice else etapa for etapa, indice in etapas)
+    assert problemas_del_plan(etapas, esperados) == [], plan
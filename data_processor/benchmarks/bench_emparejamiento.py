@@ -0,0 +1,82 @@
+"""Escalado del emparejamiento de un lote (puntuación de pares con calcular_ratio) de 1 a N procesos.
+
+Para cada título nuevo del lote se puntúan los existentes que comparten alguna palabra clave con él (una
+carga mayor que la de una ronda de mejores_guardados en procesar_lote, que solo puntúa los candidatos que
+no puede descartar por cota). Se compara la puntuación en línea con el pool de procesos de emparejamiento.
+
+Uso (desde el directorio data_processor):
+    python -m benchmarks.bench_emparejamiento --existentes 5000 --procesos 1 2 4 8
+    python -m benchmarks.bench_emparejamiento --pares 1200 --procesos 1 2 4   # lote entre MINIMO_PARES_POOL y TAMANO_TROZO
+"""
+import argparse
+import asyncio
+import math
+import os
+import time
+import emparejamiento
+from benchmarks.corpus import generar_titulos
+from indice_palabras import palabras_clave_de_titulo
+
+# Número de títulos nuevos por lote (similar a un lote real de los recolectores)
+TAMANO_LOTE = 60
+
+
+# Pares (título nuevo, título existente) que comparten alguna palabra clave
+def pares_del_lote(nuevos, existentes):
+    indice = {}
+    for posicion, titulo in enumerate(existentes):
+        for clave in palabras_clave_de_titulo(titulo):
+            indice.setdefault(clave, []).append(posicion)
+
+    pares = []
+    for titulo in nuevos:
+        posiciones = sorted({p for clave in palabras_clave_de_titulo(titulo) for p in indice.get(clave, [])})
+        pares.extend((titulo, existentes[p]) for p in posiciones)
+    return pares
+
+
+# Mide lotes/segundo y pares/segundo puntuando el lote "repeticiones" veces
+async def medir(pares, repeticiones):
+    # Primera pasada sin medir: arranca los procesos del pool y calienta su caché de palabras clave,
+    # como ocurre en el servicio tras los primeros lotes
+    await emparejamiento.puntuar(pares)
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        ratios = await emparejamiento.puntuar(pares)
+    duracion = time.perf_counter() - inicio
+    return repeticiones / duracion, len(pares) * repeticiones / duracion, ratios
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--existentes", type=int, default=5000)
+    parser.add_argument("--procesos", type=int, nargs="+", default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--pares", type=int, default=0, help="puntuar solo los primeros N pares del lote (0 = todos)")
+    args = parser.parse_args()
+
+    existentes = generar_titulos(args.existentes, semilla=args.semilla)
+    nuevos = generar_titulos(TAMANO_LOTE, semilla=args.semilla + 1)
+    pares = pares_del_lote(nuevos, existentes)
+    if args.pares:
+        pares = pares[:args.pares]
+    emparejamiento.MINIMO_PARES_POOL = 0
+    print(f"{len(pares):,} pares por lote, {os.cpu_count()} núcleos disponibles")
+    print(f"{'procesos':>10} {'trozos':>8} {'lotes/s':>10} {'pares/s':>14} {'aceleración':>12}")
+
+    lotes_s, pares_s, referencia = await medir(pares, args.repeticiones)
+    print(f"{'en línea':>10} {1:>8} {lotes_s:>10.2f} {pares_s:>14,.0f} {1.0:>11.2f}x")
+    base = lotes_s
+    for procesos in args.procesos:
+        emparejamiento.iniciar_pool(procesos)
+        lotes_s, pares_s, ratios = await medir(pares, args.repeticiones)
+        emparejamiento.cerrar_pool()
+        # El reparto entre procesos no cambia el resultado
+        assert ratios == referencia
+        trozos = math.ceil(len(pares) / emparejamiento.tamano_trozo(len(pares), procesos))
+        print(f"{procesos:>10} {trozos:>8} {lotes_s:>10.2f} {pares_s:>14,.0f} {lotes_s / base:>11.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,182 @@
+"""Benchmark de la ingesta (procesar_lote, lo que hace /insertar_o_actualizar_productos) según crece la colección.
+
+Para cada tamaño se siembra la colección con productos sintéticos de Amazon, Aliexpress y el scraper y se
+ingieren lotes que mezclan precios nuevos de productos ya guardados, el mismo modelo visto en otro
+proveedor (se integra por similitud de título) y modelos nuevos. Se informa de productos/segundo,
+latencia p50/p99 por lote y llamadas a MongoDB por producto.
+
+Se ejecuta contra una colección en memoria (benchmarks/coleccion_memoria.py) y, si hay un mongod
+accesible en --mongo-url, también contra él (en la base de datos BASE_DATOS_BENCH, que se borra).
+
+Uso (desde el directorio data_processor):
+    python -m benchmarks.bench_ingesta --tamanos 1000 10000 100000 --lotes 5
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import time
+from collections import Counter
+from pymongo import monitoring
+import emparejamiento
+from benchmarks.coleccion_memoria import ColeccionMemoria
+from benchmarks.corpus import PROVEEDORES, generar_catalogo, generar_producto
+from indice_palabras import campos_indexados
+from indice_titulos import IndiceTitulos
+from indices import preparar_indices
+from ingesta import preparar_motor_vectorial, procesar_lote
+from ofertas import CAMPO_OFERTAS, CAMPOS_OFERTA, oferta_de_producto
+
+# Base de datos del mongod local donde se ejecutan los escenarios (se borra al empezar y al terminar)
+BASE_DATOS_BENCH = "bench_ingesta"
+
+# Documentos por inserción al sembrar la colección
+TAMANO_SIEMBRA = 5000
+
+# Comandos de MongoDB que cuentan como llamadas de la ingesta
+COMANDOS_CONTADOS = {"find", "getMore", "insert", "update", "delete", "aggregate"}
+
+# Proporción de productos del lote que son un precio nuevo de un producto guardado y el mismo modelo en otro proveedor
+PROPORCION_REPETIDOS = 0.25
+PROPORCION_OTRO_PROVEEDOR = 0.25
+
+
+# Cuenta los comandos que Motor envía a MongoDB (para comparar con el contador de la colección en memoria)
+class ContadorComandos(monitoring.CommandListener):
+    def __init__(self, contador):
+        self.contador = contador
+
+    def started(self, event):
+        if event.command_name in COMANDOS_CONTADOS:
+            self.contador[event.command_name] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+# Documento guardado de un producto, igual al que crea procesar_lote para un producto sin coincidencias
+def documento_de_producto(producto):
+    documento = {campo: valor for campo, valor in producto.items() if campo not in CAMPOS_OFERTA}
+    documento[CAMPO_OFERTAS] = [oferta_de_producto(producto)]
+    documento.update(campos_indexados(producto["product_title"]))
+    return documento
+
+
+# Lotes reproducibles a ingerir sobre un catálogo ya guardado
+def generar_lotes(catalogo, numero_lotes, tamano_lote, semilla):
+    aleatorio = random.Random(semilla)
+    lotes = []
+    for _ in range(numero_lotes):
+        lote = []
+        for _ in range(tamano_lote):
+            modelo, producto = aleatorio.choice(catalogo)
+            sorteo = aleatorio.random()
+            if sorteo < PROPORCION_REPETIDOS:
+                # El mismo producto con otro precio
+                producto = dict(producto, product_price=round(producto["product_price"] * aleatorio.uniform(0.9, 1.1), 2))
+            elif sorteo < PROPORCION_REPETIDOS + PROPORCION_OTRO_PROVEEDOR:
+                otros = [p for p in PROVEEDORES if p != producto["product_provider"]]
+                producto = generar_producto(aleatorio, modelo, aleatorio.choice(otros))
+            else:
+                producto = generar_producto(aleatorio)
+            lote.append(producto)
+        lotes.append(lote)
+    return lotes
+
+
+# Percentil por el método del rango más cercano
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[max(math.ceil(p / 100 * len(ordenados)) - 1, 0)]
+
+
+# Siembra la colección, crea los índices del servicio, carga el índice de títulos y ajusta su motor (como al
+# arrancar el servicio; no cuenta en las métricas), ingiere los lotes y devuelve las métricas
+async def ejecutar_escenario(coleccion, coleccion_historial, contador, catalogo, lotes):
+    documentos = [documento_de_producto(producto) for _, producto in catalogo]
+    for i in range(0, len(documentos), TAMANO_SIEMBRA):
+        await coleccion.insert_many(documentos[i:i + TAMANO_SIEMBRA], ordered=False)
+    await preparar_indices(coleccion, coleccion_historial)
+    indice = IndiceTitulos()
+    await indice.cargar(coleccion)
+    preparar_motor_vectorial(indice)
+
+    contador.clear()
+    latencias = []
+    for lote in lotes:
+        inicio = time.perf_counter()
+        await procesar_lote(coleccion, indice, lote, coleccion_historial)
+        latencias.append(time.perf_counter() - inicio)
+
+    productos = sum(len(lote) for lote in lotes)
+    llamadas = sum(contador[comando] for comando in COMANDOS_CONTADOS)
+    return productos / sum(latencias), percentil(latencias, 50), percentil(latencias, 99), llamadas / productos
+
+
+# Colecciones en memoria (comparten el contador de llamadas)
+async def colecciones_memoria(contador):
+    return ColeccionMemoria(contador, "productos"), ColeccionMemoria(contador, "historial_precios"), None
+
+
+# Colecciones del mongod local, vacías, o None si no hay ninguno accesible
+async def colecciones_mongo(url, contador):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    cliente = AsyncIOMotorClient(url, serverSelectionTimeoutMS=2000, event_listeners=[ContadorComandos(contador)])
+    try:
+        await cliente.admin.command("ping")
+    except Exception as e:
+        print(f"No hay un mongod accesible en {url} ({type(e).__name__}); solo se mide la colección en memoria")
+        cliente.close()
+        return None
+    await cliente.drop_database(BASE_DATOS_BENCH)
+    db = cliente[BASE_DATOS_BENCH]
+    return db["productos"], db["historial_precios"], cliente
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--lotes", type=int, default=5)
+    parser.add_argument("--tamano-lote", type=int, default=60)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--mongo-url", default=os.getenv("MONGO_URL_BENCH", "mongodb://localhost:27017"))
+    parser.add_argument("--sin-mongo", action="store_true", help="medir solo la colección en memoria")
+    parser.add_argument("--trabajadores", type=int, default=0, help="procesos de emparejamiento (0 = en línea)")
+    args = parser.parse_args()
+
+    emparejamiento.iniciar_pool(args.trabajadores)
+    backends = [("memoria", colecciones_memoria)]
+    if not args.sin_mongo:
+        backends.append(("mongod", lambda contador: colecciones_mongo(args.mongo_url, contador)))
+
+    print(f"{'backend':>8} {'existentes':>10} {'productos/s':>12} {'p50 lote (ms)':>14} {'p99 lote (ms)':>14} {'llamadas/producto':>18}")
+    try:
+        for nombre, crear_colecciones in backends:
+            for tamano in args.tamanos:
+                catalogo = generar_catalogo(tamano, semilla=args.semilla)
+                lotes = generar_lotes(catalogo, args.lotes, args.tamano_lote, semilla=args.semilla + 1)
+                contador = Counter()
+                colecciones = await crear_colecciones(contador)
+                if colecciones is None:
+                    break
+                coleccion, coleccion_historial, cliente = colecciones
+                try:
+                    productos_s, p50, p99, llamadas = await ejecutar_escenario(
+                        coleccion, coleccion_historial, contador, catalogo, lotes
+                    )
+                finally:
+                    if cliente is not None:
+                        await cliente.drop_database(BASE_DATOS_BENCH)
+                        cliente.close()
+                print(f"{nombre:>8} {tamano:>10} {productos_s:>12,.1f} {p50 * 1000:>14.1f} {p99 * 1000:>14.1f} {llamadas:>18.3f}")
+    finally:
+        emparejamiento.cerrar_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
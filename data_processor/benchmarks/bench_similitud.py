@@ -0,0 +1,61 @@
+"""Benchmark de pares/segundo de calcular_ratio (SequenceMatcher) frente al MotorSimilitud vectorial.
+
+Uso (desde el directorio data_processor):
+    python -m benchmarks.bench_similitud --tamanos 10000 100000 1000000
+"""
+import argparse
+import time
+from benchmarks.corpus import generar_titulos
+from similitud import calcular_ratio, cadena_clave
+from similitud_vectorial import MotorSimilitud
+
+# Número de títulos nuevos por lote (similar a un lote real de los recolectores)
+TAMANO_LOTE = 60
+
+# Número de pares que se miden con SequenceMatcher (medir todos los pares sería inviable a 1M)
+PARES_MUESTRA_SECUENCIAL = 20000
+
+
+# Mide pares/segundo de la función actual sobre una muestra de pares
+def medir_secuencial(nuevos, existentes):
+    pares = [(nuevos[i % len(nuevos)], existentes[i % len(existentes)]) for i in range(PARES_MUESTRA_SECUENCIAL)]
+    inicio = time.perf_counter()
+    for titulo_nuevo, titulo_existente in pares:
+        calcular_ratio(titulo_nuevo, titulo_existente)
+    return len(pares) / (time.perf_counter() - inicio)
+
+
+# Mide pares/segundo del motor vectorial puntuando el lote completo contra todos los existentes
+def medir_vectorial(nuevos, existentes):
+    motor = MotorSimilitud()
+    inicio = time.perf_counter()
+    motor.ajustar(existentes)
+    vectores_existentes = motor.vectorizar(existentes)
+    tiempo_preparacion = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    motor.mejores_coincidencias(nuevos, existentes, vectores_existentes)
+    tiempo_lote = time.perf_counter() - inicio
+    return len(nuevos) * len(existentes) / tiempo_lote, tiempo_preparacion
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    nuevos = generar_titulos(TAMANO_LOTE, semilla=args.semilla + 1)
+    print(f"{'productos':>10} {'secuencial pares/s':>20} {'vectorial pares/s':>20} {'aceleración':>12} {'preparación (s)':>16}")
+    for tamano in args.tamanos:
+        existentes = generar_titulos(tamano, semilla=args.semilla)
+        # Se vacía la caché de palabras clave para no favorecer a ninguno de los dos métodos
+        cadena_clave.cache_clear()
+        secuencial = medir_secuencial(nuevos, existentes)
+        cadena_clave.cache_clear()
+        vectorial, preparacion = medir_vectorial(nuevos, existentes)
+        print(f"{tamano:>10} {secuencial:>20,.0f} {vectorial:>20,.0f} {vectorial / secuencial:>11.1f}x {preparacion:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""Sustituto en memoria, asíncrono, de una colección de Motor para los benchmarks de ingesta.
+
+Implementa solo lo que usa el data_processor: find (con sort y proyección de inclusión o de exclusión),
+insert_many, bulk_write con InsertOne/UpdateOne (incluido upsert y el operador posicional "$"), create_index
+y list_indexes.
+Los índices creados con create_index se mantienen como diccionarios valor -> _ids, de modo que las
+consultas por igualdad o $in sobre campos indexados (también dentro de un $or) no recorren la colección,
+igual que en MongoDB. Cada llamada se anota en un contador con el nombre del comando que enviaría
+Motor (un bulk_write ordenado envía un comando por cada tramo de operaciones del mismo tipo).
+"""
+import copy
+from collections import Counter
+from bson import ObjectId
+from pymongo import InsertOne, UpdateOne
+
+# Operadores de consulta soportados (cualquier otro lanza NotImplementedError)
+COMPARACIONES = {
+    "$lt": lambda valor, argumento: valor < argumento,
+    "$lte": lambda valor, argumento: valor <= argumento,
+    "$gt": lambda valor, argumento: valor > argumento,
+    "$gte": lambda valor, argumento: valor >= argumento,
+}
+
+
+# Valores de un documento en una ruta con puntos, recorriendo las listas de subdocumentos ("offers.product_id")
+def valores_en_ruta(documento, ruta):
+    valores = [documento]
+    for parte in ruta.split("."):
+        siguientes = []
+        for valor in valores:
+            if isinstance(valor, dict) and parte in valor:
+                siguientes.append(valor[parte])
+            elif isinstance(valor, list):
+                siguientes.extend(elemento[parte] for elemento in valor if isinstance(elemento, dict) and parte in elemento)
+        valores = siguientes
+    return valores
+
+
+# Valores con los que se compara una condición: cada valor y, si es una lista, también sus elementos
+def valores_comparables(valores):
+    for valor in valores:
+        yield valor
+        if isinstance(valor, list):
+            yield from valor
+
+
+def es_operador(condicion):
+    return isinstance(condicion, dict) and bool(condicion) and all(clave.startswith("$") for clave in condicion)
+
+
+def cumple_operador(valores, operador, argumento):
+    if operador == "$exists":
+        return bool(valores) == bool(argumento)
+    comparables = list(valores_comparables(valores))
+    if operador == "$in":
+        return any(valor in argumento for valor in comparables)
+    if operador == "$ne":
+        return not any(valor == argumento for valor in comparables)
+    if operador in COMPARACIONES:
+        for valor in comparables:
+            try:
+                if COMPARACIONES[operador](valor, argumento):
+                    return True
+            except TypeError:
+                pass
+        return False
+    raise NotImplementedError(f"Operador no soportado: {operador}")
+
+
+def cumple_condicion(documento, ruta, condicion):
+    valores = valores_en_ruta(documento, ruta)
+    if es_operador(condicion):
+        return all(cumple_operador(valores, operador, argumento) for operador, argumento in condicion.items())
+    return any(valor == condicion for valor in valores_comparables(valores))
+
+
+# Comprueba si un documento cumple un filtro de MongoDB
+def cumple(documento, filtro):
+    for clave, condicion in filtro.items():
+        if clave == "$or":
+            if not any(cumple(documento, rama) for rama in condicion):
+                return False
+        elif clave == "$and":
+            if not all(cumple(documento, rama) for rama in condicion):
+                return False
+        elif not cumple_condicion(documento, clave, condicion):
+            return False
+    return True
+
+
+# Posición del primer elemento de la lista que cumple las condiciones del filtro sobre ella (operador "$")
+def posicion_coincidente(documento, filtro):
+    for clave, condicion in filtro.items():
+        if "." not in clave:
+            continue
+        lista, resto = clave.split(".", 1)
+        elementos = documento.get(lista)
+        if isinstance(elementos, list):
+            for posicion, elemento in enumerate(elementos):
+                if cumple_condicion(elemento, resto, condicion):
+                    return posicion
+    return None
+
+
+def partes_de_ruta(ruta):
+    return [int(parte) if parte.isdigit() else parte for parte in ruta.split(".")]
+
+
+def leer(documento, ruta, defecto=None):
+    valor = documento
+    for parte in partes_de_ruta(ruta):
+        try:
+            valor = valor[parte]
+        except (KeyError, IndexError, TypeError):
+            return defecto
+    return valor
+
+
+def asignar(documento, ruta, valor):
+    partes = partes_de_ruta(ruta)
+    destino = documento
+    for parte in partes[:-1]:
+        if isinstance(destino, dict):
+            destino = destino.setdefault(parte, {})
+        else:
+            destino = destino[parte]
+    destino[partes[-1]] = valor
+
+
+def eliminar(documento, ruta):
+    partes = partes_de_ruta(ruta)
+    destino = leer(documento, ".".join(str(parte) for parte in partes[:-1])) if len(partes) > 1 else documento
+    if isinstance(destino, dict):
+        destino.pop(partes[-1], None)
+
+
+# Aplica en el sitio un documento de actualización ($set, $unset, $inc, $push, $min y $max)
+def aplicar_actualizacion(documento, actualizacion, posicion=None):
+    for operador, campos in actualizacion.items():
+        for ruta, valor in campos.items():
+            if ".$." in ruta or ruta.endswith(".$"):
+                ruta = ruta.replace(".$", f".{posicion}", 1)
+            actual = leer(documento, ruta)
+            if operador == "$set":
+                asignar(documento, ruta, copy.deepcopy(valor))
+            elif operador == "$unset":
+                eliminar(documento, ruta)
+            elif operador == "$inc":
+                asignar(documento, ruta, (actual or 0) + valor)
+            elif operador == "$push":
+                if actual is None:
+                    actual = []
+                    asignar(documento, ruta, actual)
+                actual.append(copy.deepcopy(valor))
+            elif operador == "$min":
+                if actual is None or valor < actual:
+                    asignar(documento, ruta, valor)
+            elif operador == "$max":
+                if actual is None or valor > actual:
+                    asignar(documento, ruta, valor)
+            else:
+                raise NotImplementedError(f"Operador de actualización no soportado: {operador}")
+
+
+# Proyección de inclusión ({"campo": 1, ...}; el _id se devuelve siempre) o de exclusión ({"campo": 0, ...})
+def proyectar(documento, proyeccion):
+    if not proyeccion:
+        return documento
+    if not any(proyeccion.values()):
+        return {clave: valor for clave, valor in documento.items() if clave not in proyeccion}
+    campos = {ruta.split(".")[0] for ruta, incluir in proyeccion.items() if incluir}
+    return {clave: valor for clave, valor in documento.items() if clave == "_id" or clave in campos}
+
+
+class CursorMemoria:
+    def __init__(self, coleccion, filtro, proyeccion):
+        self.coleccion = coleccion
+        self.filtro = filtro
+        self.proyeccion = proyeccion
+        self.orden = None
+
+    def sort(self, campo, direccion=1):
+        self.orden = (campo, direccion)
+        return self
+
+    def resultados(self):
+        documentos = self.coleccion.buscar(self.filtro)
+        if self.orden:
+            campo, direccion = self.orden
+            documentos.sort(key=lambda documento: documento.get(campo), reverse=direccion < 0)
+        # Como con Motor, cada documento devuelto es una copia independiente de la guardada
+        return [proyectar(copy.deepcopy(documento), self.proyeccion) for documento in documentos]
+
+    async def to_list(self, length=None):
+        documentos = self.resultados()
+        return documentos if length is None else documentos[:length]
+
+    def __aiter__(self):
+        return self.iterar()
+
+    async def iterar(self):
+        for documento in self.resultados():
+            yield documento
+
+
+class ColeccionMemoria:
+    def __init__(self, contador=None, name="memoria"):
+        self.name = name
+        self.documentos = {}
+        # Índices por campo: valor -> _ids de los documentos que lo contienen (multikey en listas)
+        self.indices = {}
+        # Claves de los índices creados, como las devuelve list_indexes
+        self.claves_indices = [{"_id": 1}]
+        # Llamadas por comando de MongoDB (se puede compartir entre colecciones)
+        self.contador = contador if contador is not None else Counter()
+
+    # --- Índices ---
+
+    def claves_de_indice(self, documento, campo):
+        claves = set()
+        for valor in valores_comparables(valores_en_ruta(documento, campo)):
+            try:
+                hash(valor)
+            except TypeError:
+                continue
+            claves.add(valor)
+        return claves
+
+    def indexar(self, documento):
+        for campo, indice in self.indices.items():
+            for clave in self.claves_de_indice(documento, campo):
+                indice.setdefault(clave, set()).add(documento["_id"])
+
+    def desindexar(self, documento):
+        for campo, indice in self.indices.items():
+            for clave in self.claves_de_indice(documento, campo):
+                indice.get(clave, set()).discard(documento["_id"])
+
+    async def create_index(self, claves, **opciones):
+        self.contador["createIndexes"] += 1
+        # En un índice compuesto solo se usa el primer campo (suficiente para acotar la búsqueda)
+        campo = claves if isinstance(claves, str) else claves[0][0]
+        especificacion = {claves: 1} if isinstance(claves, str) else dict(claves)
+        if especificacion not in self.claves_indices:
+            self.claves_indices.append(especificacion)
+        if campo not in self.indices:
+            self.indices[campo] = {}
+            for documento in self.documentos.values():
+                for clave in self.claves_de_indice(documento, campo):
+                    self.indices[campo].setdefault(clave, set()).add(documento["_id"])
+        return f"{campo}_1"
+
+    async def list_indexes(self):
+        for especificacion in self.claves_indices:
+            nombre = "_id_" if especificacion == {"_id": 1} else "_".join(f"{c}_{o}" for c, o in especificacion.items())
+            yield {"v": 2, "key": dict(especificacion), "name": nombre}
+
+    # _ids candidatos de un filtro según los índices, o None si hay que recorrer la colección
+    def candidatos(self, filtro):
+        if "_id" in filtro and not es_operador(filtro["_id"]):
+            return {filtro["_id"]}
+        if "_id" in filtro and set(filtro["_id"]) == {"$in"}:
+            return set(filtro["_id"]["$in"])
+        for clave, condicion in filtro.items():
+            if clave == "$or":
+                ramas = [self.candidatos(rama) for rama in condicion]
+                if all(rama is not None for rama in ramas):
+                    return set().union(*ramas)
+            elif clave in self.indices:
+                indice = self.indices[clave]
+                if es_operador(condicion) and set(condicion) == {"$in"}:
+                    return set().union(*(indice.get(valor, set()) for valor in condicion["$in"]))
+                if not isinstance(condicion, (dict, list)):
+                    return set(indice.get(condicion, set()))
+        return None
+
+    def buscar(self, filtro):
+        ids = self.candidatos(filtro)
+        documentos = self.documentos.values() if ids is None else (self.documentos[i] for i in ids if i in self.documentos)
+        return [documento for documento in documentos if cumple(documento, filtro)]
+
+    # --- Lectura ---
+
+    def find(self, filtro=None, proyeccion=None):
+        self.contador["find"] += 1
+        return CursorMemoria(self, filtro or {}, proyeccion)
+
+    async def count_documents(self, filtro):
+        self.contador["aggregate"] += 1
+        return len(self.buscar(filtro))
+
+    # --- Escritura ---
+
+    def insertar(self, documento):
+        documento.setdefault("_id", ObjectId())
+        if documento["_id"] in self.documentos:
+            raise ValueError(f"_id duplicado: {documento['_id']}")
+        guardado = copy.deepcopy(documento)
+        self.documentos[guardado["_id"]] = guardado
+        self.indexar(guardado)
+
+    def actualizar(self, filtro, actualizacion, upsert):
+        coincidencias = self.buscar(filtro)
+        if coincidencias:
+            documento = min(coincidencias, key=lambda d: d["_id"])
+            self.desindexar(documento)
+            aplicar_actualizacion(documento, actualizacion, posicion_coincidente(documento, filtro))
+            self.indexar(documento)
+            return 1, 0
+        if upsert:
+            # El documento nuevo parte de las igualdades del filtro
+            documento = {clave: copy.deepcopy(valor) for clave, valor in filtro.items()
+                         if not clave.startswith("$") and "." not in clave and not es_operador(valor)}
+            aplicar_actualizacion(documento, actualizacion)
+            self.insertar(documento)
+            return 0, 1
+        return 0, 0
+
+    async def insert_many(self, documentos, ordered=True):
+        self.contador["insert"] += 1
+        for documento in documentos:
+            self.insertar(documento)
+
+    async def bulk_write(self, operaciones, ordered=True):
+        tipo_anterior = None
+        for operacion in operaciones:
+            tipo = "insert" if isinstance(operacion, InsertOne) else "update"
+            if tipo != tipo_anterior:
+                self.contador[tipo] += 1
+                tipo_anterior = tipo
+            if isinstance(operacion, InsertOne):
+                self.insertar(operacion._doc)
+            elif isinstance(operacion, UpdateOne):
+                self.actualizar(operacion._filter, operacion._doc, operacion._upsert)
+            else:
+                raise NotImplementedError(f"Operación no soportada: {type(operacion).__name__}")
+
+    async def drop(self):
+        self.contador["drop"] += 1
+        self.documentos.clear()
+        self.indices.clear()
@@ -0,0 +1,141 @@
+import random
+from datetime import datetime, timedelta
+
+# Marcas y líneas de producto con las que se generan títulos sintéticos
+MARCAS = [
+    "Xiaomi Redmi Note", "Xiaomi Redmi", "Xiaomi POCO", "Samsung Galaxy A", "Samsung Galaxy S",
+    "Apple iPhone", "Realme", "OPPO Reno", "Motorola Moto G", "Huawei Nova",
+    "ASUS VivoBook", "ASUS ZenBook", "Lenovo IdeaPad", "Acer Aspire", "HP Pavilion", "Dell Inspiron",
+]
+
+SUFIJOS = ["", "Pro", "Pro+", "Ultra", "Lite", "5G", "Plus", "S", "T", "Max"]
+COLORES = ["Negro", "Azul", "Verde", "Midnight Black", "Ocean Blue", "Aurora Green", "Graphite Gray"]
+EXTRAS = [
+    "", "Smartphone", "Versión Global", "NFC Dual SIM", "Cámara 108MP", "6.67\" AMOLED 120Hz",
+    "Portátil 15.6\" FHD Intel Core i5", "Windows 11 Home", "Teclado QWERTY Español",
+]
+
+
+# Genera un título sintético con el estilo de los títulos de Amazon, Aliexpress y el scraper
+def generar_titulo(aleatorio):
+    marca = aleatorio.choice(MARCAS)
+    modelo = f"{aleatorio.randint(1, 40)}{aleatorio.choice(['', 'a', 'c', 'x'])}"
+    memoria = f"{aleatorio.choice([4, 6, 8, 12, 16])}GB+{aleatorio.choice([64, 128, 256, 512])}GB"
+    partes = [marca, modelo, aleatorio.choice(SUFIJOS), memoria, aleatorio.choice(COLORES), aleatorio.choice(EXTRAS)]
+    return " ".join(p for p in partes if p)
+
+
+# Genera una lista reproducible de títulos a partir de una semilla
+def generar_titulos(cantidad, semilla=0):
+    aleatorio = random.Random(semilla)
+    return [generar_titulo(aleatorio) for _ in range(cantidad)]
+
+
+# --- Productos completos (para los benchmarks de ingesta) ---
+
+# Proveedores de los productos sintéticos: los dos recolectores y el scraper (que usa como proveedor la URL semilla)
+PROVEEDOR_SCRAPING = "https://webscraper.io/test-sites/e-commerce/allinone/computers/laptops"
+PROVEEDORES = ["Amazon", "Aliexpress", PROVEEDOR_SCRAPING]
+
+# Fecha a partir de la cual se reparten las fechas de recolección (reproducibles, sin depender del reloj)
+FECHA_BASE = datetime(2024, 1, 1)
+
+# Líneas de producto por categoría: (marca, línea, precio base)
+LINEAS = {
+    "movil": [
+        ("Xiaomi", "Redmi Note", 220), ("Xiaomi", "POCO X", 280), ("Samsung", "Galaxy A", 260), ("Samsung", "Galaxy S", 850),
+        ("Apple", "iPhone", 950), ("Realme", "GT", 400), ("OPPO", "Reno", 420), ("Motorola", "Moto G", 190), ("Huawei", "Nova", 330),
+    ],
+    "portatil": [
+        ("ASUS", "VivoBook", 550), ("ASUS", "ZenBook", 950), ("Lenovo", "IdeaPad", 520), ("Lenovo", "ThinkPad", 1100),
+        ("Acer", "Aspire", 480), ("HP", "Pavilion", 650), ("Dell", "Inspiron", 700), ("MSI", "Modern", 600),
+    ],
+}
+PROCESADORES = ["Intel Core i5-1235U", "Intel Core i7-1255U", "AMD Ryzen 5 7520U", "AMD Ryzen 7 5825U", "Intel Celeron N4020"]
+
+
+# Genera un modelo de producto (lo que distintos proveedores venden con títulos distintos)
+def generar_modelo(aleatorio):
+    categoria = aleatorio.choice(list(LINEAS))
+    marca, linea, precio_base = aleatorio.choice(LINEAS[categoria])
+    modelo = {
+        "categoria": categoria,
+        "marca": marca,
+        "linea": linea,
+        "color": aleatorio.choice(COLORES),
+        "precio": round(precio_base * aleatorio.uniform(0.7, 1.5), 2),
+    }
+    if categoria == "movil":
+        modelo["numero"] = f"{aleatorio.randint(8, 15)}{aleatorio.choice(['', 'C', 'T'])}"
+        modelo["sufijo"] = aleatorio.choice(SUFIJOS)
+        modelo["ram"] = aleatorio.choice([4, 6, 8, 12])
+        modelo["almacenamiento"] = aleatorio.choice([64, 128, 256, 512])
+        modelo["pulgadas"] = aleatorio.choice(["6,5", "6,67", "6,7", "6,8"])
+    else:
+        letras = "".join(aleatorio.choice("ABCDEFGHKLMNPRSTUVXZ") for _ in range(2))
+        modelo["codigo"] = f"{aleatorio.choice('FKMSX')}{aleatorio.randint(100, 999)}{letras}-{letras[0]}{aleatorio.randint(100, 999)}"
+        modelo["procesador"] = aleatorio.choice(PROCESADORES)
+        modelo["ram"] = aleatorio.choice([8, 16, 32])
+        modelo["almacenamiento"] = aleatorio.choice([256, 512, 1024])
+        modelo["pulgadas"] = aleatorio.choice(["14", "15,6", "16"])
+    return modelo
+
+
+# Título de un modelo con el estilo de cada proveedor
+def titulo_de_modelo(modelo, proveedor):
+    m = modelo
+    if m["categoria"] == "movil":
+        nombre = " ".join(p for p in [m["marca"], m["linea"], m["numero"], m["sufijo"]] if p)
+        if proveedor == "Amazon":
+            return f"{nombre} - Smartphone {m['ram']}+{m['almacenamiento']}GB, Pantalla {m['pulgadas']}\" AMOLED, {m['color']} (Versión ES)"
+        if proveedor == "Aliexpress":
+            return f"Versión Global {nombre} {m['ram']}GB {m['almacenamiento']}GB Smartphone {m['pulgadas']}'' AMOLED NFC {m['color']}"
+        return f"{nombre} {m['ram']}GB/{m['almacenamiento']}GB {m['color']}"
+
+    nombre = f"{m['marca']} {m['linea']} {m['codigo']}"
+    if proveedor == "Amazon":
+        return (f"{nombre} - Ordenador portátil de {m['pulgadas']}\" Full HD ({m['procesador']}, {m['ram']}GB RAM, "
+                f"{m['almacenamiento']}GB SSD, Windows 11 Home) {m['color']} - Teclado QWERTY Español")
+    if proveedor == "Aliexpress":
+        return f"{nombre} Laptop {m['pulgadas']} Inch {m['procesador']} {m['ram']}GB RAM {m['almacenamiento']}GB SSD Windows 11"
+    # Los títulos de webscraper.io son cortos: marca, línea y código
+    return nombre
+
+
+# Genera un producto (con la forma de Producto.dict()) de un modelo vendido por un proveedor
+def generar_producto(aleatorio, modelo=None, proveedor=None):
+    # Importado aquí para que los benchmarks de títulos no dependan de la ingesta
+    from identificadores import id_scraping
+
+    modelo = modelo or generar_modelo(aleatorio)
+    proveedor = proveedor or aleatorio.choice(PROVEEDORES)
+    titulo = titulo_de_modelo(modelo, proveedor)
+    if proveedor == "Amazon":
+        product_id = "B0" + "".join(aleatorio.choice("ABCDEFGHJKLMNPQRSTUVWXYZ0123456789") for _ in range(8))
+        url = f"https://www.amazon.es/dp/{product_id}"
+    elif proveedor == "Aliexpress":
+        product_id = str(1005000000000000 + aleatorio.randint(0, 10**12))
+        url = f"https://www.aliexpress.com/item/{product_id}.html"
+    else:
+        url = f"https://webscraper.io/test-sites/e-commerce/allinone/product/{aleatorio.randint(1, 10**7)}"
+        product_id = id_scraping(proveedor, url, titulo)
+
+    return {
+        "product_id": product_id,
+        "product_title": titulo,
+        "product_price": round(modelo["precio"] * aleatorio.uniform(0.9, 1.1), 2),
+        "product_url": url,
+        "product_photo": f"{url}/imagen.jpg",
+        "product_provider": proveedor,
+        "timestamp": FECHA_BASE + timedelta(seconds=aleatorio.randint(0, 30 * 86400)),
+    }
+
+
+# Genera un catálogo reproducible de pares (modelo, producto), cada producto de un modelo distinto
+def generar_catalogo(cantidad, semilla=0):
+    aleatorio = random.Random(semilla)
+    catalogo = []
+    for _ in range(cantidad):
+        modelo = generar_modelo(aleatorio)
+        catalogo.append((modelo, generar_producto(aleatorio, modelo)))
+    return catalogo
@@ -0,0 +1,66 @@
+import asyncio
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from similitud import calcular_ratio
+
+# Procesos que puntúan los pares de títulos. 0 = en línea, en el propio bucle de eventos (para pruebas
+# o máquinas de un solo núcleo); por defecto, uno por núcleo
+TRABAJADORES_EMPAREJAMIENTO = int(os.getenv("TRABAJADORES_EMPAREJAMIENTO", str(os.cpu_count() or 1)))
+
+# Pares de títulos que se envían como máximo juntos a un proceso (reparte el trabajo sin pagar el envío por par)
+TAMANO_TROZO = int(os.getenv("TAMANO_TROZO_EMPAREJAMIENTO", "2000"))
+
+# Pares mínimos por trozo: trozos más pequeños costarían más en envíos de lo que ganan en reparto
+TAMANO_MINIMO_TROZO = int(os.getenv("TAMANO_MINIMO_TROZO_EMPAREJAMIENTO", "100"))
+
+# Por debajo de este número de pares se puntúa en línea: enviarlos a otro proceso costaría más
+MINIMO_PARES_POOL = int(os.getenv("MINIMO_PARES_POOL", "500"))
+
+# Pool de procesos compartido, creado al arrancar la aplicación, y su número de procesos
+pool = None
+trabajadores_pool = 0
+
+
+def iniciar_pool(trabajadores=TRABAJADORES_EMPAREJAMIENTO):
+    global pool, trabajadores_pool
+    if trabajadores > 0 and pool is None:
+        # "spawn": los procesos no heredan los hilos ni las conexiones del servicio
+        pool = ProcessPoolExecutor(max_workers=trabajadores, mp_context=multiprocessing.get_context("spawn"))
+        trabajadores_pool = trabajadores
+
+
+def cerrar_pool():
+    global pool, trabajadores_pool
+    if pool is not None:
+        pool.shutdown(cancel_futures=True)
+        pool = None
+        trabajadores_pool = 0
+
+
+# Tamaño de los trozos en que se reparten los pares entre los procesos: los trozos necesarios para no superar
+# TAMANO_TROZO, redondeados a un múltiplo de los procesos para que todos reciban el mismo trabajo (un lote de
+# 1200 pares con 4 procesos va en 4 trozos de 300, no en uno solo), sin bajar de TAMANO_MINIMO_TROZO
+def tamano_trozo(pares, trabajadores):
+    trozos = math.ceil(math.ceil(pares / TAMANO_TROZO) / trabajadores) * trabajadores
+    return max(math.ceil(pares / trozos), TAMANO_MINIMO_TROZO)
+
+
+# Puntúa una lista de pares (título nuevo, título existente). Se ejecuta dentro de los procesos del pool
+def puntuar_pares(pares):
+    return [calcular_ratio(titulo_nuevo, titulo_existente) for titulo_nuevo, titulo_existente in pares]
+
+
+# Puntúa los pares repartidos en trozos entre los procesos del pool y devuelve los ratios en el mismo
+# orden que los pares (el resultado no depende de qué proceso termine antes). Sin pool, o con pocos
+# pares, se puntúan en línea
+async def puntuar(pares):
+    if pool is None or len(pares) < MINIMO_PARES_POOL:
+        return puntuar_pares(pares)
+
+    bucle = asyncio.get_running_loop()
+    tamano = tamano_trozo(len(pares), trabajadores_pool)
+    trozos = [pares[i:i + tamano] for i in range(0, len(pares), tamano)]
+    resultados = await asyncio.gather(*(bucle.run_in_executor(pool, puntuar_pares, trozo) for trozo in trozos))
+    return [ratio for resultado in resultados for ratio in resultado]
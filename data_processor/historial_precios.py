@@ -0,0 +1,63 @@
+import os
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+
+# Tamaño de cada cubeta del historial: "dia" o "semana" (una cubeta por producto, proveedor y periodo)
+GRANULARIDAD_HISTORIAL = os.getenv("GRANULARIDAD_HISTORIAL", "dia")
+
+# Observaciones máximas por cubeta; al llenarse se abre otra para el mismo periodo (el documento no crece sin límite)
+MAX_OBSERVACIONES_POR_CUBETA = int(os.getenv("MAX_OBSERVACIONES_POR_CUBETA", "200"))
+
+
+# Inicio del periodo (día o semana, en UTC) al que pertenece un instante
+def inicio_cubeta(instante, granularidad=GRANULARIDAD_HISTORIAL):
+    inicio = datetime(instante.year, instante.month, instante.day)
+    if granularidad == "semana":
+        inicio -= timedelta(days=inicio.weekday())
+    return inicio
+
+
+# Observación de precio de un producto ingerido, asociada al documento en el que se integró
+def observacion_de_precio(documento_id, producto_dict):
+    return {
+        "producto": documento_id,
+        "product_id": producto_dict.get("product_id"),
+        "proveedor": producto_dict.get("product_provider"),
+        "precio": producto_dict.get("product_price"),
+        "timestamp": producto_dict.get("timestamp") or datetime.utcnow(),
+    }
+
+
+# Filtro y actualización (con upsert) que añaden una observación a la cubeta abierta de su producto, proveedor
+# y periodo (o crean una). Cada cubeta guarda sus agregados (n, suma, mínimo, máximo, primera/última fecha y
+# último precio), de modo que las consultas de resumen leen una cubeta por periodo sin recorrer las observaciones
+def actualizacion_historial(observacion):
+    filtro = {
+        "producto": observacion["producto"],
+        "proveedor": observacion["proveedor"],
+        "inicio": inicio_cubeta(observacion["timestamp"]),
+        "n": {"$lt": MAX_OBSERVACIONES_POR_CUBETA},
+    }
+    precio = observacion["precio"]
+    punto = {"t": observacion["timestamp"], "precio": precio, "product_id": observacion["product_id"]}
+    return filtro, {
+        "$push": {"observaciones": punto},
+        "$inc": {"n": 1, "suma": precio},
+        "$min": {"min": precio, "primera": observacion["timestamp"]},
+        "$max": {"max": precio, "ultima": observacion["timestamp"]},
+        # Las observaciones llegan en orden de recolección: la última escrita es la más reciente
+        "$set": {"ultimo": punto},
+    }
+
+
+# Operación de escritura en bloque de la actualización anterior
+def operacion_historial(observacion):
+    filtro, actualizacion = actualizacion_historial(observacion)
+    return UpdateOne(filtro, actualizacion, upsert=True)
+
+
+# Guarda las observaciones de un lote con una sola escritura en bloque (ordenada, para que dos
+# observaciones de la misma cubeta en el mismo lote no creen dos cubetas)
+async def registrar_observaciones(coleccion_historial, observaciones):
+    if observaciones:
+        await coleccion_historial.bulk_write([operacion_historial(o) for o in observaciones], ordered=True)
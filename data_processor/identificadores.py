@@ -0,0 +1,70 @@
+import hashlib
+import re
+from datetime import datetime
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from pymongo import UpdateOne
+from similitud import normalizar_titulo
+
+# Prefijo de los ids de los productos scrapeados (los proveedores con API traen su propio id)
+PREFIJO_SCRAPING = "SCRAPED_"
+
+# Ids antiguos, asignados con un contador en memoria que se reiniciaba con el servicio (SCRAPED_000001...).
+# Los nuevos llevan 20 caracteres hexadecimales, por lo que nunca coinciden aunque sean todos dígitos
+PATRON_ID_ANTIGUO = re.compile(r"^SCRAPED_\d{1,12}$")
+
+# Parámetros de la URL que no identifican al producto (seguimiento de campañas, sesión...)
+PARAMETROS_IGNORADOS = re.compile(r"^(utm_.*|ref|ref_.*|fbclid|gclid|sessionid|sid)$", re.IGNORECASE)
+
+# Número de documentos que se actualizan por lote al remapear los ids antiguos
+TAMANO_LOTE_REMAPEO = 500
+
+
+# URL canónica de un producto: esquema y host en minúsculas, sin fragmento, sin parámetros de
+# seguimiento, con los parámetros ordenados y sin barra final
+def url_canonica(url):
+    partes = urlsplit(url.strip())
+    parametros = sorted((k, v) for k, v in parse_qsl(partes.query, keep_blank_values=True) if not PARAMETROS_IGNORADOS.match(k))
+    ruta = partes.path.rstrip("/") or "/"
+    return urlunsplit((partes.scheme.lower(), partes.netloc.lower(), ruta, urlencode(parametros), ""))
+
+
+# Id estable de un producto scrapeado, derivado de su proveedor y su URL canónica (o de su título
+# normalizado si no tiene URL): el mismo producto recibe el mismo id en cada scraping y tras reiniciar
+def id_scraping(proveedor, url, titulo):
+    if url:
+        contenido = f"{proveedor or ''}|url:{url_canonica(url)}"
+    else:
+        contenido = f"{proveedor or ''}|titulo:{normalizar_titulo(titulo)}"
+    return PREFIJO_SCRAPING + hashlib.sha1(contenido.encode("utf-8")).hexdigest()[:20]
+
+
+# Remapea una sola vez los ids antiguos (SCRAPED_000001...) de las ofertas a ids estables. Si el documento
+# ya tenía una oferta con el id nuevo (el mismo producto scrapeado de nuevo), se conserva solo la más reciente
+async def remapear_ids_scraping(coleccion):
+    operaciones = []
+    remapeados = 0
+    async for documento in coleccion.find({"offers.product_id": {"$regex": PATRON_ID_ANTIGUO.pattern}}, {"offers": 1, "product_title": 1}):
+        ofertas = {}
+        for oferta in documento["offers"]:
+            product_id = oferta.get("product_id") or ""
+            if PATRON_ID_ANTIGUO.match(product_id):
+                oferta = {**oferta, "product_id": id_scraping(oferta.get("product_provider"), oferta.get("product_url"), documento.get("product_title", ""))}
+            anterior = ofertas.get(oferta["product_id"])
+            if anterior is None or (oferta.get("timestamp") or datetime.min) >= (anterior.get("timestamp") or datetime.min):
+                ofertas[oferta["product_id"]] = oferta
+
+        # Solo se escribe si las ofertas no han cambiado desde la lectura (una ingesta simultánea gana)
+        operaciones.append(UpdateOne(
+            {"_id": documento["_id"], "offers": documento["offers"]},
+            {"$set": {"offers": list(ofertas.values())}},
+        ))
+        if len(operaciones) >= TAMANO_LOTE_REMAPEO:
+            await coleccion.bulk_write(operaciones, ordered=False)
+            remapeados += len(operaciones)
+            operaciones = []
+
+    if operaciones:
+        await coleccion.bulk_write(operaciones, ordered=False)
+        remapeados += len(operaciones)
+    if remapeados:
+        print(f"Remapeados los ids de scraping de {remapeados} documentos")
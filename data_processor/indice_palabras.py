@@ -0,0 +1,49 @@
+from pymongo import UpdateOne
+from indices import CAMPO_TOKENS_TITULO  # Campo con todas las palabras del título normalizado (búsqueda del backend)
+from similitud import extraer_palabras_clave, normalizar_titulo
+
+# Campo de cada documento donde se guardan sus palabras clave (postings del índice invertido)
+CAMPO_PALABRAS_CLAVE = "palabras_clave"
+
+# Número de documentos que se actualizan por lote al rellenar el campo en documentos antiguos
+TAMANO_LOTE_RELLENO = 500
+
+
+# Devuelve las palabras clave de un título como lista ordenada (formato en el que se guardan)
+def palabras_clave_de_titulo(titulo):
+    return sorted(extraer_palabras_clave(titulo))
+
+
+# Devuelve las palabras del título normalizado, sin eliminar stopwords ni repeticiones
+def tokens_de_titulo(titulo):
+    return normalizar_titulo(titulo).split()
+
+
+# Campos derivados del título que se guardan en cada documento y se indexan, con la función que los calcula
+CAMPOS_INDEXADOS = {
+    CAMPO_PALABRAS_CLAVE: palabras_clave_de_titulo,
+    CAMPO_TOKENS_TITULO: tokens_de_titulo,
+}
+
+
+# Calcula todos los campos indexados de un título
+def campos_indexados(titulo):
+    return {campo: funcion(titulo) for campo, funcion in CAMPOS_INDEXADOS.items()}
+
+
+# Rellena los campos derivados en los documentos que aún no los tienen (los índices multikey sobre
+# ellos se declaran en indices.py)
+async def rellenar_campos_indexados(coleccion):
+    operaciones = []
+    async for doc in coleccion.find(
+        {"$or": [{campo: {"$exists": False}} for campo in CAMPOS_INDEXADOS]},
+        {"product_title": 1}
+    ):
+        campos = campos_indexados(doc.get("product_title", ""))
+        operaciones.append(UpdateOne({"_id": doc["_id"]}, {"$set": campos}))
+        if len(operaciones) >= TAMANO_LOTE_RELLENO:
+            await coleccion.bulk_write(operaciones, ordered=False)
+            operaciones = []
+
+    if operaciones:
+        await coleccion.bulk_write(operaciones, ordered=False)
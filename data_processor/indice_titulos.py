@@ -0,0 +1,138 @@
+import os
+import numpy as np
+from scipy import sparse
+from indice_palabras import CAMPO_PALABRAS_CLAVE, palabras_clave_de_titulo
+from similitud import UMBRAL_SIMILITUD, cadena_clave
+from similitud_vectorial import MotorSimilitud
+
+# Caracteres de las cadenas que compara calcular_ratio (normalizar_titulo solo deja [a-z0-9 ]). Cualquier
+# otro carácter se cuenta en una última columna común, con lo que la cota sigue siendo una cota superior
+ALFABETO = "abcdefghijklmnopqrstuvwxyz0123456789 "
+COLUMNAS = {caracter: i for i, caracter in enumerate(ALFABETO)}
+COLUMNA_OTROS = len(ALFABETO)
+
+# Claves más raras (menor frecuencia de documento) de cada título: sus productos se puntúan antes que el
+# resto, porque son los que con más probabilidad contienen la mejor coincidencia
+CLAVES_RARAS = int(os.getenv("CLAVES_RARAS", "3"))
+
+# Crecimiento del índice (productos guardados respecto al último ajuste) a partir del cual se vuelve a ajustar
+# el motor vectorial. Entre ajustes el vocabulario y los pesos IDF no cambian
+FACTOR_REAJUSTE_VECTORIAL = float(os.getenv("FACTOR_REAJUSTE_VECTORIAL", "2"))
+
+# Filas con las que se reservan las matrices del índice (se duplican al llenarse)
+CAPACIDAD_INICIAL = 1024
+
+
+# Número de apariciones de cada carácter en una cadena de palabras clave
+def histograma_caracteres(cadena):
+    conteos = np.zeros(COLUMNA_OTROS + 1, dtype=np.int32)
+    for caracter in cadena:
+        conteos[COLUMNAS.get(caracter, COLUMNA_OTROS)] += 1
+    return conteos
+
+
+# Cota superior de calcular_ratio entre una cadena (su histograma y longitud) y varias a la vez.
+# SequenceMatcher.ratio es 2·M / (|a| + |b|), y los M caracteres emparejados no pueden superar los que
+# ambas cadenas tienen en común contando repeticiones (la cota de quick_ratio de difflib). Dos cadenas
+# vacías tienen ratio 1.0
+def cotas_ratio(histograma, longitud, histogramas, longitudes):
+    comunes = np.minimum(histogramas, histograma).sum(axis=1)
+    total = longitudes + longitud
+    return np.where(total > 0, 2.0 * comunes / np.maximum(total, 1), 1.0)
+
+
+# Índice en memoria de los títulos de los productos guardados para buscar coincidencias por similitud:
+# - postings de palabras clave (clave -> filas; su longitud es la frecuencia de documento de la clave)
+# - histograma de caracteres y longitud de la cadena de palabras clave de cada título (para la cota)
+# - con MOTOR_SIMILITUD=vectorial, un MotorSimilitud ajustado y los vectores TF-IDF de los títulos guardados
+# Refleja la colección (se carga al arrancar y se añaden los productos que inserta la ingesta), por lo que
+# supone que solo este proceso inserta productos. Las filas están en orden de _id
+class IndiceTitulos:
+
+    def __init__(self):
+        self.ids = []
+        self.titulos = []
+        self.filas = {}
+        self.postings = {}
+        self.histogramas = np.zeros((CAPACIDAD_INICIAL, COLUMNA_OTROS + 1), dtype=np.int32)
+        self.longitudes = np.zeros(CAPACIDAD_INICIAL, dtype=np.int32)
+        self.motor = None
+        self.vectores = None
+        self.filas_ajuste = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    # Añade un producto guardado (no hace nada si ya está)
+    def agregar(self, documento_id, titulo, palabras_clave=None):
+        if documento_id in self.filas:
+            return
+        fila = len(self.ids)
+        if fila == len(self.longitudes):
+            self.histogramas = np.concatenate([self.histogramas, np.zeros_like(self.histogramas)])
+            self.longitudes = np.concatenate([self.longitudes, np.zeros_like(self.longitudes)])
+
+        cadena = cadena_clave(titulo)
+        self.histogramas[fila] = histograma_caracteres(cadena)
+        self.longitudes[fila] = len(cadena)
+        self.ids.append(documento_id)
+        self.titulos.append(titulo)
+        self.filas[documento_id] = fila
+        if palabras_clave is None:
+            palabras_clave = palabras_clave_de_titulo(titulo)
+        for clave in palabras_clave:
+            self.postings.setdefault(clave, []).append(fila)
+
+    # Carga todos los productos de la colección (título y palabras clave guardadas), en orden de _id
+    async def cargar(self, coleccion):
+        cursor = coleccion.find({}, {"product_title": 1, CAMPO_PALABRAS_CLAVE: 1}).sort("_id", 1)
+        async for documento in cursor:
+            self.agregar(documento["_id"], documento.get("product_title", ""), documento.get(CAMPO_PALABRAS_CLAVE))
+        print(f"Índice de títulos cargado con {len(self)} productos")
+
+    # Número de productos guardados que contienen la clave
+    def frecuencia(self, clave):
+        return len(self.postings.get(clave, ()))
+
+    # Claves del título presentes en el índice, de la menos a la más frecuente
+    def claves_raras(self, titulo, cantidad=CLAVES_RARAS):
+        claves = [clave for clave in palabras_clave_de_titulo(titulo) if self.frecuencia(clave)]
+        return sorted(claves, key=lambda clave: (self.frecuencia(clave), clave))[:cantidad]
+
+    # Filas que pueden alcanzar el umbral con el título, con su cota, en dos tramos que conviene puntuar en
+    # orden: primero las que comparten alguna de sus claves más raras y después el resto. Cada tramo es un
+    # par de arrays (filas, cotas) de mayor a menor cota (y en orden de _id a igual cota), así que en cuanto
+    # una cota queda por debajo del mejor ratio encontrado se puede saltar al tramo siguiente. Las filas que
+    # no aparecen tienen una cota por debajo del umbral, y por tanto también su ratio
+    def candidatos(self, titulo, umbral=UMBRAL_SIMILITUD):
+        if not self.ids:
+            return []
+        cadena = cadena_clave(titulo)
+        total = len(self.ids)
+        cotas = cotas_ratio(histograma_caracteres(cadena), len(cadena), self.histogramas[:total], self.longitudes[:total])
+        filas = np.nonzero(cotas >= umbral)[0]
+
+        raras = np.zeros(total, dtype=bool)
+        for clave in self.claves_raras(titulo):
+            raras[self.postings[clave]] = True
+        tramos = []
+        for seleccion in (filas[raras[filas]], filas[~raras[filas]]):
+            # lexsort ordena por la última clave primero: cota descendente y, a igual cota, fila
+            orden = seleccion[np.lexsort((seleccion, -cotas[seleccion]))]
+            tramos.append((orden, cotas[orden]))
+        return tramos
+
+    # Motor vectorial ajustado y matriz de vectores de todos los títulos guardados (una fila por fila del
+    # índice). Se ajusta la primera vez (con los títulos guardados y los del lote, para no empezar con un
+    # vocabulario vacío) y de nuevo cuando el índice ha crecido FACTOR_REAJUSTE_VECTORIAL veces; en el resto
+    # de lotes solo se vectorizan los títulos añadidos desde la última llamada
+    def motor_vectorial(self, titulos_lote, umbral):
+        if self.motor is None or len(self) > self.filas_ajuste * FACTOR_REAJUSTE_VECTORIAL:
+            self.motor = MotorSimilitud(umbral=umbral).ajustar(self.titulos + list(titulos_lote))
+            self.filas_ajuste = max(len(self), 1)
+            self.vectores = None
+        vectorizadas = 0 if self.vectores is None else self.vectores.shape[0]
+        if vectorizadas < len(self):
+            nuevos = self.motor.vectorizar(self.titulos[vectorizadas:])
+            self.vectores = nuevos if self.vectores is None else sparse.vstack([self.vectores, nuevos]).tocsr()
+        return self.motor, self.vectores
@@ -0,0 +1,95 @@
+# Módulo compartido: copia idéntica en data_processor (referencia) y backend/app/services, porque cada servicio
+# se construye solo con su directorio. Se edita la copia del data_processor y se propaga con
+# `python sincronizar_modulos.py` (desde la raíz; --comprobar falla si alguna copia se ha desviado)
+
+# Campos indexados de los productos: ofertas (una por id del proveedor) y palabras del título normalizado.
+# Los escribe el data_processor (ofertas.py, indice_palabras.py) y los consulta también el backend
+CAMPO_OFERTAS = "offers"
+CAMPO_TOKENS_TITULO = "tokens_titulo"
+
+# Índices que necesitan las consultas de ambos servicios, por colección (cada uno como lista de (campo, orden)).
+# Los dos servicios los crean al arrancar, para no depender del orden de arranque:
+# - productos: id del proveedor de cada oferta (multikey; búsqueda por product_id en la ingesta y remapeo
+#   de ids) y palabras del título normalizado (multikey; búsqueda del backend). Los candidatos por similitud
+#   no se consultan en MongoDB sino en el índice de títulos en memoria del data_processor (indice_titulos.py)
+# - historial_precios: cubeta abierta de un producto, proveedor y periodo (escritura del data_processor) y
+#   producto y periodo (consultas del historial del backend)
+INDICES_PRODUCTOS = [[(f"{CAMPO_OFERTAS}.product_id", 1)], [(CAMPO_TOKENS_TITULO, 1)]]
+INDICES_HISTORIAL = [
+    [("producto", 1), ("proveedor", 1), ("inicio", 1), ("n", 1)],
+    [("producto", 1), ("inicio", 1)],
+]
+
+
+# Crea los índices declarados (create_index no hace nada si ya existen) y comprueba que están todos.
+# Devuelve los que faltan
+async def asegurar_indices(coleccion, indices):
+    for claves in indices:
+        await coleccion.create_index(claves)
+    faltan = await indices_que_faltan(coleccion, indices)
+    for claves in faltan:
+        print(f"Falta el índice {claves} en la colección {coleccion.name}")
+    return faltan
+
+
+# Índices declarados que no existen en la colección (se comparan por sus campos y su orden)
+async def indices_que_faltan(coleccion, indices):
+    existentes = set()
+    async for indice in coleccion.list_indexes():
+        existentes.add(tuple((campo, int(orden)) for campo, orden in indice["key"].items()))
+    return [claves for claves in indices if tuple(claves) not in existentes]
+
+
+# Índices de todas las colecciones. El data_processor los crea al arrancar, antes de rellenar campos o migrar
+async def preparar_indices(coleccion, coleccion_historial):
+    await asegurar_indices(coleccion, INDICES_PRODUCTOS)
+    await asegurar_indices(coleccion_historial, INDICES_HISTORIAL)
+
+
+# --- Planes de ejecución (explain) ---
+
+# Recorre la salida de explain y devuelve las etapas del plan ganador con el índice que usan.
+# Sirve para find, update y aggregate y para los planes clásicos y los de SBE (queryPlan)
+def etapas_del_plan(explicacion):
+    etapas = []
+
+    def visitar(nodo, en_rechazados=False):
+        if isinstance(nodo, dict):
+            if "stage" in nodo and not en_rechazados:
+                etapas.append((nodo["stage"], nodo.get("indexName")))
+            for clave, valor in nodo.items():
+                visitar(valor, en_rechazados or clave == "rejectedPlans")
+        elif isinstance(nodo, list):
+            for elemento in nodo:
+                visitar(elemento, en_rechazados)
+
+    visitar(explicacion)
+    return etapas
+
+
+async def explicar_consulta(coleccion, filtro, orden=None):
+    comando = {"find": coleccion.name, "filter": filtro}
+    if orden:
+        comando["sort"] = orden
+    return await coleccion.database.command({"explain": comando, "verbosity": "queryPlanner"})
+
+
+async def explicar_actualizacion(coleccion, filtro, actualizacion, upsert=False):
+    comando = {"update": coleccion.name, "updates": [{"q": filtro, "u": actualizacion, "upsert": upsert}]}
+    return await coleccion.database.command({"explain": comando, "verbosity": "queryPlanner"})
+
+
+async def explicar_agregacion(coleccion, pipeline):
+    return await coleccion.database.command({"aggregate": coleccion.name, "pipeline": pipeline, "explain": True})
+
+
+# Problemas de un plan: recorrer la colección entera (COLLSCAN) o no usar los índices esperados
+def problemas_del_plan(etapas, indices_esperados=()):
+    problemas = []
+    if any(etapa == "COLLSCAN" for etapa, _ in etapas):
+        problemas.append("recorre la colección entera (COLLSCAN)")
+    usados = {indice for _, indice in etapas if indice}
+    for indice in indices_esperados:
+        if indice not in usados:
+            problemas.append(f"no usa el índice {indice}")
+    return problemas
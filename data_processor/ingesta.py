@@ -0,0 +1,263 @@
+import os
+import time
+from bson import ObjectId
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError
+from similitud import UMBRAL_SIMILITUD, calcular_ratio
+from similitud_vectorial import UMBRAL_VECTORIAL, MotorSimilitud
+from indice_palabras import CAMPO_PALABRAS_CLAVE, CAMPO_TOKENS_TITULO, campos_indexados
+from historial_precios import observacion_de_precio, registrar_observaciones
+from ofertas import CAMPO_OFERTAS, CAMPOS_OFERTA, integrar_oferta, operaciones_oferta
+from emparejamiento import puntuar
+from metricas import histograma, medir
+from trazas import SPAN_CLIENTE, span
+
+# Límites de los buckets de los histogramas de número de documentos
+BUCKETS_DOCUMENTOS = (1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000)
+
+# Duración de cada etapa de la ingesta de un lote: transformacion (en main.py), consulta (documentos por
+# product_id y palabras clave), similitud (comparación de títulos) y escritura (productos e historial)
+DURACION_ETAPAS = histograma("ingesta_etapa_duracion_segundos", "Duración de cada etapa de la ingesta de un lote", ("etapa",))
+
+# Documentos que devuelve la consulta de cada lote y candidatos que recorre cada búsqueda por similitud
+DOCUMENTOS_CONSULTADOS = histograma(
+    "ingesta_documentos_consultados", "Documentos leídos por la consulta de cada lote", buckets=BUCKETS_DOCUMENTOS
+)
+DOCUMENTOS_VISITADOS = histograma(
+    "similitud_documentos_visitados", "Candidatos comparados en cada búsqueda por similitud de título", buckets=BUCKETS_DOCUMENTOS
+)
+
+# Motor con el que se comparan los títulos: "secuencial" (SequenceMatcher) o "vectorial" (TF-IDF por lotes)
+MOTOR_SIMILITUD = os.getenv("MOTOR_SIMILITUD", "secuencial")
+UMBRAL_MOTOR_VECTORIAL = float(os.getenv("UMBRAL_VECTORIAL", UMBRAL_VECTORIAL))
+
+# Campos que no se leen en la consulta del lote: los tokens del título solo sirven a la búsqueda del backend
+# y no se devuelven (la ingesta usa el título, las ofertas y las palabras clave)
+PROYECCION_LOTE = {CAMPO_TOKENS_TITULO: 0}
+
+# Candidatos que se puntúan por título en la primera ronda de mejores_guardados y factor con el que crece
+# cada ronda (las rondas pequeñas permiten descartar pronto por cota; las grandes reparten mejor en el pool)
+TAMANO_PRIMERA_RONDA = int(os.getenv("TAMANO_PRIMERA_RONDA", "8"))
+FACTOR_RONDAS = 4
+
+
+# Elige, entre los candidatos, el producto cuyo título más se parece al nuevo (o None si ninguno supera el umbral).
+# ratios_precalculados contiene, por _id, los ratios ya calculados en el pool de procesos. Con el motor
+# vectorial se usa el motor ya ajustado si se indica, para que las puntuaciones no dependan de los candidatos
+def elegir_producto_similar(titulo_nuevo, candidatos, ratios_precalculados=None, motor=None):
+    if MOTOR_SIMILITUD == "vectorial":
+        titulos = [prod.get("product_title", "") for prod in candidatos]
+        motor = motor or MotorSimilitud(umbral=UMBRAL_MOTOR_VECTORIAL)
+        coincidencia = motor.mejores_coincidencias([titulo_nuevo], titulos)[0]
+        return candidatos[coincidencia[0]] if coincidencia else None
+
+    producto_similar = None
+    max_ratio = 0
+    for prod in candidatos:
+        if ratios_precalculados and prod["_id"] in ratios_precalculados:
+            ratio = ratios_precalculados[prod["_id"]]
+        else:
+            titulo_existente = prod.get("product_title", "")
+            ratio = calcular_ratio(titulo_nuevo, titulo_existente)
+        if ratio > max_ratio and ratio >= UMBRAL_SIMILITUD:
+            max_ratio = ratio
+            producto_similar = prod
+    return producto_similar
+
+
+# Consulta que recupera, de una sola vez, los documentos que comparten algún product_id con el lote
+def consulta_del_lote(productos_dict):
+    ids = [p["product_id"] for p in productos_dict if p.get("product_id")]
+    return {f"{CAMPO_OFERTAS}.product_id": {"$in": ids}}
+
+
+# Busca en memoria el documento del lote que contiene el product_id (el de menor _id si hay varios)
+def buscar_por_id_en_lote(documentos, product_id):
+    if not product_id:
+        return None
+    for documento in documentos.values():
+        if any(oferta.get("product_id") == product_id for oferta in documento.get(CAMPO_OFERTAS, [])):
+            return documento
+    return None
+
+
+# Para cada título, el producto guardado más parecido según calcular_ratio: {título: (fila del índice, ratio)},
+# solo para los que tienen alguno que alcance UMBRAL_SIMILITUD (a igual ratio, el de menor _id). El resultado
+# es el mismo que puntuando toda la colección: se puntúan por rondas los candidatos de cada título (primero los
+# que comparten sus claves más raras y después por cota) y se descartan, sin puntuarlos, los que tienen una cota
+# superior por debajo del mejor ratio encontrado. Los pares de cada ronda se puntúan juntos en el pool de procesos
+async def mejores_guardados(indice, titulos):
+    if MOTOR_SIMILITUD == "vectorial":
+        return mejores_guardados_vectorial(indice, titulos)
+
+    pendientes = {
+        titulo: {"tramos": indice.candidatos(titulo), "tramo": 0, "siguiente": 0, "mejor": None} for titulo in set(titulos)
+    }
+    mejores = {}
+    ronda = TAMANO_PRIMERA_RONDA
+    while pendientes:
+        puntuados = {}
+        pares = {}
+        for titulo, estado in pendientes.items():
+            minimo = estado["mejor"][1] if estado["mejor"] else UMBRAL_SIMILITUD
+            filas = []
+            while len(filas) < ronda and estado["tramo"] < len(estado["tramos"]):
+                filas_tramo, cotas_tramo = estado["tramos"][estado["tramo"]]
+                # Con cota igual al mejor ratio aún puede empatar con un _id menor; por debajo, ninguna
+                # fila restante del tramo puede mejorarlo
+                if estado["siguiente"] >= len(filas_tramo) or cotas_tramo[estado["siguiente"]] < minimo:
+                    estado["tramo"] += 1
+                    estado["siguiente"] = 0
+                    continue
+                filas.append(int(filas_tramo[estado["siguiente"]]))
+                estado["siguiente"] += 1
+            puntuados[titulo] = filas
+            for fila in filas:
+                pares.setdefault((titulo, indice.titulos[fila]), len(pares))
+
+        ratios = await puntuar(list(pares))
+        for titulo, filas in puntuados.items():
+            estado = pendientes[titulo]
+            for fila in filas:
+                ratio = ratios[pares[(titulo, indice.titulos[fila])]]
+                mejor = estado["mejor"]
+                if ratio < UMBRAL_SIMILITUD or (mejor and (ratio, indice.ids[mejor[0]]) <= (mejor[1], indice.ids[fila])):
+                    continue
+                estado["mejor"] = (fila, ratio)
+            if estado["tramo"] >= len(estado["tramos"]):
+                if estado["mejor"]:
+                    mejores[titulo] = estado["mejor"]
+                del pendientes[titulo]
+        ronda *= FACTOR_RONDAS
+    return mejores
+
+
+# Variante de mejores_guardados con el motor vectorial del índice: todos los títulos del lote se puntúan
+# contra los vectores de los productos guardados con un único producto de matrices dispersas
+def mejores_guardados_vectorial(indice, titulos):
+    titulos = sorted(set(titulos))
+    motor, vectores = indice.motor_vectorial(titulos, UMBRAL_MOTOR_VECTORIAL)
+    if not titulos or vectores is None:
+        return {}
+    coincidencias = motor.mejores_coincidencias(titulos, indice.titulos, vectores)
+    return {titulo: coincidencia for titulo, coincidencia in zip(titulos, coincidencias) if coincidencia}
+
+
+# Con el motor vectorial, ajusta el motor del índice de títulos y vectoriza los productos guardados. Se llama
+# al arrancar, después de cargar el índice, para no cargar ese coste al primer lote
+def preparar_motor_vectorial(indice):
+    if MOTOR_SIMILITUD == "vectorial":
+        indice.motor_vectorial([], UMBRAL_MOTOR_VECTORIAL)
+
+
+# Procesa un lote de productos ya transformados con una consulta por product_id, otra para los productos
+# similares elegidos y un bulk_write ordenado. Las coincidencias se resuelven en memoria en el mismo orden que
+# el procesado producto a producto, de modo que un producto puede integrarse en otro insertado o actualizado
+# antes en el mismo lote. Los productos similares se buscan en el índice de títulos, que se actualiza con los
+# insertados. Devuelve los documentos afectados en el orden en que se tocaron por primera vez.
+# Si se indica coleccion_historial, cada precio recibido se añade además al historial de precios.
+# Las escrituras de ofertas son atómicas y correctas sin leer el documento (ofertas.py), pero la ingesta sí
+# lee antes de escribir: la consulta por product_id decide si cada producto ya existe o se empareja por
+# similitud, y las dos lecturas dan los documentos que se devuelven. Lo que no hace es reescribir documentos
+# con lo leído: si otra ingesta cambia sus ofertas entre la lectura y la escritura, no se pierden cambios
+async def procesar_lote(coleccion, indice, productos_dict, coleccion_historial=None):
+    # Documentos conocidos por el lote, indexados por _id y en orden de _id
+    documentos = {}
+    with medir(DURACION_ETAPAS, etapa="consulta"), span("mongo find productos", SPAN_CLIENTE, productos=len(productos_dict)):
+        async for documento in coleccion.find(consulta_del_lote(productos_dict), PROYECCION_LOTE).sort("_id", 1):
+            documentos[documento["_id"]] = documento
+
+    # El producto guardado más parecido a cada título sin coincidencia por product_id. El tiempo de similitud
+    # incluye también la elección del candidato dentro del bucle
+    inicio_similitud = time.perf_counter()
+    titulos = [
+        p.get("product_title", "") for p in productos_dict if not buscar_por_id_en_lote(documentos, p.get("product_id"))
+    ]
+    with span("similitud mejores_guardados", titulos=len(titulos), indice=len(indice)):
+        mejores = await mejores_guardados(indice, titulos)
+    duracion_similitud = time.perf_counter() - inicio_similitud
+
+    # Se leen los productos elegidos que no llegaron con la consulta por product_id
+    elegidos = sorted({indice.ids[fila] for fila, _ in mejores.values()} - documentos.keys())
+    if elegidos:
+        with medir(DURACION_ETAPAS, etapa="consulta"), span("mongo find similares", SPAN_CLIENTE, productos=len(elegidos)):
+            async for documento in coleccion.find({"_id": {"$in": elegidos}}, PROYECCION_LOTE):
+                documentos[documento["_id"]] = documento
+        documentos = dict(sorted(documentos.items()))
+    DOCUMENTOS_CONSULTADOS.observar(len(documentos))
+
+    insertados = set()
+    # Documentos creados durante el lote, en orden de creación (candidatos del resto del lote)
+    nuevos_del_lote = []
+    modificados = []
+    observaciones = []
+    # Escrituras de ofertas en documentos que ya existían (atómicas, en el orden de los productos)
+    operaciones_ofertas = []
+
+    for producto_dict in productos_dict:
+        # Busca si el producto ya existe por product_id
+        producto_existente = buscar_por_id_en_lote(documentos, producto_dict.get("product_id"))
+
+        if producto_existente:
+            # Si existe, se actualiza su oferta
+            documento_afectado = producto_existente
+        else:
+            # Si NO existe por product_id, busca integración por similitud de título: el mejor producto
+            # guardado (ya puntuado) y los creados antes en el lote (con _id mayor, así que pierden los empates)
+            titulo_nuevo = producto_dict.get("product_title", "")
+            inicio_similitud = time.perf_counter()
+            candidatos = list(nuevos_del_lote)
+            ratios_guardados = {}
+            if titulo_nuevo in mejores:
+                fila, ratio = mejores[titulo_nuevo]
+                candidatos.insert(0, documentos[indice.ids[fila]])
+                ratios_guardados[indice.ids[fila]] = ratio
+            DOCUMENTOS_VISITADOS.observar(len(candidatos))
+            producto_similar = elegir_producto_similar(titulo_nuevo, candidatos, ratios_guardados, indice.motor)
+            duracion_similitud += time.perf_counter() - inicio_similitud
+
+            if producto_similar:
+                # Si encuentra un producto similar, se le añade la oferta
+                documento_afectado = producto_similar
+            else:
+                # Si no hay producto similar, se crea un documento independiente. El _id se genera aquí
+                # (creciente) para poder usarlo como candidato del resto del lote antes de escribirlo
+                nuevo_documento = {campo: valor for campo, valor in producto_dict.items() if campo not in CAMPOS_OFERTA}
+                nuevo_documento[CAMPO_OFERTAS] = []
+                nuevo_documento.update(campos_indexados(titulo_nuevo))
+                nuevo_documento["_id"] = ObjectId()
+                documentos[nuevo_documento["_id"]] = nuevo_documento
+                insertados.add(nuevo_documento["_id"])
+                nuevos_del_lote.append(nuevo_documento)
+                documento_afectado = nuevo_documento
+
+        oferta = integrar_oferta(documento_afectado, producto_dict)
+        if documento_afectado["_id"] not in insertados:
+            operaciones_ofertas.extend(operaciones_oferta(documento_afectado["_id"], oferta))
+
+        if documento_afectado["_id"] not in modificados:
+            modificados.append(documento_afectado["_id"])
+        observaciones.append(observacion_de_precio(documento_afectado["_id"], producto_dict))
+
+    DURACION_ETAPAS.observar(duracion_similitud, etapa="similitud")
+
+    # Los documentos nuevos se insertan con su estado final; en los existentes solo se tocan sus ofertas.
+    # Los insertados pasan al índice de títulos (si la escritura falla, solo los que llegaron a insertarse)
+    operaciones = [InsertOne(documento) for documento in nuevos_del_lote] + operaciones_ofertas
+    with medir(DURACION_ETAPAS, etapa="escritura"), span("mongo bulk_write", SPAN_CLIENTE, operaciones=len(operaciones)):
+        try:
+            if operaciones:
+                await coleccion.bulk_write(operaciones, ordered=True)
+        except BulkWriteError as e:
+            indexar_insertados(indice, nuevos_del_lote[:e.details.get("nInserted", 0)])
+            raise
+        indexar_insertados(indice, nuevos_del_lote)
+        if coleccion_historial is not None:
+            await registrar_observaciones(coleccion_historial, observaciones)
+
+    return [documentos[_id] for _id in modificados]
+
+
+def indexar_insertados(indice, documentos):
+    for documento in documentos:
+        indice.agregar(documento["_id"], documento.get("product_title", ""), documento.get(CAMPO_PALABRAS_CLAVE))
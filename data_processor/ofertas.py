@@ -0,0 +1,107 @@
+from pymongo import UpdateOne
+from indices import CAMPO_OFERTAS  # Campo con las ofertas del producto: un subdocumento por id del proveedor
+
+# Campos de cada oferta (antes eran listas paralelas alineadas por posición en el documento)
+CAMPOS_OFERTA = ["product_id", "product_price", "product_url", "product_provider"]
+
+# Número de documentos que se convierten por lote en la migración
+TAMANO_LOTE_MIGRACION = 500
+
+
+# Oferta de un producto ingerido
+def oferta_de_producto(producto_dict):
+    oferta = {campo: producto_dict.get(campo) for campo in CAMPOS_OFERTA}
+    oferta["timestamp"] = producto_dict.get("timestamp")
+    return oferta
+
+
+# Devuelve el valor de un campo del documento como lista (los documentos antiguos pueden tener valores sueltos)
+def como_lista(documento, campo):
+    valor = documento.get(campo, [])
+    return valor if isinstance(valor, list) else [valor]
+
+
+# Ofertas de un documento en el formato antiguo de listas paralelas
+def ofertas_de_listas(documento):
+    listas = {campo: como_lista(documento, campo) for campo in CAMPOS_OFERTA}
+    ofertas = []
+    for i in range(len(listas["product_id"])):
+        oferta = {campo: listas[campo][i] if i < len(listas[campo]) else None for campo in CAMPOS_OFERTA}
+        oferta["timestamp"] = documento.get("timestamp")
+        ofertas.append(oferta)
+    return ofertas
+
+
+# Integra en memoria la oferta de un producto en un documento: reemplaza la del mismo product_id o la añade
+def integrar_oferta(documento, producto_dict):
+    oferta = oferta_de_producto(producto_dict)
+    ofertas = documento.setdefault(CAMPO_OFERTAS, [])
+    for i, existente in enumerate(ofertas):
+        if existente.get("product_id") == oferta["product_id"]:
+            ofertas[i] = oferta
+            break
+    else:
+        ofertas.append(oferta)
+    documento["timestamp"] = producto_dict.get("timestamp", None)
+    return oferta
+
+
+# Filtros y actualizaciones atómicas que dejan la oferta guardada en el documento sin depender de una lectura
+# previa de sus ofertas: la primera la añade solo si el documento aún no tiene una con ese product_id y la
+# segunda actualiza la de ese product_id (operador posicional), por lo que dos ingestas simultáneas nunca se
+# pisan el resto de ofertas ni la duplican. La ingesta sí lee el lote antes, para saber a qué documento va
+# cada producto (procesar_lote)
+def actualizaciones_oferta(documento_id, oferta):
+    product_id = oferta["product_id"]
+    return [
+        (
+            {"_id": documento_id, f"{CAMPO_OFERTAS}.product_id": {"$ne": product_id}},
+            {"$push": {CAMPO_OFERTAS: oferta}},
+        ),
+        (
+            {"_id": documento_id, f"{CAMPO_OFERTAS}.product_id": product_id},
+            {"$set": {
+                **{f"{CAMPO_OFERTAS}.$.{campo}": valor for campo, valor in oferta.items() if campo != "product_id"},
+                "timestamp": oferta["timestamp"],
+            }},
+        ),
+    ]
+
+
+# Operaciones de escritura en bloque de las actualizaciones anteriores
+def operaciones_oferta(documento_id, oferta):
+    return [UpdateOne(filtro, actualizacion) for filtro, actualizacion in actualizaciones_oferta(documento_id, oferta)]
+
+
+# Añade al documento las listas paralelas (product_id, product_price...) derivadas de sus ofertas,
+# el formato que esperan los clientes de la API
+def con_listas_de_ofertas(documento):
+    ofertas = documento.get(CAMPO_OFERTAS, [])
+    for campo in CAMPOS_OFERTA:
+        documento[campo] = [oferta.get(campo) for oferta in ofertas]
+    return documento
+
+
+# Migración: cada documento sin ofertas pasa a tenerlas y pierde las listas paralelas (se convierten por lotes;
+# el índice por id de proveedor de las ofertas se declara en indices.py)
+async def migrar_a_ofertas(coleccion):
+    operaciones = []
+    migrados = 0
+    async for documento in coleccion.find(
+        {CAMPO_OFERTAS: {"$exists": False}},
+        {**{campo: 1 for campo in CAMPOS_OFERTA}, "timestamp": 1}
+    ):
+        operaciones.append(UpdateOne(
+            {"_id": documento["_id"], CAMPO_OFERTAS: {"$exists": False}},
+            {"$set": {CAMPO_OFERTAS: ofertas_de_listas(documento)}, "$unset": {campo: "" for campo in CAMPOS_OFERTA}},
+        ))
+        if len(operaciones) >= TAMANO_LOTE_MIGRACION:
+            await coleccion.bulk_write(operaciones, ordered=False)
+            migrados += len(operaciones)
+            operaciones = []
+
+    if operaciones:
+        await coleccion.bulk_write(operaciones, ordered=False)
+        migrados += len(operaciones)
+    if migrados:
+        print(f"Migrados {migrados} documentos al formato de ofertas")
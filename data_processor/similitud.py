@@ -0,0 +1,118 @@
+from difflib import SequenceMatcher
+from functools import lru_cache
+import regex as re
+
+# Umbral de similitud para considerar títulos como iguales
+UMBRAL_SIMILITUD = 0.70
+
+# Stopwords que se ignorarán al normalizar el título
+STOPWORDS = {
+    # Palabras genéricas y técnicas
+    "smartphone", "smartphones", "phone", "phones", "movil", "móvil", "moviles", "móviles",
+    "pantalla", "screen", "lcd", "hd", "uhd", "oled", "ips", "tft", "hz", "full", "plus",
+    "dual", "triple", "quad", "camera", "cámara", "camaras", "cámaras", "megapixel", "mp",
+    "con", "de", "y", "the", "with", "version", "versión", "es", "ultra", "nfc", "pro",
+    "max", "mini", "lite", "edition", "edición", "nuevo", "nueva", "new", "kit", "negro",
+    "black", "blanco", "white", "azul", "blue", "rojo", "red", "gris", "gray", "grey",
+    "oro", "gold", "plata", "silver", "verde", "green", "amarillo", "yellow", "inch", "pulgadas",
+    "procesador", "processor", "cpu", "ram", "gb", "tb", "mb", "storage", "almacenamiento",
+    "bateria", "batería", "battery", "mah", "android", "ios", "windows", "wifi", "bluetooth",
+    "sim", "nano", "micro", "sd", "slot", "expansion", "expansión", "sensor", "face", "id",
+    "huella", "fingerprint", "lector", "reader", "usb", "type", "c", "lightning", "jack",
+    "auriculares", "earphones", "headphones", "altavoz", "speaker", "altavoces", "speakers",
+    "garantia", "garantía", "warranty", "incluido", "incluida", "incluidos", "incluidas",
+    "accesorios", "accesorio", "accesories", "accessory", "accessories", "cargador", "charger",
+    "cable", "manual", "usuario", "user", "manual", "español", "spanish", "english", "inglés",
+    "china", "chino", "global", "internacional", "international", "original", "oficial", "nuevo",
+    "nueva", "nuevo", "nuevos", "nuevas", "originales", "oficiales", "para", "por", "a", "en",
+    "un", "una", "unos", "unas", "el", "la", "los", "las", "del", "al", "por", "sobre", "desde",
+    "hasta", "compatible", "compatibles", "modelo", "model", "serie", "series",
+
+    # Palabras frecuentes en títulos de Xiaomi y ASUS (según los JSON)
+    "mi", "series", "oled", "intel", "amd", "ryzen", "core", "i3", "i5", "i7", "i9", "gen", "windows", "home", "pro",
+    "geforce", "mx", "ssd", "hdd", "pcie", "nvme", "ips", "fhd", "uhd", "wqxga", "wuxga", "wqhd", "touch", "led",
+    "backlit", "fingerprint", "sensor", "webcam", "hdmi", "usb", "wifi", "bluetooth", "ethernet", "battery", "mah",
+    "w", "kg", "mm", "cm", "inch", "pulgadas", "pantalla", "teclado", "keyboard", "numeric", "pad", "backlight", "cam",
+    "audio", "jack", "mic", "microphone", "speaker", "altavoz", "color", "gris", "plata", "negro", "azul", "blanco", "rojo",
+    "green", "silver", "gray", "grey", "black", "white", "blue", "red", "gold", "pink", "purple", "orange", "yellow",
+
+    # Palabras de marketing y variantes
+    "nuevo", "nueva", "original", "oficial", "edición", "edition", "2023", "2024", "2022", "2021", "2020", "plus",
+    "lite", "max", "pro", "ultra", "prime", "smart", "premium", "basic", "essential", "business", "gaming", "creator",
+    "student", "office", "home", "professional", "touchscreen", "convertible", "flip", "duo", "go", "air", "book",
+
+    # Palabras de conectividad y puertos
+    "hdmi", "vga", "displayport", "thunderbolt", "usb", "typec", "typea", "microhdmi", "minihdmi", "minidisplayport",
+    "sd", "microsd", "card", "reader", "slot", "port", "ports", "jack", "audio", "mic", "microphone", "webcam",
+
+    # Palabras de almacenamiento y memoria
+    "ram", "rom", "ssd", "hdd", "pcie", "nvme", "ddr4", "ddr5", "lpddr4", "lpddr5", "emmc", "storage", "memory",
+
+    # Palabras de batería y energía
+    "bateria", "batería", "battery", "mah", "watt", "w", "adapter", "charger", "cargador", "power", "supply",
+
+    # Palabras de dimensiones y peso
+    "mm", "cm", "kg", "g", "gram", "grams", "peso", "weight", "dimension", "dimensions", "size", "thickness", "width", "height", "depth",
+
+    # Palabras de garantía y accesorios
+    "garantia", "garantía", "warranty", "accesorio", "accesorios", "accessory", "accessories", "incluido", "incluida", "incluidos", "incluidas",
+
+    # Palabras de sistema operativo y software
+    "windows", "linux", "ubuntu", "dos", "freedos", "endless", "chrome", "chromebook", "android", "ios", "macos", "os", "sistema", "operativo",
+
+    # Palabras de conectividad extra
+    "bluetooth", "wifi", "ethernet", "lan", "wan", "wireless", "network", "4g", "5g", "lte", "sim", "nano", "micro", "dual", "triple", "quad",
+
+    # Palabras de cámara y multimedia
+    "camera", "cámara", "cam", "webcam", "megapixel", "mp", "video", "hd", "fullhd", "uhd", "4k", "8k", "hdr", "dolby", "audio", "altavoz", "speaker",
+
+    # Palabras de teclado y ratón
+    "teclado", "keyboard", "mouse", "trackpad", "touchpad", "numeric", "pad", "backlight", "backlit",
+
+    # Palabras de marketing y otras variantes
+    "nuevo", "nueva", "nuevos", "nuevas", "original", "oficial", "edición", "edition", "premium", "basic", "essential", "business", "gaming", "creator", "student", "office", "home", "professional", "touchscreen", "convertible", "flip", "duo", "go", "air", "book"
+}
+
+# Número máximo de títulos cuyas palabras clave se mantienen en memoria
+TAMANO_CACHE_CLAVES = 50000
+
+
+# Normaliza el título del producto
+def normalizar_titulo(titulo):
+    if not titulo:
+        return ""
+    titulo = titulo.lower()
+    titulo = re.sub(r'[^a-z0-9 ]', '', titulo)
+    titulo = re.sub(r'\s+', ' ', titulo).strip()
+    return titulo
+
+
+# Función para extraer palabras clave del título
+def extraer_palabras_clave(titulo):
+    titulo = normalizar_titulo(titulo)
+    # Unifica variantes de números y unidades (ej: 6,88 -> 688, 8+256GB -> 8gb 256gb)
+    titulo = re.sub(r'(\d+)[\s\+\-xX](\d+)(gb|tb|mb)?', r'\1gb \2gb', titulo)
+    # Separa letras y números pegados (ej: g81ultra -> g81 ultra)
+    titulo = re.sub(r'([a-z]+)(\d+)', r'\1 \2', titulo)
+    titulo = re.sub(r'(\d+)([a-z]+)', r'\1 \2', titulo)
+    # Elimina palabras sueltas de 1 o 2 caracteres (menos números)
+    palabras = [w for w in titulo.split() if len(w) > 2 or w.isdigit()]
+    # Elimina stopwords
+    palabras_clave = set(palabras) - STOPWORDS
+    return palabras_clave
+
+
+# Devuelve las palabras clave ordenadas y unidas en una cadena (se cachea por título
+# porque el mismo título existente se compara contra muchos productos nuevos)
+@lru_cache(maxsize=TAMANO_CACHE_CLAVES)
+def cadena_clave(titulo):
+    return " ".join(sorted(extraer_palabras_clave(titulo)))
+
+
+# Función para comparar títulos
+def calcular_ratio(titulo1, titulo2):
+    # Extrae y ordena palabras clave de ambos títulos normalizados
+    cadena1 = cadena_clave(titulo1)
+    cadena2 = cadena_clave(titulo2)
+    ratio = SequenceMatcher(None, cadena1, cadena2).ratio()
+    return ratio
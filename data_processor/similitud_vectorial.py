@@ -0,0 +1,127 @@
+import numpy as np
+from scipy import sparse
+from similitud import UMBRAL_SIMILITUD, cadena_clave, calcular_ratio
+
+# Tamaño de los n-gramas de caracteres con los que se vectorizan las palabras clave
+TAMANO_NGRAMA = 3
+
+# Umbral de similitud coseno por defecto para considerar dos títulos como el mismo producto
+UMBRAL_VECTORIAL = 0.55
+
+
+# Devuelve los n-gramas de caracteres de una cadena de palabras clave (con espacios de borde
+# para que el principio y el final de cada palabra también cuenten)
+def ngramas(cadena, n=TAMANO_NGRAMA):
+    cadena = f" {cadena} "
+    return [cadena[i:i + n] for i in range(len(cadena) - n + 1)]
+
+
+# Motor de similitud por lotes: convierte las palabras clave de cada título en vectores TF-IDF
+# de n-gramas de caracteres y puntúa un lote de títulos nuevos contra todos los candidatos
+# con un único producto de matrices dispersas
+class MotorSimilitud:
+
+    def __init__(self, umbral=UMBRAL_VECTORIAL, tamano_ngrama=TAMANO_NGRAMA):
+        self.umbral = umbral
+        self.tamano_ngrama = tamano_ngrama
+        self.vocabulario = {}
+        self.idf = np.zeros(0)
+
+    # Construye el vocabulario de n-gramas y los pesos IDF a partir de un conjunto de títulos
+    def ajustar(self, titulos):
+        cadenas = [cadena_clave(t) for t in titulos]
+        self.vocabulario = {}
+        for cadena in cadenas:
+            for ngrama in set(ngramas(cadena, self.tamano_ngrama)):
+                self.vocabulario.setdefault(ngrama, len(self.vocabulario))
+
+        conteos = self._matriz_conteos(cadenas)
+        # Frecuencia de documento de cada n-grama, con suavizado para evitar divisiones por cero
+        frecuencia_documento = np.bincount(conteos.indices, minlength=len(self.vocabulario))
+        self.idf = np.log((1 + len(cadenas)) / (1 + frecuencia_documento)) + 1.0
+        return self
+
+    # Convierte títulos en una matriz dispersa (un título por fila) de vectores TF-IDF normalizados
+    def vectorizar(self, titulos):
+        conteos = self._matriz_conteos([cadena_clave(t) for t in titulos])
+        matriz = conteos.multiply(self.idf).tocsr()
+        normas = np.sqrt(np.asarray(matriz.multiply(matriz).sum(axis=1)).ravel())
+        normas[normas == 0] = 1.0
+        return sparse.diags(1.0 / normas) @ matriz
+
+    # Devuelve la matriz dispersa de similitudes coseno entre cada título nuevo y cada candidato.
+    # Si los candidatos ya se vectorizaron (vectores_candidatos) no se vuelven a procesar
+    def puntuar_lote(self, titulos_nuevos, titulos_candidatos, vectores_candidatos=None):
+        if not self.vocabulario:
+            self.ajustar(list(titulos_candidatos) + list(titulos_nuevos))
+        if vectores_candidatos is None:
+            vectores_candidatos = self.vectorizar(titulos_candidatos)
+        return (self.vectorizar(titulos_nuevos) @ vectores_candidatos.T).tocsr()
+
+    # Para cada título nuevo devuelve (índice del candidato, puntuación) del candidato más parecido
+    # que supera el umbral, o None. Ante empates gana el candidato con menor índice, igual que en
+    # el recorrido secuencial con calcular_ratio
+    def mejores_coincidencias(self, titulos_nuevos, titulos_candidatos, vectores_candidatos=None):
+        titulos_candidatos = list(titulos_candidatos)
+        if not titulos_candidatos:
+            return [None] * len(titulos_nuevos)
+
+        puntuaciones = self.puntuar_lote(titulos_nuevos, titulos_candidatos, vectores_candidatos)
+        resultados = []
+        for fila in range(puntuaciones.shape[0]):
+            inicio, fin = puntuaciones.indptr[fila], puntuaciones.indptr[fila + 1]
+            columnas = puntuaciones.indices[inicio:fin]
+            valores = puntuaciones.data[inicio:fin]
+            validos = valores >= self.umbral
+            if not validos.any():
+                resultados.append(None)
+                continue
+            columnas, valores = columnas[validos], valores[validos]
+            maximo = valores.max()
+            mejor = columnas[valores == maximo].min()
+            resultados.append((int(mejor), float(maximo)))
+        return resultados
+
+    # Modo de compatibilidad: decide con ambos métodos y devuelve los títulos nuevos en los que
+    # el motor vectorial y SequenceMatcher (calcular_ratio con UMBRAL_SIMILITUD) no coinciden
+    def comparar_con_sequence_matcher(self, titulos_nuevos, titulos_candidatos):
+        titulos_candidatos = list(titulos_candidatos)
+        decisiones_vectoriales = self.mejores_coincidencias(titulos_nuevos, titulos_candidatos)
+
+        diferencias = []
+        for i, titulo in enumerate(titulos_nuevos):
+            mejor_secuencial, max_ratio = None, 0
+            for j, candidato in enumerate(titulos_candidatos):
+                ratio = calcular_ratio(titulo, candidato)
+                if ratio > max_ratio and ratio >= UMBRAL_SIMILITUD:
+                    mejor_secuencial, max_ratio = j, ratio
+
+            vectorial = decisiones_vectoriales[i]
+            mejor_vectorial = vectorial[0] if vectorial else None
+            if mejor_vectorial != mejor_secuencial:
+                diferencias.append({
+                    "titulo": titulo,
+                    "candidato_sequence_matcher": titulos_candidatos[mejor_secuencial] if mejor_secuencial is not None else None,
+                    "ratio_sequence_matcher": max_ratio,
+                    "candidato_vectorial": titulos_candidatos[mejor_vectorial] if mejor_vectorial is not None else None,
+                    "puntuacion_vectorial": vectorial[1] if vectorial else None,
+                })
+        return diferencias
+
+    # Cuenta los n-gramas conocidos de cada cadena y los devuelve como matriz dispersa CSR
+    def _matriz_conteos(self, cadenas):
+        indices, indptr = [], [0]
+        for cadena in cadenas:
+            for ngrama in ngramas(cadena, self.tamano_ngrama):
+                columna = self.vocabulario.get(ngrama)
+                if columna is not None:
+                    indices.append(columna)
+            indptr.append(len(indices))
+        datos = np.ones(len(indices))
+        matriz = sparse.csr_matrix(
+            (datos, np.array(indices, dtype=np.int64), np.array(indptr, dtype=np.int64)),
+            shape=(len(cadenas), len(self.vocabulario))
+        )
+        # Suma los n-gramas repetidos dentro de una misma cadena
+        matriz.sum_duplicates()
+        return matriz
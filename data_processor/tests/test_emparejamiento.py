@@ -0,0 +1,25 @@
+"""Reparto de los pares entre los procesos del pool de emparejamiento."""
+import asyncio
+import emparejamiento
+from benchmarks.bench_emparejamiento import pares_del_lote
+from benchmarks.corpus import generar_titulos
+
+
+def test_tamano_trozo_reparte_entre_todos_los_procesos():
+    # Entre MINIMO_PARES_POOL y TAMANO_TROZO el lote ya no va en un único trozo
+    assert emparejamiento.tamano_trozo(1200, 4) == 300
+    # Por encima de TAMANO_TROZO, un múltiplo de los procesos
+    assert emparejamiento.tamano_trozo(10000, 4) == 1250
+    # Sin bajar del mínimo
+    assert emparejamiento.tamano_trozo(600, 8) == emparejamiento.TAMANO_MINIMO_TROZO
+
+
+def test_puntuar_en_el_pool_da_lo_mismo_que_en_linea():
+    pares = pares_del_lote(generar_titulos(10, semilla=1), generar_titulos(400, semilla=2))[:1200]
+    assert len(pares) >= emparejamiento.MINIMO_PARES_POOL
+    en_linea = emparejamiento.puntuar_pares(pares)
+    emparejamiento.iniciar_pool(2)
+    try:
+        assert asyncio.run(emparejamiento.puntuar(pares)) == en_linea
+    finally:
+        emparejamiento.cerrar_pool()
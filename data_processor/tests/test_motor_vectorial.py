@@ -0,0 +1,37 @@
+"""El motor vectorial del índice de títulos puntúa igual cada título sea cual sea el lote en que llega."""
+from bson import ObjectId
+from benchmarks.corpus import generar_titulos
+from indice_titulos import IndiceTitulos
+from ingesta import mejores_guardados_vectorial
+
+
+def test_puntuacion_no_depende_del_lote():
+    indice = IndiceTitulos()
+    for titulo in generar_titulos(500, semilla=1):
+        indice.agregar(ObjectId(), titulo)
+    lote = generar_titulos(60, semilla=2)
+
+    en_lote = mejores_guardados_vectorial(indice, lote)
+    assert en_lote
+    for titulo in lote[:10]:
+        assert mejores_guardados_vectorial(indice, [titulo]).get(titulo) == en_lote.get(titulo)
+
+
+def test_se_reajusta_al_crecer_el_indice():
+    indice = IndiceTitulos()
+    titulos = generar_titulos(300, semilla=3)
+    for titulo in titulos[:100]:
+        indice.agregar(ObjectId(), titulo)
+    motor, vectores = indice.motor_vectorial([], 0.55)
+    assert vectores.shape[0] == 100
+
+    # Sin superar el factor de reajuste solo se vectorizan los títulos nuevos
+    for titulo in titulos[100:150]:
+        indice.agregar(ObjectId(), titulo)
+    assert indice.motor_vectorial([], 0.55)[0] is motor
+    assert indice.vectores.shape[0] == 150
+
+    for titulo in titulos[150:]:
+        indice.agregar(ObjectId(), titulo)
+    assert indice.motor_vectorial([], 0.55)[0] is not motor
+    assert indice.vectores.shape[0] == 300
@@ -0,0 +1,133 @@
+"""La búsqueda de productos similares con el índice de títulos da el mismo resultado que recorrer la colección.
+
+El recorrido completo es la ingesta original: cada producto sin coincidencia por product_id se compara con
+calcular_ratio con todos los guardados en orden de _id y se queda con el primero de mayor ratio que alcance
+UMBRAL_SIMILITUD.
+"""
+import asyncio
+import random
+from bson import ObjectId
+from pymongo import UpdateOne
+from benchmarks.bench_ingesta import documento_de_producto
+from benchmarks.coleccion_memoria import ColeccionMemoria
+from benchmarks.corpus import generar_catalogo, generar_producto, generar_titulos
+from indice_titulos import IndiceTitulos
+from indices import preparar_indices
+from ingesta import mejores_guardados, procesar_lote
+from ofertas import CAMPO_OFERTAS, oferta_de_producto
+from similitud import UMBRAL_SIMILITUD, calcular_ratio
+
+# Pares de títulos con erratas que comparten pocas o ninguna palabra clave y superan el umbral
+PARES_CON_ERRATAS = [
+    ("Samsung Galaxy", "Samsungs Galaxys"),
+    ("xiaomi redmi", "xiaomis redmis"),
+    ("Motorola", "Motorolla"),
+]
+
+
+# Variante de un título con erratas: letras duplicadas, borradas o una "s" al final de una palabra
+def con_erratas(aleatorio, titulo):
+    letras = list(titulo)
+    for _ in range(aleatorio.randint(1, 3)):
+        posicion = aleatorio.randrange(len(letras))
+        cambio = aleatorio.choice(["duplicar", "borrar", "plural"])
+        if cambio == "duplicar":
+            letras.insert(posicion, letras[posicion])
+        elif cambio == "borrar" and len(letras) > 1:
+            del letras[posicion]
+        else:
+            fin = titulo.find(" ", posicion)
+            letras.insert(len(letras) if fin < 0 else min(fin, len(letras)), "s")
+    return "".join(letras)
+
+
+# Mejor producto guardado por recorrido completo, en orden de _id: (_id, ratio) o None
+def mejor_por_recorrido(guardados, titulo):
+    mejor, max_ratio = None, 0
+    for documento_id, titulo_guardado in guardados:
+        ratio = calcular_ratio(titulo, titulo_guardado)
+        if ratio > max_ratio and ratio >= UMBRAL_SIMILITUD:
+            mejor, max_ratio = (documento_id, ratio), ratio
+    return mejor
+
+
+def test_pares_con_erratas_superan_el_umbral():
+    for titulo, errata in PARES_CON_ERRATAS:
+        assert calcular_ratio(titulo, errata) >= UMBRAL_SIMILITUD
+
+
+def test_mejores_guardados_igual_que_recorrido_completo():
+    aleatorio = random.Random(7)
+    titulos = generar_titulos(800, semilla=3)
+    titulos += [con_erratas(aleatorio, titulo) for titulo in aleatorio.sample(titulos, 200)]
+    titulos += [titulo for titulo, _ in PARES_CON_ERRATAS]
+    # Títulos repetidos: a igual ratio gana el de menor _id
+    titulos += aleatorio.sample(titulos, 50)
+    guardados = [(ObjectId(), titulo) for titulo in titulos]
+    indice = IndiceTitulos()
+    for documento_id, titulo in guardados:
+        indice.agregar(documento_id, titulo)
+
+    consultas = generar_titulos(80, semilla=4)
+    consultas += [con_erratas(aleatorio, titulo) for titulo in aleatorio.sample(titulos, 80)]
+    consultas += [errata for _, errata in PARES_CON_ERRATAS] + ["", "!!!"]
+
+    mejores = asyncio.run(mejores_guardados(indice, consultas))
+    for titulo in consultas:
+        esperado = mejor_por_recorrido(guardados, titulo)
+        obtenido = (indice.ids[mejores[titulo][0]], mejores[titulo][1]) if titulo in mejores else None
+        assert obtenido == esperado, titulo
+
+
+# Ingesta original: producto a producto, con una consulta por product_id y un recorrido de la colección
+async def ingerir_con_recorrido(coleccion, lote):
+    for producto in lote:
+        existente = await coleccion.find({f"{CAMPO_OFERTAS}.product_id": producto["product_id"]}).sort("_id", 1).to_list()
+        if existente:
+            documento_id = existente[0]["_id"]
+        else:
+            guardados = [(d["_id"], d["product_title"]) async for d in coleccion.find({}).sort("_id", 1)]
+            mejor = mejor_por_recorrido(guardados, producto["product_title"])
+            if mejor:
+                documento_id = mejor[0]
+            else:
+                documento_id = ObjectId()
+                await coleccion.insert_many([{"_id": documento_id, "product_title": producto["product_title"], CAMPO_OFERTAS: []}])
+        await coleccion.bulk_write([UpdateOne({"_id": documento_id}, {"$push": {CAMPO_OFERTAS: oferta_de_producto(producto)}})])
+
+
+# Agrupación de product_ids por documento, independiente de los _id generados
+def agrupacion(coleccion):
+    return sorted(sorted(oferta["product_id"] for oferta in d[CAMPO_OFERTAS]) for d in coleccion.documentos.values())
+
+
+def test_procesar_lote_agrupa_igual_que_recorrido_completo():
+    aleatorio = random.Random(11)
+    catalogo = generar_catalogo(300, semilla=5)
+    lotes = []
+    for _ in range(3):
+        lote = []
+        for _ in range(60):
+            modelo, producto = aleatorio.choice(catalogo)
+            producto = generar_producto(aleatorio, modelo) if aleatorio.random() < 0.6 else generar_producto(aleatorio)
+            if aleatorio.random() < 0.3:
+                producto["product_title"] = con_erratas(aleatorio, producto["product_title"])
+            lote.append(producto)
+        lotes.append(lote)
+
+    async def ingerir():
+        con_indice, con_recorrido = ColeccionMemoria(name="productos"), ColeccionMemoria(name="productos")
+        documentos = [documento_de_producto(producto) for _, producto in catalogo]
+        for coleccion in (con_indice, con_recorrido):
+            await coleccion.insert_many(documentos)
+            await preparar_indices(coleccion, ColeccionMemoria(name="historial_precios"))
+        indice = IndiceTitulos()
+        await indice.cargar(con_indice)
+        for lote in lotes:
+            await procesar_lote(con_indice, indice, lote)
+            await ingerir_con_recorrido(con_recorrido, lote)
+        assert len(indice) == len(con_indice.documentos)
+        return agrupacion(con_indice), agrupacion(con_recorrido)
+
+    con_indice, con_recorrido = asyncio.run(ingerir())
+    assert con_indice == con_recorrido
@@ -0,0 +1,162 @@
+"""Planes de ejecución (explain) de las consultas calientes de la ingesta contra un mongod real.
+
+Se salta si no responde ningún mongod en MONGO_URL (por defecto mongodb://localhost:27017). Sin
+PLANES_BASE_DATOS se crea una base de datos temporal con los índices declarados en indices.py y unos pocos
+documentos, y se borra al terminar. Con PLANES_BASE_DATOS (lo que hace verificar_planes.py) se explican las
+consultas contra esa base de datos, sin escribir en ella, y no se salta: si no responde, la prueba falla.
+Las consultas no se ejecutan, solo se explican.
+"""
+import asyncio
+import os
+import secrets
+from datetime import datetime
+import pytest
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+from historial_precios import actualizacion_historial, observacion_de_precio, registrar_observaciones
+from indice_palabras import campos_indexados
+from indices import (
+    INDICES_HISTORIAL,
+    INDICES_PRODUCTOS,
+    etapas_del_plan,
+    explicar_actualizacion,
+    explicar_consulta,
+    indices_que_faltan,
+    preparar_indices,
+    problemas_del_plan,
+)
+from ingesta import consulta_del_lote
+from ofertas import CAMPO_OFERTAS, CAMPOS_OFERTA, actualizaciones_oferta, oferta_de_producto
+
+MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017")
+BASE_DATOS = os.getenv("PLANES_BASE_DATOS", "")
+
+# Lote de ejemplo con el que se construyen las consultas (los valores no tienen que existir en la base de datos)
+LOTE_EJEMPLO = [
+    {
+        "product_id": "B0EJEMPLO1",
+        "product_title": "Lenovo IdeaPad 3 15.6 Intel Core i5 8GB 512GB SSD",
+        "product_price": 549.99,
+        "product_url": "https://www.amazon.com/dp/B0EJEMPLO1",
+        "product_photo": "",
+        "product_provider": "Amazon",
+        "timestamp": datetime(2024, 1, 1),
+    },
+    {
+        "product_id": "1005000000000001",
+        "product_title": "ASUS VivoBook 14 AMD Ryzen 5 16GB 512GB",
+        "product_price": 479.0,
+        "product_url": "https://www.aliexpress.com/item/1005000000000001.html",
+        "product_photo": "",
+        "product_provider": "Aliexpress",
+        "timestamp": datetime(2024, 1, 1),
+    },
+]
+
+
+def mongod_disponible():
+    cliente = MongoClient(MONGO_URL, serverSelectionTimeoutMS=1000)
+    try:
+        cliente.admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+    finally:
+        cliente.close()
+
+
+pytestmark = pytest.mark.skipif(
+    not BASE_DATOS and not mongod_disponible(), reason=f"No responde ningún mongod en {MONGO_URL}"
+)
+
+
+# Consultas calientes de la ingesta: (descripción, función que devuelve su explain, índices esperados)
+def consultas_calientes(coleccion, coleccion_historial):
+    documento_id = ObjectId()
+    insertar_oferta, actualizar_oferta = actualizaciones_oferta(documento_id, oferta_de_producto(LOTE_EJEMPLO[0]))
+    cubeta = actualizacion_historial(observacion_de_precio(documento_id, LOTE_EJEMPLO[0]))
+    return [
+        (
+            "consulta del lote (product_id)",
+            lambda: explicar_consulta(coleccion, consulta_del_lote(LOTE_EJEMPLO), {"_id": 1}),
+            [f"{CAMPO_OFERTAS}.product_id_1"],
+        ),
+        (
+            "lectura de los productos similares elegidos",
+            # Con un solo _id MongoDB usa IDHACK, que no informa del índice: se piden dos
+            lambda: explicar_consulta(coleccion, {"_id": {"$in": [documento_id, ObjectId()]}}),
+            ["_id_"],
+        ),
+        (
+            "añadir oferta a un documento",
+            lambda: explicar_actualizacion(coleccion, *insertar_oferta),
+            [],
+        ),
+        (
+            "actualizar oferta de un documento",
+            lambda: explicar_actualizacion(coleccion, *actualizar_oferta),
+            [],
+        ),
+        (
+            "escritura en la cubeta abierta del historial",
+            lambda: explicar_actualizacion(coleccion_historial, *cubeta, upsert=True),
+            ["producto_1_proveedor_1_inicio_1_n_1"],
+        ),
+    ]
+
+
+DESCRIPCIONES = [descripcion for descripcion, _, _ in consultas_calientes(None, None)]
+
+
+# Documentos del lote de ejemplo (con sus ofertas y campos indexados) y sus observaciones de precio
+async def sembrar(coleccion, coleccion_historial):
+    for producto in LOTE_EJEMPLO:
+        documento = {campo: valor for campo, valor in producto.items() if campo not in CAMPOS_OFERTA}
+        documento[CAMPO_OFERTAS] = [oferta_de_producto(producto)]
+        documento.update(campos_indexados(producto["product_title"]))
+        resultado = await coleccion.insert_one(documento)
+        await registrar_observaciones(coleccion_historial, [observacion_de_precio(resultado.inserted_id, producto)])
+
+
+# Índices que faltan y etapas del plan de cada consulta caliente
+async def explicar_planes():
+    cliente = AsyncIOMotorClient(MONGO_URL, serverSelectionTimeoutMS=5000)
+    nombre = BASE_DATOS or f"pruebas_planes_{secrets.token_hex(4)}"
+    db = cliente[nombre]
+    coleccion, coleccion_historial = db["productos"], db["historial_precios"]
+    try:
+        if not BASE_DATOS:
+            await preparar_indices(coleccion, coleccion_historial)
+            await sembrar(coleccion, coleccion_historial)
+        faltan = [
+            (col.name, claves)
+            for col, indices in ((coleccion, INDICES_PRODUCTOS), (coleccion_historial, INDICES_HISTORIAL))
+            for claves in await indices_que_faltan(col, indices)
+        ]
+        planes = {}
+        for descripcion, explicar, esperados in consultas_calientes(coleccion, coleccion_historial):
+            planes[descripcion] = (etapas_del_plan(await explicar()), esperados)
+        return faltan, planes
+    finally:
+        if not BASE_DATOS:
+            await cliente.drop_database(nombre)
+        cliente.close()
+
+
+@pytest.fixture(scope="module")
+def planes():
+    return asyncio.run(explicar_planes())
+
+
+def test_existen_los_indices_declarados(planes):
+    faltan, _ = planes
+    assert faltan == []
+
+
+@pytest.mark.parametrize("descripcion", DESCRIPCIONES)
+def test_consulta_caliente_usa_indices(planes, descripcion):
+    etapas, esperados = planes[1][descripcion]
+    plan = " <- ".join(f"{etapa}({indice})" if indice else etapa for etapa, indice in etapas)
+    assert problemas_del_plan(etapas, esperados) == [], plan
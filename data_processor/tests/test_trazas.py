@@ -0,0 +1,60 @@
+"""Exportación de spans: el hilo exportador escribe en el fichero del servicio los spans terminados."""
+import asyncio
+import json
+from types import SimpleNamespace
+import pytest
+import trazas
+
+
+def spans_exportados(directorio):
+    with open(directorio / f"{trazas.servicio}.ndjson", encoding="utf-8") as archivo:
+        return [json.loads(linea)["resourceSpans"][0]["scopeSpans"][0]["spans"][0] for linea in archivo]
+
+
+def test_spans_se_escriben_al_vaciar(tmp_path, monkeypatch):
+    monkeypatch.setattr(trazas, "TRAZAS_DIRECTORIO", str(tmp_path))
+    monkeypatch.setattr(trazas, "servicio", "prueba")
+    with trazas.span("padre"):
+        with pytest.raises(ValueError):
+            with trazas.span("hijo", trazas.SPAN_CLIENTE):
+                raise ValueError("fallo")
+    trazas.vaciar_trazas()
+
+    hijo, padre = spans_exportados(tmp_path)
+    assert (hijo["name"], padre["name"]) == ("hijo", "padre")
+    assert hijo["parentSpanId"] == padre["spanId"]
+    assert hijo["status"]["code"] == trazas.ESTADO_ERROR
+    assert padre["status"]["code"] == trazas.ESTADO_OK
+
+
+def test_span_de_peticion_fallida_termina_con_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(trazas, "TRAZAS_DIRECTORIO", str(tmp_path))
+    monkeypatch.setattr(trazas, "servicio", "prueba")
+
+    # Lo que los hooks leen de un httpx.Request
+    peticion = SimpleNamespace(method="GET", url="http://upstream/productos", headers={}, extensions={})
+    asyncio.run(trazas.hooks_trazas("upstream")["request"][0](peticion))
+    assert peticion.headers[trazas.CABECERA_TRAZA] == peticion.extensions["span_traza"].cabecera()
+    trazas.terminar_span_fallido(peticion, TimeoutError("timeout"))
+    trazas.vaciar_trazas()
+
+    (span,) = spans_exportados(tmp_path)
+    assert span["name"] == "GET upstream"
+    assert span["status"] == {"code": trazas.ESTADO_ERROR, "message": "TimeoutError('timeout')"}
+
+
+def test_span_sin_propagar_no_envia_traceparent(tmp_path, monkeypatch):
+    monkeypatch.setattr(trazas, "TRAZAS_DIRECTORIO", str(tmp_path))
+    monkeypatch.setattr(trazas, "servicio", "prueba")
+
+    peticion = SimpleNamespace(method="GET", url="https://tercero.example/search", headers={}, extensions={})
+    hooks = trazas.hooks_trazas("tercero", propagar=False)
+    asyncio.run(hooks["request"][0](peticion))
+    assert trazas.CABECERA_TRAZA not in peticion.headers
+    asyncio.run(hooks["response"][0](SimpleNamespace(request=peticion, status_code=200)))
+    trazas.vaciar_trazas()
+
+    # El span de cliente se registra igualmente
+    (span,) = spans_exportados(tmp_path)
+    assert span["name"] == "GET tercero"
+    assert span["status"]["code"] == trazas.ESTADO_OK
@@ -0,0 +1,33 @@
+"""Comprueba con explain que las consultas calientes de la ingesta usan los índices declarados en indices.py.
+
+Las comprobaciones son las pruebas de tests/test_planes.py; este script las ejecuta contra una base de datos
+existente (p. ej. tras un despliegue, con datos reales: sobre colecciones vacías el planificador no tiene con
+qué comparar los planes) y termina con código distinto de 0 si falta algún índice, si algún plan recorre la
+colección entera (COLLSCAN) o no usa el índice esperado, o si no responde MongoDB. Las consultas se explican,
+no se ejecutan.
+
+Uso:
+    python verificar_planes.py --mongo-url mongodb://localhost:27017 --base-datos productos_db
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+import pytest
+
+PRUEBAS_PLANES = Path(__file__).resolve().parent / "tests" / "test_planes.py"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", default=os.getenv("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--base-datos", default="productos_db")
+    args = parser.parse_args()
+
+    os.environ["MONGO_URL"] = args.mongo_url
+    os.environ["PLANES_BASE_DATOS"] = args.base_datos
+    sys.exit(pytest.main(["-q", "-p", "no:cacheprovider", str(PRUEBAS_PLANES)]))
+
+
+if __name__ == "__main__":
+    main()
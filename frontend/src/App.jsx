@@ -11,16 +11,33 @@ function App() {
   // Crea un estado 'search', para el término de búsqueda
   const [search, setSearch] = useState("");
 
-  // Función asíncrona que se ejecuta al hacer clic en el botón "Recolectar"
-  const recolectar = async () => {
+  // Cursor de la página siguiente de la búsqueda actual (null si no hay más productos)
+  const [cursor, setCursor] = useState(null);
+
+  // Término de la búsqueda a la que pertenece el cursor (el cursor solo vale para ese término)
+  const [terminoCursor, setTerminoCursor] = useState("");
+
+  // Al editar el término el cursor deja de valer: "Cargar más" desaparece hasta que se vuelva a buscar
+  const cambiarBusqueda = (valor) => {
+    setSearch(valor);
+    setCursor(null);
+  };
+
+  // Función asíncrona que se ejecuta al hacer clic en el botón "Recolectar" (primera página)
+  // o en "Cargar más" (página siguiente, que se añade a la lista)
+  const recolectar = async (siguiente = null) => {
+    // La página siguiente se pide con el término de la búsqueda que emitió el cursor, no con el del cuadro
+    const termino = siguiente ? terminoCursor : search;
     try {
-      // Hace una solicitud GET al api_gateway para obtener la lista de productos
-      const res = await axios.get("http://localhost:8001/productos", {
-        params: { search }
-      });
+      // Hace una solicitud GET al api_gateway para obtener una página de productos
+      const params = siguiente ? { search: termino, cursor: siguiente } : { search: termino };
+      const res = await axios.get("http://localhost:8001/productos", { params });
 
-      // Actualiza el estado 'productos' con los datos recibidos
-      setProductos(res.data);
+      // Actualiza el estado 'productos' con los datos recibidos y guarda el cursor de la página siguiente
+      // junto con el término al que pertenece
+      setProductos(siguiente ? [...productos, ...res.data] : res.data);
+      setCursor(res.headers["x-siguiente-cursor"] || null);
+      setTerminoCursor(termino);
 
     } catch (err) {
       // Si ocurre un error, muestra una alerta con el mensaje de error
@@ -36,10 +53,10 @@ function App() {
         type="text"
         placeholder="Buscar productos..."
         value={search}
-        onChange={(e) => setSearch(e.target.value)}
+        onChange={(e) => cambiarBusqueda(e.target.value)}
         style={{ marginRight: 10 }}
       />
-      <button onClick={recolectar}>Recolectar</button>
+      <button onClick={() => recolectar()}>Recolectar</button>
 
       <ul style={{ padding: 0 }}>
         {productos.map((p, idx) => {
@@ -106,6 +123,7 @@ function App() {
           );
         })}
       </ul>
+      {cursor && <button onClick={() => recolectar(cursor)}>Cargar más</button>}
     </div>
   );
 }
@@ -0,0 +1,81 @@
+"""Benchmark de páginas/segundo y memoria máxima (RSS) de cada extractor de extraccion.py.
+
+Se usan páginas guardadas (.html) de un directorio, p. ej. descargadas con
+    curl -o fixtures/laptops.html https://webscraper.io/test-sites/e-commerce/allinone/computers/laptops
+o, si no se indica ninguno, páginas sintéticas con el mismo marcado. Antes de medir se comprueba que
+todos los extractores devuelven exactamente lo mismo que "bs4".
+
+Uso (desde el directorio scraper):
+    python -m benchmarks.bench_extraccion --fixtures fixtures/ --repeticiones 20
+"""
+import argparse
+import json
+import multiprocessing
+import resource
+import sys
+import time
+from pathlib import Path
+from benchmarks.paginas import generar_pagina
+from extraccion import EXTRACTORES, analizar_pagina
+
+# URL con la que se resuelven los enlaces relativos de las páginas guardadas
+URL_PAGINA = "https://webscraper.io/test-sites/e-commerce/allinone/computers/laptops"
+
+
+# Carga las páginas guardadas del directorio o genera páginas sintéticas de distintos tamaños
+def cargar_paginas(directorio):
+    if directorio:
+        return [ruta.read_text(encoding="utf-8") for ruta in sorted(Path(directorio).glob("*.html"))]
+    return [generar_pagina(productos, semilla=semilla) for semilla, productos in enumerate([6, 30, 117, 117, 300])]
+
+
+# Salida serializada de un extractor (sin el timestamp, que depende del momento del parseo)
+def salida(extractor, html):
+    productos, enlaces = analizar_pagina(html, URL_PAGINA, "scraping", extractor)
+    return json.dumps([p.model_dump(exclude={"timestamp"}) for p in productos]) + json.dumps(enlaces)
+
+
+# Se ejecuta en un proceso nuevo para que la memoria máxima sea solo la de este extractor
+def medir(extractor, paginas, repeticiones, cola):
+    analizar_pagina(paginas[0], URL_PAGINA, "scraping", extractor)
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        for html in paginas:
+            analizar_pagina(html, URL_PAGINA, "scraping", extractor)
+    duracion = time.perf_counter() - inicio
+    # ru_maxrss está en KiB en Linux y en bytes en macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss_mib = rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+    cola.put((len(paginas) * repeticiones / duracion, rss_mib))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", help="directorio con páginas .html guardadas")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--extractores", nargs="+", default=list(EXTRACTORES))
+    args = parser.parse_args()
+
+    paginas = cargar_paginas(args.fixtures)
+    if not paginas:
+        parser.error(f"no hay páginas .html en {args.fixtures}")
+
+    for extractor in args.extractores:
+        distintas = sum(salida(extractor, html) != salida("bs4", html) for html in paginas)
+        if distintas:
+            sys.exit(f"{extractor}: {distintas} páginas con salida distinta a bs4")
+
+    contexto = multiprocessing.get_context("spawn")
+    print(f"{len(paginas)} páginas, {args.repeticiones} repeticiones")
+    print(f"{'extractor':>14} {'páginas/s':>12} {'RSS máx. (MiB)':>16}")
+    for extractor in args.extractores:
+        cola = contexto.Queue()
+        proceso = contexto.Process(target=medir, args=(extractor, paginas, args.repeticiones, cola))
+        proceso.start()
+        paginas_por_segundo, rss_mib = cola.get()
+        proceso.join()
+        print(f"{extractor:>14} {paginas_por_segundo:>12,.1f} {rss_mib:>16,.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Páginas de listado sintéticas con el mismo marcado que las de webscraper.io (tarjetas .thumbnail,
+precio, enlace .title, imagen y paginación), rodeadas de menús y pie como una página real."""
+import random
+
+MARCAS = ["Asus", "Acer", "Lenovo", "Dell", "HP", "Apple", "Samsung", "Huawei", "Packard Bell", "Prestigio"]
+MODELOS = ["VivoBook", "Aspire", "ThinkPad", "Inspiron", "ProBook", "MacBook", "Galaxy Tab", "MediaPad", "EasyNote", "MultiPad"]
+
+
+def tarjeta(indice, aleatorio):
+    marca = aleatorio.choice(MARCAS)
+    modelo = aleatorio.choice(MODELOS)
+    precio = f"{aleatorio.randint(50, 2500)}.{aleatorio.randint(0, 99):02d}"
+    return f'''
+<div class="col-md-4 col-xl-4 col-lg-4">
+  <div class="card thumbnail">
+    <div class="product-wrapper card-body">
+      <div class="image"><img class="img-fluid card-img-top img-responsive" alt="item" src="/images/test-sites/e-commerce/items/cart2.png"></div>
+      <div class="caption">
+        <h4 class="price float-end card-title pull-right"><span itemprop="price">${precio}</span></h4>
+        <h4><a href="/test-sites/e-commerce/allinone/product/{indice}" class="title" title="{marca} {modelo} {aleatorio.randint(100, 999)} &quot;15.6&quot;">{marca} {modelo}...</a></h4>
+        <p class="description card-text">{marca} {modelo}, 15.6&quot;, Core i5, 8GB, 256GB SSD, Windows 11 Home</p>
+      </div>
+      <div class="ratings">
+        <p class="review-count float-end">{aleatorio.randint(1, 15)} reviews</p>
+        <p data-rating="{aleatorio.randint(1, 5)}"><span class="ws-icon ws-icon-star"></span></p>
+      </div>
+    </div>
+  </div>
+</div>'''
+
+
+# Genera una página de listado con el número de productos y de enlaces de paginación indicados
+def generar_pagina(productos=117, paginas=20, semilla=0):
+    aleatorio = random.Random(semilla)
+    tarjetas = "".join(tarjeta(indice, aleatorio) for indice in range(productos))
+    menu = "".join(f'<li class="nav-item"><a class="nav-link" href="/menu/{k}">Menú {k}</a></li>' for k in range(60))
+    categorias = "".join(f'<li><a class="category-link" href="/categoria/{k}">Categoría {k}</a></li>' for k in range(20))
+    paginacion = "".join(
+        f'<li class="page-item"><a class="page-link" href="/test-sites/e-commerce/static/computers/laptops?page={k}">{k}</a></li>'
+        for k in range(1, paginas + 1)
+    )
+    return f'''<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>Web Scraper Test Sites</title>
+<script>window.dataLayer = window.dataLayer || []; var plantilla = "<div class='thumbnail'></div>";</script></head>
+<body><header><nav class="navbar"><ul class="navbar-nav">{menu}</ul></nav></header>
+<div class="container test-site"><div class="row">
+<div class="col-md-3 sidebar"><ul class="nav">{categorias}</ul></div>
+<div class="col-md-9"><h1 class="page-header">Computers / Laptops</h1>
+<div class="row">{tarjetas}</div>
+<ul class="pagination">{paginacion}<li class="page-item disabled"><span class="page-link">›</span></li></ul>
+</div></div></div>
+<footer class="footer">{"<p>Web Scraper · Test Sites · Términos · Privacidad</p>" * 50}</footer></body></html>'''
@@ -0,0 +1,80 @@
+import os
+import time
+from collections import OrderedDict
+
+# Tiempo (en segundos) durante el que una página guardada se usa sin volver a preguntar al sitio
+TTL_CACHE_PAGINAS = float(os.getenv("TTL_CACHE_PAGINAS", "300"))
+
+# Número máximo de páginas guardadas; al superarlo se descarta la usada hace más tiempo (LRU)
+MAX_PAGINAS_CACHE = int(os.getenv("MAX_PAGINAS_CACHE", "256"))
+
+
+# Caché en memoria de páginas scrapeadas, indexada por URL. Cada entrada guarda el cuerpo original,
+# las cabeceras de validación (ETag / Last-Modified) y el resultado ya parseado (productos y enlaces)
+class CachePaginas:
+
+    def __init__(self, ttl=TTL_CACHE_PAGINAS, max_entradas=MAX_PAGINAS_CACHE):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self.entradas = OrderedDict()
+        self.metricas = {"aciertos": 0, "revalidadas": 0, "descargadas": 0}
+
+    # Devuelve la entrada de una URL (o None) y la marca como usada recientemente
+    def obtener(self, url):
+        entrada = self.entradas.get(url)
+        if entrada is not None:
+            self.entradas.move_to_end(url)
+        return entrada
+
+    # Indica si la entrada todavía puede usarse sin revalidarla
+    def es_fresca(self, entrada):
+        return time.monotonic() - entrada["guardada"] < self.ttl
+
+    # Cabeceras para una petición condicional a partir de la entrada guardada
+    def cabeceras_condicionales(self, entrada):
+        cabeceras = {}
+        if entrada is None:
+            return cabeceras
+        if entrada["etag"]:
+            cabeceras["If-None-Match"] = entrada["etag"]
+        if entrada["last_modified"]:
+            cabeceras["If-Modified-Since"] = entrada["last_modified"]
+        return cabeceras
+
+    # Guarda (o reemplaza) una página, descartando la menos usada si se supera el tamaño máximo
+    def guardar(self, url, respuesta, productos, enlaces):
+        self.entradas[url] = {
+            "cuerpo": respuesta.content,
+            "etag": respuesta.headers.get("ETag"),
+            "last_modified": respuesta.headers.get("Last-Modified"),
+            "productos": productos,
+            "enlaces": enlaces,
+            "guardada": time.monotonic(),
+        }
+        self.entradas.move_to_end(url)
+        self.descartar_sobrantes()
+
+    # Renueva la entrada revalidada tras un 304 (la página no ha cambiado): vuelve a ser fresca sin parsear
+    # nada. Si otras páginas la desplazaron de la caché mientras se revalidaba, se vuelve a insertar; si
+    # mientras tanto se guardó una versión más reciente de la página, se deja esa
+    def renovar(self, url, entrada):
+        actual = self.entradas.get(url)
+        if actual is not None and actual is not entrada:
+            return
+        entrada["guardada"] = time.monotonic()
+        self.entradas[url] = entrada
+        self.entradas.move_to_end(url)
+        self.descartar_sobrantes()
+
+    # Descarta las páginas usadas hace más tiempo mientras se supere el tamaño máximo
+    def descartar_sobrantes(self):
+        while len(self.entradas) > self.max_entradas:
+            self.entradas.popitem(last=False)
+
+    # Estadísticas de uso de la caché
+    def estadisticas(self):
+        return {**self.metricas, "paginas": len(self.entradas), "max_paginas": self.max_entradas, "ttl_s": self.ttl}
+
+
+# Caché compartida por todos los rastreos del servicio
+cache_paginas = CachePaginas()
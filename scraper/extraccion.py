@@ -0,0 +1,160 @@
+# Importar os para leer la configuración del extractor
+import os
+
+# Importar BeautifulSoup para parsear HTML (web scraping)
+from bs4 import BeautifulSoup, SoupStrainer
+
+# Importar lxml para el extractor basado en XPath
+from lxml import etree, html as lxml_html
+
+# Importar re para trabajar con expresiones regulares (limpiar textos)
+import re
+
+# Importar urljoin para convertir enlaces relativos en URLs completas
+from urllib.parse import urljoin
+
+# Importar datetime para manejar fechas y horas
+from datetime import datetime
+
+# Modelo de datos de los productos scrapeados
+from models import Producto
+
+# Extractor usado para parsear las páginas: "bs4" (BeautifulSoup con selectores CSS),
+# "bs4_tarjetas" (BeautifulSoup construyendo solo las tarjetas de producto y la paginación)
+# o "lxml" (lxml con expresiones XPath precompiladas). Todos devuelven exactamente lo mismo
+EXTRACTOR = os.getenv("EXTRACTOR_SCRAPER", "bs4")
+
+# Expresión regular para limpiar el precio, eliminando caracteres no numéricos
+PATRON_PRECIO = re.compile(r"[^\d.]")
+
+
+# Construye el producto a partir de los valores en bruto de una tarjeta
+def crear_producto(nombre, raw_precio, producto_url, imagen, url_pagina, proveedor):
+    # Limpiamos el precio
+    precio_limpio = PATRON_PRECIO.sub("", raw_precio)
+
+    # Convertimos la URL del producto y la imagen a URLs completas
+    producto_url = urljoin(url_pagina, producto_url) if producto_url is not None else None
+    imagen = urljoin(url_pagina, imagen) if imagen is not None else None
+
+    try:
+        # Convertimos el precio limpio a un número decimal (float)
+        precio = float(precio_limpio)
+    except ValueError:
+        # Si no se puede convertir, asignamos 0.0 como precio por defecto
+        precio = 0.0
+
+    # Creamos una instancia del modelo Producto
+    return Producto(
+        title=nombre,
+        price=precio,
+        product_url=producto_url,
+        image=imagen,
+        product_provider=proveedor,
+        timestamp=datetime.utcnow()
+    )
+
+
+# --- Extractor BeautifulSoup ---
+
+# Solo se construyen en el árbol las tarjetas de producto y la paginación (modo "bs4_tarjetas").
+# Se usa una expresión regular porque, según la versión de bs4, una lista de clases no se compara
+# con cada clase de un atributo con varias ("card thumbnail")
+FILTRO_TARJETAS = SoupStrainer(class_=re.compile(r"(^|\s)(thumbnail|pagination)(\s|$)"))
+
+
+# Parsea una página de listado con BeautifulSoup y devuelve sus productos y sus enlaces de paginación
+def analizar_pagina_bs4(html, url_pagina, proveedor, solo_tarjetas=False):
+    # Usa BeautifulSoup para parsear el contenido HTML recibido
+    soup = BeautifulSoup(html, "lxml", parse_only=FILTRO_TARJETAS if solo_tarjetas else None)
+    return extraer_productos(soup, url_pagina, proveedor), extraer_enlaces_paginacion(soup, url_pagina)
+
+
+# Extrae los productos de una página de listado ya parseada
+def extraer_productos(soup, url_pagina, proveedor):
+    # Lista donde guardaremos los productos extraídos
+    productos = []
+
+    # Busca todos los elementos que tengan la clase 'thumbnail' (cada uno es un producto)
+    for item in soup.select(".thumbnail"):
+        # Extraemos el nombre del producto del (atributo 'title' del enlace)
+        nombre = item.select_one(".title").get("title")
+
+        # Extraemos el precio bruto como texto
+        raw_precio = item.select_one(".price").text
+
+        # Extraemos la URL del producto (atributo 'href' del enlace)
+        producto_tag = item.select_one(".title")
+        producto_url = producto_tag.get("href") if producto_tag else None
+
+        # Extraemos la imagen del producto (atributo 'src' de la etiqueta img)
+        imagen_tag = item.select_one(".image img")
+        imagen = imagen_tag.get("src") if imagen_tag else None
+
+        # Agregamos el producto a la lista
+        productos.append(crear_producto(nombre, raw_precio, producto_url, imagen, url_pagina, proveedor))
+
+    return productos
+
+
+# Extrae los enlaces de paginación de una página de listado ya parseada (convertidos a URLs completas)
+def extraer_enlaces_paginacion(soup, url_pagina):
+    enlaces = []
+    for enlace in soup.select(".pagination a[href]"):
+        enlaces.append(urljoin(url_pagina, enlace.get("href")))
+    return enlaces
+
+
+# --- Extractor lxml / XPath ---
+
+# Condición XPath equivalente al selector CSS ".clase"
+def tiene_clase(clase):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {clase} ')"
+
+
+# Expresiones XPath precompiladas (equivalentes a los selectores CSS del extractor BeautifulSoup)
+XPATH_TARJETAS = etree.XPath(f"//*[{tiene_clase('thumbnail')}]")
+XPATH_TITULO = etree.XPath(f"(.//*[{tiene_clase('title')}])[1]")
+XPATH_PRECIO = etree.XPath(f"(.//*[{tiene_clase('price')}])[1]")
+XPATH_IMAGEN = etree.XPath(f"(.//*[{tiene_clase('image')}]//img)[1]")
+XPATH_PAGINACION = etree.XPath(f"//*[{tiene_clase('pagination')}]//a[@href]/@href")
+
+
+# Devuelve el primer resultado de una expresión XPath o None
+def primero(xpath, elemento):
+    resultado = xpath(elemento)
+    return resultado[0] if resultado else None
+
+
+# Parsea una página de listado con lxml y devuelve sus productos y sus enlaces de paginación
+def analizar_pagina_lxml(html, url_pagina, proveedor):
+    # lxml no admite documentos vacíos (BeautifulSoup los trata como una página sin productos)
+    if not html.strip():
+        return [], []
+    arbol = lxml_html.fromstring(html)
+
+    productos = []
+    for item in XPATH_TARJETAS(arbol):
+        titulo_tag = primero(XPATH_TITULO, item)
+        nombre = titulo_tag.get("title")
+        raw_precio = primero(XPATH_PRECIO, item).text_content()
+        producto_url = titulo_tag.get("href")
+        imagen_tag = primero(XPATH_IMAGEN, item)
+        imagen = imagen_tag.get("src") if imagen_tag is not None else None
+        productos.append(crear_producto(nombre, raw_precio, producto_url, imagen, url_pagina, proveedor))
+
+    enlaces = [urljoin(url_pagina, href) for href in XPATH_PAGINACION(arbol)]
+    return productos, enlaces
+
+
+# Extractores disponibles
+EXTRACTORES = {
+    "bs4": analizar_pagina_bs4,
+    "bs4_tarjetas": lambda html, url_pagina, proveedor: analizar_pagina_bs4(html, url_pagina, proveedor, solo_tarjetas=True),
+    "lxml": analizar_pagina_lxml,
+}
+
+
+# Parsea una página de listado con el extractor configurado y devuelve sus productos y sus enlaces de paginación
+def analizar_pagina(html, url_pagina, proveedor, extractor=None):
+    return EXTRACTORES[extractor or EXTRACTOR](html, url_pagina, proveedor)
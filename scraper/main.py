@@ -1,106 +1,73 @@
 # Importar FastAPI para crear la API y manejar parámetros de consulta
 from fastapi import FastAPI, Query
 
-# Importar BeautifulSoup para parsear HTML (web scraping)
-from bs4 import BeautifulSoup
+# Importar StreamingResponse para devolver los productos a medida que se scrapean
+from fastapi.responses import StreamingResponse
 
-# Importar requests para hacer peticiones HTTP a la página web
-import requests
+# Importar httpx para hacer peticiones HTTP asíncronas a la página web
+import httpx
 
-# Importar re para trabajar con expresiones regulares (limpiar textos)
-import re
+# Importar json para serializar los productos en streaming (NDJSON)
+import json
 
-# Importar datetime para manejar fechas y horas
-from datetime import datetime
+# Importar el motor de rastreo y las categorías semilla configuradas
+from rastreador import SEMILLAS, Rastreador, rastrear_todo
 
-# Para definir el modelo de datos
-from pydantic import BaseModel 
+# Importar la caché de páginas scrapeadas
+from cache_paginas import cache_paginas
 
-# Importar Optional para manejar tipos opcionales
-from typing import Optional
+# Importar la instrumentación (métricas en formato Prometheus)
+from metricas import instrumentar
 
-# BaseModel de Pydantic para definir el modelo de datos
-class Producto(BaseModel):
-    title: str
-    price: float
-    product_url: str
-    image: Optional[str] = None
-    product_provider: Optional[str] = None
-    timestamp: datetime
+# Importar las trazas entre servicios
+from trazas import instrumentar_trazas
 
 # Crear una instancia de FastAPI
 app = FastAPI()
 
+# Métricas en formato Prometheus (/metrics): duración por ruta y de la descarga de cada página por host
+instrumentar(app)
+
+# Trazas entre servicios: continúa la traza del backend con un span por petición (y uno por página descargada)
+instrumentar_trazas(app, "scraper")
+
+
+# Filtra los productos cuyo título contiene el término de búsqueda
+def filtrar_por_busqueda(productos, search):
+    if not search:
+        return productos
+    return [
+        producto for producto in productos
+        if search.lower() in producto.title.lower()
+    ]
+
+
 # Define un endpoint GET en la ruta /scrapear
 @app.get("/scrapear")
-def scrapear(search: str = Query(None)):
-    # URL del sitio web de prueba que vamos a scrapear
-    url = "https://webscraper.io/test-sites/e-commerce/allinone/computers/laptops"
-    
-    # Hace una petición HTTP para obtener el contenido de la página
-    res = requests.get(url)
-
-    # Usa BeautifulSoup para parsear el contenido HTML recibido
-    soup = BeautifulSoup(res.text, "lxml")
-
-    # Lista donde guardaremos los productos extraídos
-    productos = []
-
-    # Busca todos los elementos que tengan la clase 'thumbnail' (cada uno es un producto)
-    for item in soup.select(".thumbnail"):
-        # Extraemos el nombre del producto del (atributo 'title' del enlace)
-        nombre = item.select_one(".title").get("title")
-
-        # Extraemos el precio bruto como texto
-        raw_precio = item.select_one(".price").text
-
-        # Usamos una expresión regular para limpiar el precio, eliminando caracteres no numéricos
-        precio_limpio = re.sub(r"[^\d.]", "", raw_precio)
-
-        # Extraemos la URL del producto (atributo 'href' del enlace)
-        # y la convertimos a una URL completa
-        producto_tag = item.select_one(".title")
-        if producto_tag:
-            producto_url = producto_tag.get("href")
-            producto_url = f"https://webscraper.io{producto_url}"
-        else:
-            producto_url = None
-
-        # Extraemos la imagen del producto (atributo 'src' de la etiqueta img)
-        # y la convertimos a una URL completa
-        imagen_tag = item.select_one(".image img")
-        if imagen_tag:
-            imagen = imagen_tag.get("src")
-            imagen = f"https://webscraper.io{imagen}"
-        else:
-            imagen = None  # Si no se encuentra la imagen, asignamos None
-
-        try:
-            # Convertimos el precio limpio a un número decimal (float)
-            precio = float(precio_limpio)
-        except ValueError:
-            # Si no se puede convertir, asignamos 0.0 como precio por defecto
-            precio = 0.0
-
-       # Creamos una instancia del modelo Producto
-        producto = Producto(
-            title=nombre,
-            price=precio,
-            product_url=producto_url,
-            image=imagen,
-            product_provider=url,
-            timestamp=datetime.utcnow()
-        )
-
-        # Agregamos el producto a la lista
-        productos.append(producto)
+async def scrapear(search: str = Query(None)):
+    # Rastrea todas las categorías semilla y sus páginas
+    productos = await rastrear_todo(SEMILLAS)
 
     # Si se proporciona un término de búsqueda, filtramos los productos
-    if search:
-        productos = [
-            producto for producto in productos
-            if search.lower() in producto.title.lower()
-        ]
+    productos = filtrar_por_busqueda(productos, search)
 
     # Devuelve todos los productos extraídos en formato JSON
     return [producto.dict() for producto in productos]
+
+
+# Variante en streaming: emite cada producto como una línea JSON (NDJSON) en cuanto se scrapea su página
+@app.get("/scrapear/stream")
+async def scrapear_stream(search: str = Query(None)):
+    async def generar():
+        async with httpx.AsyncClient(follow_redirects=True) as cliente:
+            async for _, productos in Rastreador(cliente).rastrear(SEMILLAS):
+                for producto in filtrar_por_busqueda(productos, search):
+                    yield json.dumps(producto.dict(), default=str) + "\n"
+
+    return StreamingResponse(generar(), media_type="application/x-ndjson")
+
+
+# Estadísticas de la caché de páginas (aciertos, revalidaciones con 304 y descargas completas)
+@app.get("/estadisticas/cache")
+async def estadisticas_cache():
+    return cache_paginas.estadisticas()
@@ -0,0 +1,174 @@
+# Módulo compartido: copia idéntica en data_processor (referencia), backend/app/services, api_collector,
+# api_collector_2 y scraper, porque cada servicio se construye solo con su directorio. Se edita la copia del
+# data_processor y se propaga con `python sincronizar_modulos.py` (desde la raíz; --comprobar falla si
+# alguna copia se ha desviado)
+import time
+from contextlib import contextmanager
+from fastapi import Request
+from fastapi.responses import PlainTextResponse
+
+# Límites (en segundos) de los buckets de los histogramas de duración
+BUCKETS_DURACION = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Tipo de contenido del formato de texto de Prometheus
+TIPO_CONTENIDO = "text/plain; version=0.0.4; charset=utf-8"
+
+# Métricas registradas, por nombre, en el orden en que se exponen
+registro = {}
+
+
+def escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def formatear_etiquetas(etiquetas):
+    if not etiquetas:
+        return ""
+    return "{" + ",".join(f'{nombre}="{escapar(valor)}"' for nombre, valor in etiquetas) + "}"
+
+
+def formatear_numero(valor):
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+# Histograma con etiquetas: por cada combinación de etiquetas guarda las observaciones por bucket, su suma y su número
+class Histograma:
+    tipo = "histogram"
+
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_DURACION):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}
+
+    def observar(self, valor, **etiquetas):
+        clave = tuple(str(etiquetas[nombre]) for nombre in self.etiquetas)
+        serie = self.series.get(clave)
+        if serie is None:
+            serie = self.series[clave] = {"buckets": [0] * len(self.buckets), "suma": 0.0, "total": 0}
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                serie["buckets"][i] += 1
+        serie["suma"] += valor
+        serie["total"] += 1
+
+    def lineas(self):
+        for clave, serie in self.series.items():
+            etiquetas = list(zip(self.etiquetas, clave))
+            for limite, cuenta in zip(self.buckets, serie["buckets"]):
+                yield f"{self.nombre}_bucket{formatear_etiquetas(etiquetas + [('le', formatear_numero(float(limite)))])} {cuenta}"
+            yield f"{self.nombre}_bucket{formatear_etiquetas(etiquetas + [('le', '+Inf')])} {serie['total']}"
+            yield f"{self.nombre}_sum{formatear_etiquetas(etiquetas)} {formatear_numero(serie['suma'])}"
+            yield f"{self.nombre}_count{formatear_etiquetas(etiquetas)} {serie['total']}"
+
+
+# Contador con etiquetas: por cada combinación de etiquetas guarda un valor que solo crece
+class Contador:
+    tipo = "counter"
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.series = {}
+
+    def clave(self, etiquetas):
+        return tuple(str(etiquetas[nombre]) for nombre in self.etiquetas)
+
+    # Suma la cantidad a la serie (con cantidad 0 solo crea la serie, para que se exponga desde el principio)
+    def incrementar(self, cantidad=1, **etiquetas):
+        clave = self.clave(etiquetas)
+        self.series[clave] = self.series.get(clave, 0) + cantidad
+
+    def lineas(self):
+        for clave, valor in self.series.items():
+            yield f"{self.nombre}{formatear_etiquetas(list(zip(self.etiquetas, clave)))} {formatear_numero(valor)}"
+
+
+# Indicador (gauge) con etiquetas: como un contador, pero su valor se fija y puede bajar
+class Indicador(Contador):
+    tipo = "gauge"
+
+    def fijar(self, valor, **etiquetas):
+        self.series[self.clave(etiquetas)] = valor
+
+
+# Crea y registra una métrica (o devuelve la ya registrada con ese nombre)
+def registrar(clase, nombre, *argumentos):
+    if nombre not in registro:
+        registro[nombre] = clase(nombre, *argumentos)
+    return registro[nombre]
+
+
+def histograma(nombre, ayuda, etiquetas=(), buckets=BUCKETS_DURACION):
+    return registrar(Histograma, nombre, ayuda, etiquetas, buckets)
+
+
+def contador(nombre, ayuda, etiquetas=()):
+    return registrar(Contador, nombre, ayuda, etiquetas)
+
+
+def indicador(nombre, ayuda, etiquetas=()):
+    return registrar(Indicador, nombre, ayuda, etiquetas)
+
+
+# Métricas comunes a todos los servicios
+DURACION_PETICIONES = histograma(
+    "peticiones_http_duracion_segundos",
+    "Duración de las peticiones atendidas por el servicio, por método, ruta y estado",
+    ("metodo", "ruta", "estado"),
+)
+DURACION_UPSTREAM = histograma(
+    "upstream_duracion_segundos",
+    "Duración de las llamadas HTTP a otros servicios o APIs, por fuente y estado (hasta recibir las cabeceras)",
+    ("fuente", "estado"),
+)
+
+
+# Mide la duración del bloque y la anota en el histograma con las etiquetas indicadas (también si lanza una excepción)
+@contextmanager
+def medir(metrica, **etiquetas):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrica.observar(time.perf_counter() - inicio, **etiquetas)
+
+
+# Texto con todas las métricas registradas en el formato de exposición de Prometheus
+def exponer():
+    lineas = []
+    for metrica in registro.values():
+        lineas.append(f"# HELP {metrica.nombre} {metrica.ayuda}")
+        lineas.append(f"# TYPE {metrica.nombre} {metrica.tipo}")
+        lineas.extend(metrica.lineas())
+    return "\n".join(lineas) + "\n"
+
+
+# Añade a la aplicación el middleware que mide cada petición y el endpoint /metrics. Se etiqueta con la
+# plantilla de la ruta (p. ej. /productos/{producto_id}/historial_precios) para no crear una serie por URL;
+# en las respuestas en streaming se mide hasta que empiezan a enviarse
+def instrumentar(app):
+    @app.middleware("http")
+    async def medir_peticion(request: Request, call_next):
+        inicio = time.perf_counter()
+        estado = 500
+        try:
+            respuesta = await call_next(request)
+            estado = respuesta.status_code
+            return respuesta
+        finally:
+            ruta = request.scope.get("route")
+            DURACION_PETICIONES.observar(
+                time.perf_counter() - inicio,
+                metodo=request.method,
+                ruta=getattr(ruta, "path", "sin_ruta"),
+                estado=estado,
+            )
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return PlainTextResponse(exponer(), media_type=TIPO_CONTENIDO)
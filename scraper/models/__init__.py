@@ -0,0 +1,3 @@
+from .producto import Producto
+
+__all__ = ["Producto"]
\ No newline at end of file
@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+
+# BaseModel de Pydantic para definir el modelo de datos
+class Producto(BaseModel):
+    title: str
+    price: float
+    product_url: str
+    image: Optional[str] = None
+    product_provider: Optional[str] = None
+    timestamp: datetime
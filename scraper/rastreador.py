@@ -0,0 +1,154 @@
+import asyncio
+import os
+import time
+from urllib.parse import urlsplit
+from datetime import datetime
+import httpx
+from cache_paginas import cache_paginas
+from extraccion import analizar_pagina
+from metricas import DURACION_UPSTREAM
+from trazas import SPAN_CLIENTE, span
+
+# Categorías desde las que empieza el rastreo (separadas por comas). Se pueden apuntar a un
+# servidor local con páginas guardadas para probar el scraper sin salir a internet
+SEMILLAS = os.getenv(
+    "SEMILLAS_SCRAPER",
+    ",".join([
+        "https://webscraper.io/test-sites/e-commerce/allinone/computers/laptops",
+        "https://webscraper.io/test-sites/e-commerce/allinone/computers/tablets",
+        "https://webscraper.io/test-sites/e-commerce/allinone/phones/touch",
+    ])
+).split(",")
+
+# Número máximo de páginas descargándose a la vez
+CONCURRENCIA_MAXIMA = int(os.getenv("CONCURRENCIA_SCRAPER", "4"))
+
+# Tiempo mínimo (en segundos) entre dos peticiones al mismo host, por cortesía con el sitio
+RETARDO_POR_HOST = float(os.getenv("RETARDO_POR_HOST", "0.5"))
+
+# Número máximo de páginas por rastreo (protege frente a paginaciones infinitas)
+MAX_PAGINAS = int(os.getenv("MAX_PAGINAS_SCRAPER", "100"))
+
+
+# Motor de rastreo asíncrono: descarga las categorías semilla y las páginas de paginación que
+# vaya descubriendo, con un límite de concurrencia y un retardo mínimo entre peticiones al mismo host
+class Rastreador:
+
+    def __init__(self, cliente, concurrencia=CONCURRENCIA_MAXIMA, retardo_por_host=RETARDO_POR_HOST, max_paginas=MAX_PAGINAS, cache=cache_paginas):
+        self.cliente = cliente
+        self.cache = cache
+        self.semaforo = asyncio.Semaphore(concurrencia)
+        self.retardo_por_host = retardo_por_host
+        self.max_paginas = max_paginas
+        self.bloqueos_host = {}
+        self.ultima_peticion_host = {}
+        # Páginas en el orden en que se descubrieron (para devolver resultados en orden estable)
+        self.descubiertas = []
+
+    # Espera hasta que haya pasado el retardo mínimo desde la última petición al host
+    async def esperar_turno(self, host):
+        bloqueo = self.bloqueos_host.setdefault(host, asyncio.Lock())
+        async with bloqueo:
+            espera = self.ultima_peticion_host.get(host, 0) + self.retardo_por_host - time.monotonic()
+            if espera > 0:
+                await asyncio.sleep(espera)
+            self.ultima_peticion_host[host] = time.monotonic()
+
+    # Devuelve los productos y enlaces de una página: de la caché si está fresca, revalidándola con una
+    # petición condicional si no (un 304 reutiliza lo ya parseado) o descargándola y parseándola
+    async def obtener_pagina(self, url, semilla):
+        entrada = self.cache.obtener(url)
+        if entrada is not None and self.cache.es_fresca(entrada):
+            self.cache.metricas["aciertos"] += 1
+            return entrada["productos"], entrada["enlaces"]
+
+        host = urlsplit(url).netloc
+        async with self.semaforo:
+            await self.esperar_turno(host)
+            # Se mide solo la descarga (sin la espera por el semáforo ni por el turno del host)
+            # La traza no se propaga a sitios externos: el span de la descarga queda solo en este servicio
+            inicio = time.perf_counter()
+            with span(f"GET {host}", SPAN_CLIENTE, **{"http.url": url}) as span_descarga:
+                try:
+                    respuesta = await self.cliente.get(url, headers=self.cache.cabeceras_condicionales(entrada))
+                except httpx.TransportError:
+                    DURACION_UPSTREAM.observar(time.perf_counter() - inicio, fuente=host, estado="error_red")
+                    raise
+                span_descarga.atributos["http.status_code"] = respuesta.status_code
+            DURACION_UPSTREAM.observar(time.perf_counter() - inicio, fuente=host, estado=respuesta.status_code)
+
+        if respuesta.status_code == 304 and entrada is not None:
+            # La página no ha cambiado: solo se actualiza la fecha de los productos ya parseados
+            self.cache.metricas["revalidadas"] += 1
+            self.cache.renovar(url, entrada)
+            ahora = datetime.utcnow()
+            entrada["productos"] = [p.copy(update={"timestamp": ahora}) for p in entrada["productos"]]
+            return entrada["productos"], entrada["enlaces"]
+
+        respuesta.raise_for_status()
+        self.cache.metricas["descargadas"] += 1
+        productos, enlaces = analizar_pagina(respuesta.text, url, semilla)
+        self.cache.guardar(url, respuesta, productos, enlaces)
+        return productos, enlaces
+
+    # Obtiene una página. Devuelve sus productos y los enlaces de paginación de su misma categoría
+    async def procesar_pagina(self, url, semilla):
+        productos, enlaces = await self.obtener_pagina(url, semilla)
+        categoria = urlsplit(semilla)
+        siguientes = [
+            enlace for enlace in enlaces
+            if urlsplit(enlace).netloc == categoria.netloc and urlsplit(enlace).path == categoria.path
+        ]
+        return productos, siguientes
+
+    # Rastrea las semillas y su paginación. Es un generador asíncrono que va devolviendo
+    # (url, productos) a medida que termina cada página, para poder emitir resultados en streaming
+    async def rastrear(self, semillas):
+        visitadas = set()
+        pendientes = {}
+        # URLs de productos ya emitidos: la misma página puede llegar por la semilla y por "?page=1"
+        productos_vistos = set()
+
+        def programar(url, semilla):
+            if url in visitadas or len(visitadas) >= self.max_paginas:
+                return
+            visitadas.add(url)
+            self.descubiertas.append(url)
+            tarea = asyncio.create_task(self.procesar_pagina(url, semilla))
+            pendientes[tarea] = (url, semilla)
+
+        for semilla in semillas:
+            programar(semilla, semilla)
+
+        try:
+            while pendientes:
+                terminadas, _ = await asyncio.wait(pendientes, return_when=asyncio.FIRST_COMPLETED)
+                for tarea in terminadas:
+                    url, semilla = pendientes.pop(tarea)
+                    try:
+                        productos, siguientes = tarea.result()
+                    except Exception as e:
+                        print(f"Error al scrapear {url}: {e}")
+                        continue
+
+                    for siguiente in siguientes:
+                        programar(siguiente, semilla)
+
+                    productos = [p for p in productos if p.product_url not in productos_vistos]
+                    productos_vistos.update(p.product_url for p in productos)
+                    yield url, productos
+        finally:
+            # Si el consumidor deja de leer, se cancelan las descargas que queden
+            for tarea in pendientes:
+                tarea.cancel()
+
+
+# Rastrea todas las semillas y devuelve los productos en un orden estable (el de descubrimiento de las páginas)
+async def rastrear_todo(semillas=SEMILLAS):
+    resultados = {}
+    async with httpx.AsyncClient(follow_redirects=True) as cliente:
+        rastreador = Rastreador(cliente)
+        async for url, productos in rastreador.rastrear(semillas):
+            resultados[url] = productos
+
+    return [producto for url in rastreador.descubiertas for producto in resultados.get(url, [])]
@@ -0,0 +1,32 @@
+"""Renovación de entradas de la caché de páginas tras un 304."""
+from types import SimpleNamespace
+from cache_paginas import CachePaginas
+
+
+def guardar(cache, url):
+    respuesta = SimpleNamespace(content=b"<html></html>", headers={"ETag": f'"{url}"'})
+    cache.guardar(url, respuesta, [], [])
+    return cache.obtener(url)
+
+
+def test_renovar_entrada_descartada_mientras_se_revalidaba():
+    cache = CachePaginas(ttl=60, max_entradas=2)
+    entrada = guardar(cache, "https://sitio/a")
+    entrada["guardada"] -= 120
+    # Otras dos páginas desplazan la entrada mientras se revalida
+    guardar(cache, "https://sitio/b")
+    guardar(cache, "https://sitio/c")
+    assert cache.obtener("https://sitio/a") is None
+
+    cache.renovar("https://sitio/a", entrada)
+    assert cache.obtener("https://sitio/a") is entrada
+    assert cache.es_fresca(entrada)
+    assert list(cache.entradas) == ["https://sitio/c", "https://sitio/a"]
+
+
+def test_renovar_no_pisa_una_version_mas_reciente():
+    cache = CachePaginas(ttl=60)
+    antigua = guardar(cache, "https://sitio/a")
+    nueva = guardar(cache, "https://sitio/a")
+    cache.renovar("https://sitio/a", antigua)
+    assert cache.obtener("https://sitio/a") is nueva
@@ -0,0 +1,127 @@
+"""Rastreo de una categoría contra un servidor local que sirve las páginas de tests/fixtures.
+
+La categoría tiene dos páginas con 6 productos cada una, 2 de ellos repetidos: 10 productos distintos. La
+paginación de la primera enlaza también a otra categoría del mismo host y a otro host, que no se siguen.
+El servidor responde con ETag y contesta 304 a las peticiones condicionales que coinciden.
+"""
+import asyncio
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import httpx
+import pytest
+from cache_paginas import CachePaginas
+from rastreador import Rastreador
+
+FIXTURES = Path(__file__).parent / "fixtures"
+RUTA_CATEGORIA = "/test-sites/e-commerce/allinone/computers/laptops"
+
+# Página que sirve el servidor para cada ruta con su query
+PAGINAS = {
+    RUTA_CATEGORIA: "laptops.html",
+    f"{RUTA_CATEGORIA}?page=2": "laptops_pagina_2.html",
+}
+
+
+class ServidorPaginas(BaseHTTPRequestHandler):
+    # Peticiones recibidas: (ruta, estado, instante)
+    peticiones = []
+
+    def do_GET(self):
+        fichero = PAGINAS.get(self.path)
+        if fichero is None:
+            estado, cuerpo, etag = 404, b"", None
+        else:
+            cuerpo = (FIXTURES / fichero).read_bytes()
+            etag = f'"{hashlib.sha1(cuerpo).hexdigest()}"'
+            estado = 304 if self.headers.get("If-None-Match") == etag else 200
+        self.peticiones.append((self.path, estado, time.monotonic()))
+
+        self.send_response(estado)
+        if etag:
+            self.send_header("ETag", etag)
+        if estado == 304:
+            self.end_headers()
+            return
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, formato, *argumentos):
+        pass
+
+
+@pytest.fixture
+def servidor():
+    ServidorPaginas.peticiones = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), ServidorPaginas)
+    hilo = threading.Thread(target=httpd.serve_forever, daemon=True)
+    hilo.start()
+    try:
+        yield f"http://127.0.0.1:{httpd.server_port}"
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+# Rastrea las semillas y devuelve (urls de las páginas en orden de descubrimiento, productos emitidos)
+def rastrear(semillas, cache, **opciones):
+    async def ejecutar():
+        async with httpx.AsyncClient() as cliente:
+            rastreador = Rastreador(cliente, cache=cache, **opciones)
+            productos = [producto async for _, pagina in rastreador.rastrear(semillas) for producto in pagina]
+        return rastreador.descubiertas, productos
+
+    return asyncio.run(ejecutar())
+
+
+def test_rastrea_la_paginacion_de_la_categoria(servidor):
+    semilla = servidor + RUTA_CATEGORIA
+    paginas, productos = rastrear([semilla], CachePaginas(), retardo_por_host=0)
+
+    # Solo se siguen los enlaces del mismo host y la misma ruta que la semilla
+    assert paginas == [semilla, f"{semilla}?page=2"]
+    assert [ruta for ruta, _, _ in ServidorPaginas.peticiones] == [RUTA_CATEGORIA, f"{RUTA_CATEGORIA}?page=2"]
+    # Los productos repetidos entre páginas se emiten una sola vez
+    assert len(productos) == 10
+    assert sorted(p.product_url for p in productos) == sorted(
+        f"{servidor}/test-sites/e-commerce/allinone/product/{i}" for i in range(1, 11)
+    )
+
+
+def test_max_paginas_limita_el_rastreo(servidor):
+    semilla = servidor + RUTA_CATEGORIA
+    paginas, productos = rastrear([semilla], CachePaginas(), retardo_por_host=0, max_paginas=1)
+
+    assert paginas == [semilla]
+    assert len(ServidorPaginas.peticiones) == 1
+    assert len(productos) == 6
+
+
+def test_respeta_el_retardo_entre_peticiones_al_mismo_host(servidor):
+    retardo = 0.3
+    # Las dos páginas como semillas: se programan a la vez y solo las separa el retardo por host
+    semillas = [servidor + RUTA_CATEGORIA, f"{servidor}{RUTA_CATEGORIA}?page=2"]
+    rastrear(semillas, CachePaginas(), retardo_por_host=retardo, concurrencia=4)
+
+    instantes = [instante for _, _, instante in ServidorPaginas.peticiones]
+    assert len(instantes) == 2
+    # Pequeño margen por la resolución del reloj entre el hilo del servidor y el bucle de eventos
+    assert instantes[1] - instantes[0] >= retardo - 0.02
+
+
+def test_segundo_rastreo_revalida_las_paginas_con_304(servidor):
+    semilla = servidor + RUTA_CATEGORIA
+    # TTL 0: en el segundo rastreo las páginas guardadas ya no están frescas y se revalidan
+    cache = CachePaginas(ttl=0)
+    _, primeros = rastrear([semilla], cache, retardo_por_host=0)
+    _, segundos = rastrear([semilla], cache, retardo_por_host=0)
+
+    estados = [estado for _, estado, _ in ServidorPaginas.peticiones]
+    assert estados == [200, 200, 304, 304]
+    assert cache.metricas == {"aciertos": 0, "revalidadas": 2, "descargadas": 2}
+    assert sorted(p.product_url for p in segundos) == sorted(p.product_url for p in primeros)
+    assert len(segundos) == 10
@@ -0,0 +1,80 @@
+"""Sincroniza los módulos compartidos que cada servicio lleva copiados.
+
+Cada servicio se construye con su propio directorio como contexto de Docker y no puede importar código de
+fuera de él, así que los módulos comunes (métricas, trazas, caché de respuestas...) se copian, idénticos, en
+los servicios que los usan. Cada módulo tiene una copia de referencia (MODULOS): se edita esa y se propaga
+al resto con este script. En las copias que viven dentro de un paquete (las del backend, en app/services) las
+importaciones de otros módulos compartidos se reescriben al paquete: "from metricas import ..." pasa a ser
+"from app.services.metricas import ...". Es la única diferencia permitida entre una copia y su referencia.
+Con --comprobar no se copia nada y se termina con código 1 si alguna copia difiere de la de referencia
+(pensado para CI o un hook de pre-commit).
+
+Uso (desde la raíz del repositorio):
+    python sincronizar_modulos.py              # copia las referencias sobre el resto
+    python sincronizar_modulos.py --comprobar  # solo comprueba
+"""
+import argparse
+import re
+import sys
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent
+
+# Módulo compartido -> (copia de referencia, copias que se sincronizan con ella)
+MODULOS = {
+    "metricas.py": ("data_processor", ["backend/app/services", "api_collector", "api_collector_2", "scraper"]),
+    "trazas.py": ("data_processor", ["backend/app/services", "api_collector", "api_collector_2", "scraper"]),
+    "indices.py": ("data_processor", ["backend/app/services"]),
+    "cache_respuestas.py": ("api_collector", ["api_collector_2"]),
+    "limitador.py": ("api_collector", ["api_collector_2"]),
+    "clientes_http.py": ("api_collector", ["api_collector_2", "backend/app/services"]),
+}
+
+# Paquete desde el que se importan los módulos compartidos en las copias que no están en la raíz de su servicio
+PAQUETES = {"backend/app/services": "app.services"}
+
+
+# Contenido que debe tener una copia: el de la referencia con las importaciones de los módulos compartidos
+# reescritas al paquete de la copia (si lo tiene)
+def contenido_esperado(contenido, copia):
+    paquete = PAQUETES.get(copia)
+    if paquete is None:
+        return contenido
+    for modulo in MODULOS:
+        nombre = modulo.removesuffix(".py")
+        contenido = re.sub(rf"^from {nombre} import ", f"from {paquete}.{nombre} import ", contenido, flags=re.MULTILINE)
+    return contenido
+
+
+# Copias que difieren de su referencia: (referencia, copia, contenido esperado de la copia)
+def copias_desviadas():
+    desviadas = []
+    for modulo, (referencia, copias) in MODULOS.items():
+        contenido = (RAIZ / referencia / modulo).read_text(encoding="utf-8")
+        for copia in copias:
+            ruta = RAIZ / copia / modulo
+            esperado = contenido_esperado(contenido, copia)
+            if not ruta.exists() or ruta.read_text(encoding="utf-8") != esperado:
+                desviadas.append((RAIZ / referencia / modulo, ruta, esperado))
+    return desviadas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--comprobar", action="store_true", help="no copiar; código 1 si alguna copia difiere")
+    args = parser.parse_args()
+
+    desviadas = copias_desviadas()
+    for referencia, copia, esperado in desviadas:
+        if args.comprobar:
+            print(f"DIFIERE  {copia.relative_to(RAIZ)} (referencia: {referencia.relative_to(RAIZ)})")
+        else:
+            copia.write_text(esperado, encoding="utf-8")
+            print(f"COPIADO  {referencia.relative_to(RAIZ)} -> {copia.relative_to(RAIZ)}")
+    if args.comprobar:
+        print(f"{len(desviadas)} copias desviadas" if desviadas else "Todas las copias coinciden con su referencia")
+        sys.exit(1 if desviadas else 0)
+
+
+if __name__ == "__main__":
+    main()